@@ -1,64 +1,29 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 import pandas as pd
+import numpy as np
 import glob
 import os
 import json
-import requests
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from news_analyzer import search_naver_news
+from investor_store import get_flows, summarize_flows
+from relative_strength import load_return_table, rs_lookup
 import FinanceDataReader as fdr
 import yaml
 from scanner_core import calculate_signals, score_stock
 from image_analysis import analyze_chart_image
+from chart_utils import chart_markers, downsample_ohlcv, MAX_CHART_POINTS
+from price_store import get_prices, next_market_close, PRICE_DIR
 
 st.set_page_config(layout="wide", page_title="추세추종 스캐너")
 
 def get_investor_data_realtime(code):
-    """실시간 수급 데이터 조회 (네이버 금융)"""
+    """실시간 수급 데이터 조회 (수급 저장소 사용, 당일 확정분이 있으면 네트워크 조회 없음)"""
     try:
-        code = str(code).zfill(6)
-        url = f"https://finance.naver.com/item/frgn.naver?code={code}"
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        r = requests.get(url, headers=headers, timeout=5)
-        dfs = pd.read_html(r.text, encoding='cp949')
-        
-        target_df = None
-        for df in dfs:
-            if '외국인' in str(df.columns): target_df = df; break
-        if target_df is None and len(dfs) >= 2: target_df = dfs[1]
-        
-        if target_df is not None:
-            df = target_df.dropna(how='all').head(10)
-            f_con, f_net, i_net = 0, 0, 0
-            
-            # 컬럼 찾기
-            cols = [str(c).lower() for c in df.columns]
-            f_col = next((i for i, c in enumerate(cols) if '외국인' in c), -1)
-            i_col = next((i for i, c in enumerate(cols) if '기관' in c), -1)
-            p_col = next((i for i, c in enumerate(cols) if '종가' in c), -1)
-            
-            if f_col != -1 and i_col != -1:
-                counting = True
-                for _, row in df.iterrows():
-                    try:
-                        price = float(str(row.iloc[p_col]).replace(',', '')) if p_col != -1 else 1
-                        f_val = float(str(row.iloc[f_col]).replace(',', ''))
-                        i_val = float(str(row.iloc[i_col]).replace(',', ''))
-                        
-                        f_net += f_val * price
-                        i_net += i_val * price
-                        
-                        if counting and f_val > 0: f_con += 1
-                        else: counting = False
-                    except: continue
-                return {
-                    'foreign_consecutive_buy': f_con,
-                    'inst_net_buy_5d': i_net,
-                    'foreign_net_buy_5d': f_net
-                }
+        return summarize_flows(get_flows(code, days=10))
     except: pass
     return {'foreign_consecutive_buy': 0, 'inst_net_buy_5d': 0, 'foreign_net_buy_5d': 0}
 
@@ -70,8 +35,70 @@ def load_config():
             return yaml.safe_load(f)
     return {}
 
-@st.cache_data(ttl=300)
+APP_PRICE_DAYS = 400  # 앱에서 쓰는 가장 긴 구간 (종목 진단). 전략/차트는 이 구간을 잘라서 사용
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _load_ohlcv(code, days, valid_until):
+    """
+    종목 일봉 (세션 간 공유). valid_until(다음 장 마감 시각)이 캐시 키라서 장 마감이 지나면 새로 받음
+    로컬 가격 저장소(data/prices)가 있으면 저장소에서 읽고 빠진 봉만 받음
+    """
+    end = datetime.utcnow() + timedelta(hours=9)
+    start = end - timedelta(days=days)
+    if os.path.isdir(PRICE_DIR):
+        return get_prices(code, start, end)
+    return fdr.DataReader(code, start, end)
+
+def get_ohlcv(code, days):
+    """최근 days일(달력일) 일봉. 종목마다 가장 넓은 구간을 한 번만 받고 잘라서 반환"""
+    code = str(code).zfill(6)
+    widest = max(APP_PRICE_DAYS, load_config().get("chart", {}).get("days", 180), days)
+    now = datetime.utcnow() + timedelta(hours=9)
+    df = _load_ohlcv(code, widest, next_market_close(now).strftime("%Y-%m-%d %H:%M"))
+    if df is None:
+        return None
+    return df.loc[pd.Timestamp(now.date() - timedelta(days=days)):].copy()
+
+MANIFEST_PATH = "data/manifest.json"
+
+def read_manifest():
+    """merge_chunks가 쓴 매니페스트 (없거나 깨졌으면 None)"""
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest if os.path.exists(manifest.get("snapshot", "")) else None
+    except Exception:
+        return None
+
+@st.cache_data(max_entries=2)
+def load_snapshot(content_hash, snapshot_path, sector_path, latest_date):
+    """병합 스냅샷 읽기. content_hash가 캐시 키 (데이터가 바뀔 때만 다시 읽음)"""
+    df = pd.read_parquet(snapshot_path)
+    sector_df = None
+    if sector_path and os.path.exists(sector_path):
+        try: sector_df = pd.read_csv(sector_path)
+        except: pass
+    return df, sector_df, f"scanner_output_{latest_date} (스냅샷)"
+
 def load_data():
+    """
+    매니페스트가 있으면 해시로 캐시된 스냅샷 사용 (실행마다 작은 JSON 하나만 읽음)
+    단, 병합 이후 새 청크 결과가 올라와 있으면 청크를 우선 (방금 수집된 데이터)
+    """
+    manifest = read_manifest()
+    if manifest is not None:
+        newer = [f for f in glob.glob("data/partial/scanner_output_*chunk*.csv")
+                 if os.path.basename(f)[len("scanner_output_"):][:10] > manifest["latest_date"]]
+        if not newer:
+            try:
+                return load_snapshot(manifest["hash"], manifest["snapshot"], manifest.get("sector_rankings"), manifest["latest_date"])
+            except Exception as e:
+                st.warning(f"스냅샷 로드 실패, CSV로 대체: {e}")
+    return load_data_csv()
+
+@st.cache_data(ttl=300)
+def load_data_csv():
+    """매니페스트/스냅샷이 없을 때 (또는 병합 전 청크 결과) CSV를 직접 찾아 읽음"""
     df, filename = None, None
     
     # 1. 파일 목록 확인 (latest 파일 제외 - 날짜 비교 문제 방지)
@@ -209,11 +236,13 @@ def display_stock_report(row, sector_df=None, rs_3m=None, rs_6m=None):
     st.markdown("---")
     st.subheader(f"📊 {row.get('name', 'N/A')} ({row.get('code', '')}) 상세 분석")
     
-    # RS 정보
+    # RS 정보 (인자가 없으면 스캔 결과의 값 사용)
+    if rs_3m is None: rs_3m = row.get('rs_3m')
+    if rs_6m is None: rs_6m = row.get('rs_6m')
     if rs_3m or rs_6m:
         c1, c2 = st.columns(2)
-        if rs_3m: c1.metric("3개월 RS", f"{rs_3m}")
-        if rs_6m: c2.metric("6개월 RS", f"{rs_6m}")
+        if rs_3m: c1.metric("3개월 RS", f"{rs_3m:.0f}")
+        if rs_6m: c2.metric("6개월 RS", f"{rs_6m:.0f}")
     
     # 섹터 정보
     stock_sector = row.get('sector', '기타')
@@ -341,7 +370,7 @@ def display_stock_report(row, sector_df=None, rs_3m=None, rs_6m=None):
             climax_low = base_stop
         
             try:
-                sub_df = fdr.DataReader(row['code'], datetime.now()-timedelta(days=100), datetime.now())
+                sub_df = get_ohlcv(row['code'], 100)
                 if sub_df is not None and len(sub_df) >= 20:
                     # ATR(20) 계산
                     tr = pd.concat([
@@ -501,7 +530,9 @@ def display_stock_report(row, sector_df=None, rs_3m=None, rs_6m=None):
     try:
         # 차트 데이터 로드
         code_str = str(row['code']).zfill(6)
-        chart_df = fdr.DataReader(code_str, datetime.now()-timedelta(days=180), datetime.now()) # use code_str
+        chart_cfg = load_config().get("chart", {})
+        chart_days = chart_cfg.get("days", 180)
+        chart_df = get_ohlcv(code_str, chart_days)
         
         if chart_df is not None and len(chart_df) > 0:
             # 실시간 등락률 계산 (이전일 종가 대비)
@@ -517,13 +548,18 @@ def display_stock_report(row, sector_df=None, rs_3m=None, rs_6m=None):
             mid = chart_df['Close'].rolling(60).mean()
             std = chart_df['Close'].rolling(60).std()
             chart_df['BB_Upper'] = mid + 2*std
+            # 마커는 원래 일봉 기준으로 계산한 뒤, 그릴 봉이 많으면 묶어서 그림 (마커 위치는 실제 날짜 그대로)
+            markers = chart_markers(chart_df)
+            full_df = chart_df
+            chart_df, lod_k = downsample_ohlcv(chart_df, chart_cfg.get("max_points", MAX_CHART_POINTS))
             
             fig = make_subplots(rows=2, cols=1, row_heights=[0.7, 0.3], shared_xaxes=True, vertical_spacing=0.05)
             
             # 메인 차트
             fig.add_trace(go.Candlestick(
                 x=chart_df.index, open=chart_df['Open'], high=chart_df['High'], low=chart_df['Low'], close=chart_df['Close'],
-                name=f'주가 ({row["close"]:,.0f})', increasing_line_color='red', decreasing_line_color='blue'
+                name=f'주가 ({row["close"]:,.0f})' + (f' · {lod_k}일봉 묶음' if lod_k > 1 else ''),
+                increasing_line_color='red', decreasing_line_color='blue'
             ), row=1, col=1)
             
             fig.add_trace(go.Scatter(x=chart_df.index, y=chart_df['MA20'], line=dict(color='orange', width=1.5), name='20일선'), row=1, col=1)
@@ -534,23 +570,29 @@ def display_stock_report(row, sector_df=None, rs_3m=None, rs_6m=None):
                  fig.add_hline(y=row['stop'], line_dash="dash", line_color="red", annotation_text="손절가", row=1, col=1)
 
             # 거래량 차트
-            colors = ['red' if c >= o else 'blue' for c, o in zip(chart_df['Close'], chart_df['Open'])]
+            colors = np.where(chart_df['Close'] >= chart_df['Open'], 'red', 'blue')
             fig.add_trace(go.Bar(x=chart_df.index, y=chart_df['Volume'], marker_color=colors, name='거래량'), row=2, col=1)
             
-            # 마커 (불기둥 + 오닐)
-            vol_ma = chart_df['Volume'].rolling(20).mean()
-            for i in range(1, len(chart_df)):
-                d = chart_df.iloc[i]
-                prev = chart_df.iloc[i-1]
-                # 불기둥
-                if d['Volume'] > vol_ma.iloc[i] * 2 and d['Close'] > d['Open'] and d['Close'] > prev['Close'] * 1.05:
-                     fig.add_annotation(x=chart_df.index[i], y=d['High'], text="🔥", showarrow=False, yshift=10, row=1, col=1)
+            # 마커 (불기둥 / 클라이맥스 / 오닐) - 종류별로 scatter 트레이스 하나씩
+            fire = full_df[markers['fire']]
+            fig.add_trace(go.Scatter(x=fire.index, y=fire['High'], mode='text', text=['🔥'] * len(fire),
+                                     textposition='top center', name='불기둥', hoverinfo='x+name'), row=1, col=1)
+            climax = full_df[markers['climax']]
+            fig.add_trace(go.Scatter(x=climax.index, y=climax['Low'], mode='markers', name='클라이맥스',
+                                     marker=dict(symbol='triangle-up', size=8, color='darkorange'),
+                                     hovertemplate='%{x|%Y-%m-%d} 클라이맥스 저점 %{y:,.0f}<extra></extra>'), row=1, col=1)
+            oneil_mask = markers['oneil'] != ""
+            oneil_df = full_df[oneil_mask]
+            fig.add_trace(go.Scatter(x=oneil_df.index, y=oneil_df['High'], mode='markers', name='오닐 패턴',
+                                     marker=dict(symbol='diamond', size=6, color='blueviolet'),
+                                     text=markers['oneil'][oneil_mask], hovertemplate='%{x|%Y-%m-%d} %{text}<extra></extra>',
+                                     visible='legendonly'), row=1, col=1)
             
             # 오닐 패턴 마커 (오늘 날짜에만 표시)
             # oneil_msg가 정의되어 있을 때만 표시 (CSV 사용 시는 없을 수 있음)
             try:
                 if 'oneil_msg' in dir() and oneil_msg:
-                    fig.add_annotation(x=chart_df.index[-1], y=chart_df['High'].iloc[-1], text=f"💎{oneil_msg}", showarrow=True, arrowhead=1, row=1, col=1)
+                    fig.add_annotation(x=full_df.index[-1], y=full_df['High'].iloc[-1], text=f"💎{oneil_msg}", showarrow=True, arrowhead=1, row=1, col=1)
             except:
                 pass
 
@@ -596,8 +638,12 @@ if mode == "📊 시장 스캐너":
             st.caption("📈 최근 3개월 수익률 상위 섹터")
             if sector_df is not None and not sector_df.empty:
                 top_sectors = sector_df.head(5)
+                # 예전 파일에는 1/6개월, 시총가중, breadth 컬럼이 없을 수 있음
+                cols = [c for c in ['Rank','Sector','AvgReturn_1M','AvgReturn_3M','AvgReturn_6M','McapReturn_3M','Breadth','StockCount']
+                        if c in top_sectors.columns]
+                fmt = {c: '{:.1f}%' for c in cols if c.startswith(('AvgReturn', 'McapReturn')) or c == 'Breadth'}
                 st.dataframe(
-                    top_sectors[['Rank','Sector','AvgReturn_3M','StockCount']].style.format({'AvgReturn_3M': '{:.1f}%'}), 
+                    top_sectors[cols].style.format(fmt, na_rep="-"), 
                     use_container_width=True, hide_index=True
                 )
                 leaders = top_sectors['Sector'].tolist()
@@ -702,17 +748,20 @@ elif mode == "🔍 종목 상세 진단":
                         inv_data = realtime_inv
                 
                 # 데이터 가져오기
-                df_stock = fdr.DataReader(code, datetime.now()-timedelta(days=400), datetime.now())
+                df_stock = get_ohlcv(code, APP_PRICE_DAYS)
                 
                 if df_stock is not None and len(df_stock) > 100:
                     cfg = load_config()
                     sig = calculate_signals(df_stock, cfg)
-                    result = score_stock(df_stock, sig, cfg, investor_data=inv_data)
+                    # RS는 가장 최근 유니버스 수익률 표 기준 (표에 없으면 0)
+                    rs_3m, rs_6m = rs_lookup(load_return_table()).get(code, (0, 0))
+                    result = score_stock(df_stock, sig, cfg, investor_data=inv_data, rs_3m=rs_3m, rs_6m=rs_6m)
                     
                     if result:
                         row = pd.Series(result)
                         row['name'] = name
                         row['code'] = code
+                        row['rs_3m'], row['rs_6m'] = rs_3m, rs_6m
                         # 섹터 정보
                         row['sector'] = '기타' 
                         if df_scan is not None and not match.empty:
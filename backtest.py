@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+backtest.py - 셋업(A/B/C/R)과 3개 진입 전략(눌림목/돌파/오닐)의 과거 성과 검증
+유니버스 전 종목 × 전 구간을 날짜 × 종목 행렬로 계산합니다 (봉마다 도는 Python 루프 없음).
+- 시그널: scanner_panel.calculate_signals_panel (스캐너와 같은 정의)
+- 전략 진입가/손절가/적합성: calculate_strategies와 같은 식을 행렬로 계산
+- 체결: 진입가가 종가보다 낮으면 지정가 매수(저가 ≤ 진입가), 높으면 역지정가 매수(고가 ≥ 진입가),
+  같으면 당일 종가 매수. 시그널 다음 봉부터 entry_window봉 안에 체결되지 않으면 취소
+- R 배수 = 손익 / 계획 리스크(진입가 - 손절가). 계획 리스크가 min_risk_pct% 미만인 시그널은 집계에서 제외
+- 청산: 손절가 / 목표가(target_r × 리스크) / 종가 < trail_ma일선 / max_hold봉 경과 (진입 봉에서는 청산하지 않음,
+  같은 봉에 손절과 목표가 모두 닿으면 손절로 처리)
+종목을 chunk_size개씩 나눠 프로세스 풀로 병렬 실행합니다.
+실행: python backtest.py  (설정은 config.yaml의 backtest)
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import yaml
+
+import http_client
+from price_store import get_prices
+from scanner_panel import build_panel, calculate_signals_panel
+
+BACKTEST_DIR = os.path.join("data", "backtest")
+WARMUP_DAYS = 400  # 200일선/밴드폭 백분위 계산용 앞쪽 여유 (달력일)
+SETUPS = ("B", "A", "C", "R")
+STRATEGIES = ("pullback", "breakout", "oneil")
+DEFAULT_PARAMS = {
+    "years": 5,
+    "entry_window": 3,
+    "max_hold": 20,
+    "target_r": 2.0,
+    "trail_ma": 0,
+    "cost_pct": 0.25,
+    "min_risk_pct": 0.5,
+    "workers": 4,
+    "chunk_size": 50,
+}
+
+
+def _rolling(a, n, how="mean"):
+    return getattr(pd.DataFrame(a).rolling(n), how)().to_numpy()
+
+
+def setup_labels(sig):
+    """score_stock과 같은 우선순위 (B > A > C > R) → 날짜 × 종목 문자열 배열 ("-" = 셋업 없음)"""
+    b, a, c = (sig[k].to_numpy(dtype=bool) for k in ("setup_b", "setup_a", "setup_c"))
+    r = sig["door_knock"].to_numpy(dtype=bool) & sig["squeeze"].to_numpy(dtype=bool)
+    return np.select([b, a, c, r], list(SETUPS), default="-")
+
+
+def strategy_levels(panel, sig):
+    """
+    calculate_strategies의 행렬 버전
+    반환: {전략: (진입가, 손절가, 리스크%, 적합 여부)} 각각 날짜 × 종목 배열
+    """
+    o, h, l, c, v = (panel[k].to_numpy(dtype=float) for k in ("Open", "High", "Low", "Close", "Volume"))
+    get = lambda k: sig[k].to_numpy(dtype=float)
+    ma20, ma50, upper, bbw_pct, vol_ma20 = get("ma20"), get("ma50"), get("upper"), get("bbw_pct"), get("vol_ma20")
+    climax_low = np.nan_to_num(get("climax_low"), nan=0.0)
+    ma20 = np.where(np.isnan(ma20), c, ma20)
+    ma50 = np.where(np.isnan(ma50), c, ma50)
+    bb_upper = np.where(np.isnan(upper), c * 1.05, upper)
+    bbw_pct = np.where(np.isnan(bbw_pct), 50.0, bbw_pct)
+    ma10 = _rolling(c, 10)
+    ma10 = np.where(np.isnan(ma10), c, ma10)
+    pc = np.vstack([np.full((1, c.shape[1]), np.nan), c[:-1]])
+    ph = np.vstack([np.full((1, c.shape[1]), np.nan), h[:-1]])
+    pl = np.vstack([np.full((1, c.shape[1]), np.nan), l[:-1]])
+    tr = np.fmax(np.fmax(h - l, np.abs(h - pc)), np.abs(l - pc))
+    atr20 = _rolling(tr, 20)
+    atr20 = np.where(np.isnan(atr20), c * 0.02, atr20)
+    swing_low = _rolling(l, 10, "min")
+    base_stop = np.where(climax_low > 0, climax_low, swing_low)
+
+    def finish(entry, stop, fallback):
+        stop = np.where(stop >= entry, entry * fallback, stop)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            risk = np.where(entry > 0, (entry - stop) / entry * 100, 99.0)
+        return entry, stop, risk
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # 눌림목: 20일선 진입, 손절 max(클라이맥스 저점/10일 저점, 진입 - 1.2 ATR)
+        pb = finish(ma20, np.fmax(base_stop, ma20 - 1.2 * atr20), 0.95)
+        pb_ok = (c >= ma20 * 0.97) & (c <= ma20 * 1.05) & (climax_low > 0)
+        # 돌파: BB 상단(이미 넘었으면 종가) 진입, 손절 진입 - 1.5 ATR
+        bo_entry = np.where(c > bb_upper, c, bb_upper)
+        bo = finish(bo_entry, bo_entry - 1.5 * atr20, 0.95)
+        trend_ok = (ma20 > ma50) | (np.where(ma50 > 0, np.abs(ma20 - ma50) / ma50 * 100, 0) <= 5)
+        has_volume = np.where(vol_ma20 > 0, v >= vol_ma20 * 0.7, True)
+        bo_ok = (c >= bb_upper * 0.97) & ((bbw_pct <= 30) | trend_ok) & has_volume
+        # 오닐: 종가 진입, 손절 max(10일선, 진입 - ATR)
+        on = finish(c, np.fmax(ma10, c - atr20), 0.94)
+        vol_ma = _rolling(v, 20)
+        on_ok = ((h < ph) & (l > pl)) | ((o < pl) & (c > pl)) | ((v > vol_ma * 2) & (c > o))
+    return {"pullback": (*pb, pb_ok), "breakout": (*bo, bo_ok), "oneil": (*on, on_ok)}
+
+
+def _gather(a, rows, cols):
+    """a[rows, cols] (범위를 벗어난 행은 NaN)"""
+    valid = rows < a.shape[0]
+    out = a[np.minimum(rows, a.shape[0] - 1), cols]
+    return np.where(valid, out, np.nan)
+
+
+def _first(mask):
+    """행별 첫 True 위치 (없으면 열 개수)"""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+
+def simulate_trades(ohlc, t, j, entry, stop, params, trail=None):
+    """
+    이벤트(t=시그널 봉, j=종목) 묶음을 한 번에 체결/청산
+    ohlc: (Open, High, Low, Close) 날짜 × 종목 배열, entry/stop: 이벤트별 값
+    반환: dict (filled, entry_bar, exit_bar, entry_px, exit_px, r, ret_pct, reason)
+    """
+    o, h, l, c = ohlc
+    n_bars = c.shape[0]
+    cols = j[:, None]
+    close_t = c[t, j]
+
+    # 체결
+    w = int(params["entry_window"])
+    rows = t[:, None] + np.arange(1, w + 1)
+    fo, fh, fl = _gather(o, rows, cols), _gather(h, rows, cols), _gather(l, rows, cols)
+    at_close = entry == close_t
+    buy_stop = (entry > close_t)[:, None]
+    with np.errstate(invalid="ignore"):
+        hit = np.where(buy_stop, fh >= entry[:, None], fl <= entry[:, None])
+        px = np.where(buy_stop, np.fmax(fo, entry[:, None]), np.fmin(fo, entry[:, None]))
+        hit &= px > stop[:, None]  # 손절가 아래로 갭 체결되는 주문은 무효
+    k = _first(hit)
+    filled = at_close | (k < w)
+    entry_bar = np.where(at_close, t, t + 1 + np.minimum(k, w - 1))
+    entry_px = np.where(at_close, close_t, px[np.arange(len(t)), np.minimum(k, w - 1)])
+    entry_px = np.where(filled, entry_px, np.nan)
+
+    # 청산
+    m = int(params["max_hold"])
+    rows = entry_bar[:, None] + np.arange(1, m + 1)
+    xo, xh, xl, xc = (_gather(a, rows, cols) for a in (o, h, l, c))
+    risk = entry - stop  # R은 계획 리스크(진입가 - 손절가) 기준 (갭 체결로 실제 체결가가 달라져도 같은 분모)
+    target_r = params.get("target_r") or 0
+    with np.errstate(invalid="ignore"):
+        stop_hit = xl <= stop[:, None]
+        exits = [(_first(stop_hit), np.fmin(xo, stop[:, None]), "stop")]
+        if target_r > 0:
+            target = entry + target_r * risk
+            exits.append((_first(xh >= target[:, None]), np.fmax(xo, target[:, None]), "target"))
+        if trail is not None:
+            ma = _gather(trail, rows, cols)
+            exits.append((_first(xc < ma), xc, "trail"))
+    firsts = np.vstack([e[0] for e in exits])
+    which = firsts.argmin(axis=0)  # 같은 봉이면 앞쪽(손절 우선)
+    k_exit = firsts[which, np.arange(len(t))]
+    has_exit = k_exit < m
+    # 청산 조건이 없으면 보유 기간 마지막 봉 종가 (데이터가 끝났으면 미청산)
+    last_k = np.minimum(m, n_bars - 1 - entry_bar) - 1
+    exit_k = np.where(has_exit, k_exit, last_k)
+    idx = np.arange(len(t))
+    exit_px = np.select(
+        [has_exit & (which == i) for i in range(len(exits))],
+        [e[1][idx, np.clip(exit_k, 0, m - 1)] for e in exits],
+        default=xc[idx, np.clip(exit_k, 0, m - 1)],
+    )
+    reason = np.select([has_exit & (which == i) for i in range(len(exits))], [e[2] for e in exits], default="time")
+    is_open = ~has_exit & (entry_bar + m > n_bars - 1)
+    reason = np.where(is_open, "open", reason)
+    reason = np.where(filled, reason, "unfilled")
+    exit_px = np.where(filled & (exit_k >= 0), exit_px, np.nan)
+
+    cost = entry_px * params.get("cost_pct", 0) / 100
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = (exit_px - entry_px - cost) / risk
+        ret_pct = (exit_px - entry_px - cost) / entry_px * 100
+    return {
+        "filled": filled, "entry_bar": entry_bar, "exit_bar": entry_bar + 1 + exit_k,
+        "entry_px": entry_px, "exit_px": exit_px, "r": r, "ret_pct": ret_pct, "reason": reason,
+    }
+
+
+def backtest_panel(panel, cfg, params, eval_start=None):
+    """
+    날짜 × 종목 패널 → 거래 목록 DataFrame
+    셋업이 있는 봉마다 3개 전략을 모두 시뮬레이션 (rank 1 = 스캐너가 1순위로 추천했을 전략)
+    """
+    sig = calculate_signals_panel(panel, cfg)
+    if sig is None:
+        return pd.DataFrame()
+    dates, codes = panel["Close"].index, panel["Close"].columns
+    ohlc = tuple(panel[k].to_numpy(dtype=float) for k in ("Open", "High", "Low", "Close"))
+    setups = setup_labels(sig)
+    if eval_start is not None:
+        setups[dates < pd.Timestamp(eval_start)] = "-"
+    setups[np.isnan(ohlc[3])] = "-"
+    t, j = np.nonzero(setups != "-")
+    if len(t) == 0:
+        return pd.DataFrame()
+    levels = strategy_levels(panel, sig)
+    trail = None
+    if params.get("trail_ma"):
+        trail = _rolling(ohlc[3], int(params["trail_ma"]))
+
+    # calculate_strategies 순위: 적합한 전략 우선, 그 안에서 리스크 낮은 순
+    keys = np.vstack([(~levels[s][3][t, j]) * 1e6 + levels[s][2][t, j] for s in STRATEGIES])
+    ranks = keys.argsort(axis=0, kind="stable").argsort(axis=0) + 1
+
+    out = []
+    for i, name in enumerate(STRATEGIES):
+        entry, stop, risk, ok = (a[t, j] for a in levels[name])
+        res = simulate_trades(ohlc, t, j, entry, stop, params, trail)
+        # 손절폭이 너무 좁으면 R이 비정상적으로 커지므로 집계에서 제외
+        res["reason"] = np.where(risk < params.get("min_risk_pct", 0), "tiny_risk", res["reason"])
+        eb = np.clip(res["entry_bar"], 0, len(dates) - 1)
+        xb = np.clip(res["exit_bar"], 0, len(dates) - 1)
+        out.append(pd.DataFrame({
+            "date": dates[t], "code": codes[j], "setup": setups[t, j], "strategy": name,
+            "candidate": ok, "rank": ranks[i], "entry": entry, "stop": stop, "risk_pct": risk,
+            "filled": res["filled"], "entry_date": np.where(res["filled"], dates[eb], pd.NaT),
+            "exit_date": np.where(np.isfinite(res["exit_px"]), dates[xb], pd.NaT),
+            "entry_px": res["entry_px"], "exit_px": res["exit_px"],
+            "r": res["r"], "ret_pct": res["ret_pct"], "reason": res["reason"],
+            "hold": np.where(np.isfinite(res["exit_px"]), res["exit_bar"] - res["entry_bar"], np.nan),
+        }))
+    return pd.concat(out, ignore_index=True)
+
+
+def _load(code, start, end):
+    try:
+        return code, get_prices(code, start, end)
+    except Exception:
+        return code, None
+
+
+def _backtest_chunk(codes, start, end, eval_start, cfg, params):
+    frames = dict(_load(code, start, end) for code in codes)
+    return backtest_panel(build_panel(frames), cfg, params, eval_start=eval_start)
+
+
+def run_backtest(codes, cfg, params=None, end=None):
+    """유니버스 백테스트 → 거래 목록 (종목 chunk_size개씩 프로세스 풀로 병렬)"""
+    params = {**DEFAULT_PARAMS, **(cfg.get("backtest") or {}), **(params or {})}
+    end = pd.Timestamp(end or datetime.now()).normalize()
+    eval_start = end - timedelta(days=int(365 * float(params["years"])))
+    start = eval_start - timedelta(days=WARMUP_DAYS)
+    size = max(1, int(params["chunk_size"]))
+    chunks = [codes[i:i + size] for i in range(0, len(codes), size)]
+    task = partial(_backtest_chunk, start=start, end=end, eval_start=eval_start, cfg=cfg, params=params)
+    workers = int(params["workers"] or 1)
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=http_client.init_worker, initargs=(workers,)) as pool:
+            parts = list(pool.map(task, chunks))
+    else:
+        parts = list(map(task, chunks))
+    parts = [p for p in parts if not p.empty]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def max_drawdown_r(trades):
+    """청산일 순서로 R을 누적했을 때 최대 낙폭 (R 단위)"""
+    r = trades.sort_values("exit_date", kind="stable")["r"].to_numpy()
+    if len(r) == 0:
+        return 0.0
+    equity = np.concatenate([[0.0], np.cumsum(r)])
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+def summarize_trades(trades, by):
+    """청산된 거래 기준 그룹별 성과 (승률, 기대값, R 배수, 최대 낙폭)"""
+    closed = trades[trades["reason"].isin(["stop", "target", "trail", "time"])]
+    rows = []
+    for key, g in closed.groupby(by, sort=False, observed=True):
+        r = g["r"]
+        wins, losses = r[r > 0], r[r <= 0]
+        rows.append({
+            by: key, "trades": len(g),
+            "hit_rate": round(len(wins) / len(g) * 100, 1),
+            "expectancy_r": round(r.mean(), 3),
+            "avg_win_r": round(wins.mean(), 3) if len(wins) else 0.0,
+            "avg_loss_r": round(losses.mean(), 3) if len(losses) else 0.0,
+            "profit_factor": round(wins.sum() / -losses.sum(), 2) if losses.sum() < 0 else np.inf,
+            "avg_ret_pct": round(g["ret_pct"].mean(), 2),
+            "max_dd_r": round(max_drawdown_r(g), 2),
+            "avg_hold": round(g["hold"].mean(), 1),
+            "stop_pct": round((g["reason"] == "stop").mean() * 100, 1),
+        })
+    return pd.DataFrame(rows)
+
+
+def backtest_report(trades):
+    """셋업별(1순위 전략으로 거래) + 전략별(적합 판정된 경우만) 성과표"""
+    by_setup = summarize_trades(trades[trades["rank"] == 1], "setup")
+    by_strategy = summarize_trades(trades[trades["candidate"]], "strategy")
+    return by_setup, by_strategy
+
+
+def load_config():
+    with open("config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def main():
+    from update_daily import get_stock_list
+
+    cfg = load_config()
+    params = {**DEFAULT_PARAMS, **(cfg.get("backtest") or {})}
+    stocks = get_stock_list(cfg)
+    codes = stocks["Code"].astype(str).str.zfill(6).head(int(cfg["universe"]["top_n_stocks"])).tolist()
+    print(f"[BACKTEST] {len(codes)}개 종목 × {params['years']}년, workers={params['workers']}")
+    started = time.perf_counter()
+    trades = run_backtest(codes, cfg, params)
+    print(f"[BACKTEST] 시그널 {len(trades) // len(STRATEGIES) if len(trades) else 0}개, {time.perf_counter() - started:.1f}초")
+    if trades.empty:
+        return
+    by_setup, by_strategy = backtest_report(trades)
+    print("\n[셋업별 (1순위 전략)]")
+    print(by_setup.to_string(index=False))
+    print("\n[전략별 (적합 판정 시)]")
+    print(by_strategy.to_string(index=False))
+
+    day = datetime.now().strftime("%Y-%m-%d")
+    os.makedirs(BACKTEST_DIR, exist_ok=True)
+    trades.to_parquet(os.path.join(BACKTEST_DIR, f"trades_{day}.parquet"), index=False)
+    pd.concat([by_setup.assign(group="setup").rename(columns={"setup": "key"}),
+               by_strategy.assign(group="strategy").rename(columns={"strategy": "key"})]) \
+        .to_csv(os.path.join(BACKTEST_DIR, f"report_{day}.csv"), index=False, encoding="utf-8-sig")
+
+
+if __name__ == "__main__":
+    main()
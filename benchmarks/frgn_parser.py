@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+frgn.naver 수급 표 파서 벤치마크 - 기존 read_html + iterrows 경로 vs 전용 파서
+실행: python -m benchmarks.frgn_parser  (저장소 루트에서)
+fixtures/frgn_*.html 은 네이버 응답과 같은 euc-kr 페이지
+"""
+import glob
+import os
+import time
+from io import StringIO
+
+import pandas as pd
+
+from investor_store import parse_naver_frgn, parse_naver_frgn_read_html, summarize_flows
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_investor_summary(html):
+    """기존 update_daily.get_investor_data의 네이버 파싱 (모든 표 read_html → 행별 문자열 정리)"""
+    dfs = pd.read_html(StringIO(html))
+    target_df = None
+    for df in dfs:
+        cols_str = ' '.join(str(c) for c in df.columns)
+        if '기관' in cols_str or '외국인' in cols_str:
+            target_df = df
+            break
+    if target_df is None and len(dfs) >= 2:
+        target_df = dfs[1]
+    df_clean = target_df.dropna(how='all').head(10)
+    foreign_sum, inst_sum, consecutive_buy = 0, 0, 0
+    frgn_col, inst_col, price_col = None, None, None
+    for col in df_clean.columns:
+        col_str = str(col).lower()
+        if '외국인' in col_str and frgn_col is None: frgn_col = col
+        if '기관' in col_str and inst_col is None: inst_col = col
+        if '종가' in col_str and price_col is None: price_col = col
+    count, consecutive_counting = 0, True
+    for _, data_row in df_clean.iterrows():
+        if count >= 5: break
+        try:
+            price = 1
+            if price_col:
+                ps = str(data_row[price_col]).replace(',', '').replace('+', '').replace('-', '')
+                if ps and ps != 'nan': price = float(ps)
+            if frgn_col:
+                fv = str(data_row[frgn_col]).replace(',', '').replace('+', '')
+                if fv and fv != 'nan':
+                    fn = float(fv)
+                    foreign_sum += fn * price
+                    if consecutive_counting and fn > 0: consecutive_buy += 1
+                    else: consecutive_counting = False
+            if inst_col:
+                iv = str(data_row[inst_col]).replace(',', '').replace('+', '')
+                if iv and iv != 'nan': inst_sum += float(iv) * price
+            count += 1
+        except: continue
+    return {"foreign_consecutive_buy": consecutive_buy, "foreign_net_buy_5d": float(foreign_sum), "inst_net_buy_5d": float(inst_sum)}
+
+
+def _best_of(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, "frgn_*.html")))
+    print(f"{'fixture':<20}{'rows':>6}{'legacy(ms)':>12}{'read_html(ms)':>15}{'parser(ms)':>12}{'speedup':>9}")
+    for path in paths:
+        with open(path, "rb") as f:
+            html = f.read().decode("cp949")
+        fast = parse_naver_frgn(html)
+        assert fast.equals(parse_naver_frgn_read_html(html))
+        assert summarize_flows(fast) == legacy_investor_summary(html)
+        t_legacy = _best_of(lambda: legacy_investor_summary(html))
+        t_read = _best_of(lambda: parse_naver_frgn_read_html(html))
+        t_fast = _best_of(lambda: summarize_flows(parse_naver_frgn(html)), repeat=200)
+        name = os.path.basename(path)
+        print(f"{name:<20}{len(fast):>6}{t_legacy * 1e3:>12.2f}{t_read * 1e3:>15.2f}{t_fast * 1e3:>12.3f}{t_legacy / t_fast:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+percentile_rank 벤치마크 - 기존 rolling().apply 콜백 vs NumPy 커널
+실행: python -m benchmarks.percentile_rank  (저장소 루트에서)
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from scanner_core import percentile_rank
+
+
+def legacy_percentile_rank(s, lookback):
+    """기존 구현 (봉마다 파이썬 콜백 호출)"""
+    def pct(x):
+        if len(x) < 2: return np.nan
+        return 100.0 * (np.sum(x <= x[-1]) - 1) / (len(x) - 1)
+    return s.rolling(lookback).apply(pct, raw=True)
+
+
+def _bbw_like(n_bars, n_tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    a = np.abs(rng.normal(0.2, 0.05, (n_bars, n_tickers)))
+    a[:59] = np.nan  # 볼린저 워밍업 구간
+    a[rng.random(a.shape) < 0.001] = np.nan
+    return pd.DataFrame(a)
+
+
+def _best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    print(f"{'case':<24}{'lookback':>9}{'legacy(ms)':>12}{'kernel(ms)':>12}{'speedup':>9}")
+    for n_bars, n_tickers in [(400, 1), (2000, 1), (400, 100)]:
+        df = _bbw_like(n_bars, n_tickers)
+        for lookback in (60, 120, 250):
+            legacy = lambda: [legacy_percentile_rank(df[c], lookback) for c in df.columns]
+            kernel = lambda: percentile_rank(df, lookback)
+            expected = pd.concat(legacy(), axis=1)
+            assert np.array_equal(expected.to_numpy(), kernel().to_numpy(), equal_nan=True)
+            t_old, t_new = _best_of(legacy), _best_of(kernel)
+            case = f"{n_bars} bars x {n_tickers}"
+            print(f"{case:<24}{lookback:>9}{t_old * 1e3:>12.2f}{t_new * 1e3:>12.2f}{t_old / t_new:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+scanner_core 벤치마크 - 함수별 소요 시간/최대 메모리를 JSON으로 저장하고 기준(baseline)과 비교
+- 합성 데이터: 종목 수(1/100/1000) × 봉 수(250/400/2000), 시드가 같으면 항상 같은 OHLCV
+- 저장된 데이터: data/prices/*.parquet (price_store 저장소)가 있으면 같은 함수들을 실제 일봉으로도 측정
+- step1: update_daily의 STEP1 종목 루프 (_scan_ticker). 가격 조회는 위 데이터로 대체
+  step1_stream: 같은 종목들을 전날까지의 지표 상태(scanner_stream, 임시 디렉터리)에 새 봉 하나만 반영해 점수/전략 계산
+  → STEP1에 증분 경로를 넣을지 판단용 (step1보다 확실히 빨라야 넣음)
+실행 (저장소 루트에서):
+  python -m benchmarks.scanner                       # 전체, 결과 JSON 저장
+  python -m benchmarks.scanner --quick               # 1000종목 케이스 제외
+  python -m benchmarks.scanner --save-baseline       # 결과를 기준으로 저장
+  python -m benchmarks.scanner --threshold 0.2       # 기준보다 20% 넘게 느려진 항목이 있으면 종료 코드 1
+                                                     # (기준이 없거나 합성 데이터 버전이 다르면 종료 코드 2)
+기준 파일은 측정한 머신에서만 의미가 있으므로 저장소에 넣지 않음 → 비교할 머신에서 먼저 --save-baseline
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import yaml
+
+import update_daily
+import scanner_stream
+from price_store import PRICE_DIR, load_prices
+from scanner_core import (adx, bandwidth, bollinger_bands, calculate_signals, calculate_signals_tail,
+                          calculate_strategies, percentile_rank, score_stock)
+
+RESULT_DIR = os.path.join(os.path.dirname(__file__), "results")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline", "scanner.json")
+GENERATOR_VERSION = 2  # synthetic_ohlcv 출력이 바뀌면 올림 (버전이 다른 기준과는 비교하지 않음). 2: 거래량 lognormal(13.5)
+DEFAULT_THRESHOLD = 0.2
+TICKERS = (1, 100, 1000)
+BARS = (250, 400, 2000)
+SYNTH_END = "2026-01-30"
+MEMORY_SAMPLE = 20   # 메모리는 앞쪽 이 개수 종목만 tracemalloc으로 측정 (추적 중에는 느려지므로 시간과 따로)
+MIN_DELTA_SEC = 0.002  # 이보다 작은 차이는 회귀로 보지 않음 (측정 잡음)
+STREAM_WARMUP_BARS = 300  # step1_stream 지표 상태를 만들 때 쓰는 최근 봉 수 (MA200/밴드폭 백분위 창보다 길게)
+
+
+def synthetic_ohlcv(n_bars, seed, end=SYNTH_END):
+    """
+    결정적 합성 일봉 (같은 n_bars/seed면 항상 같은 값)
+    구간마다 추세가 바뀌는 로그 랜덤워크 + 두꺼운 꼬리 수익률 + 가끔 거래량 급증(클라이맥스/돌파 시그널이 나오도록)
+    """
+    rng = np.random.default_rng(seed)
+    regime = np.repeat(rng.normal(0, 0.0015, n_bars // 60 + 1), 60)[:n_bars]
+    ret = regime + 0.018 * rng.standard_t(4, n_bars) / np.sqrt(2)
+    close = np.round(20000 * np.exp(np.cumsum(ret)))
+    prev = np.concatenate([[close[0]], close[:-1]])
+    open_ = np.round(prev * (1 + rng.normal(0, 0.004, n_bars)))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.008, n_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.008, n_bars)))
+    volume = rng.lognormal(13.5, 0.4, n_bars) * np.where(rng.random(n_bars) < 0.01, rng.uniform(3, 8, n_bars), 1)
+    df = pd.DataFrame({"Open": open_, "High": np.round(high), "Low": np.round(low), "Close": close,
+                       "Volume": np.round(volume)}, index=pd.bdate_range(end=end, periods=n_bars, name="Date"))
+    df["Change"] = df["Close"].pct_change()
+    return df
+
+
+def synthetic_universe(n_tickers, n_bars, seed=0):
+    """{코드: 일봉} (코드는 가짜 6자리)"""
+    return {f"{900000 + i:06d}": synthetic_ohlcv(n_bars, seed * 100003 + i) for i in range(n_tickers)}
+
+
+def recorded_universe(limit, price_dir=PRICE_DIR):
+    """data/prices 에 저장된 일봉 (없으면 빈 dict)"""
+    frames = {}
+    for path in sorted(glob.glob(os.path.join(price_dir, "*.parquet")))[:limit]:
+        code = os.path.basename(path)[:-len(".parquet")]
+        df = load_prices(code, price_dir=price_dir)
+        if df is not None and len(df) >= 200:
+            frames[code] = df
+    return frames
+
+
+def _ticker_rows(codes):
+    """STEP1 입력 행 (data/krx_tickers.csv에 있는 코드는 실제 종목명 사용)"""
+    names = {}
+    path = os.path.join("data", "krx_tickers.csv")
+    if os.path.exists(path):
+        t = pd.read_csv(path, dtype={"Code": str}, encoding="utf-8-sig")
+        names = dict(zip(t["Code"].str.zfill(6), t["Name"]))
+    return [{"Code": c, "Name": names.get(c, f"BENCH{c}"), "Market": "KOSPI", "Marcap": 1e12, "Sector": "기타"}
+            for c in codes]
+
+
+def _prepare(frames, cfg):
+    """함수별 입력을 미리 계산 (측정 대상 함수 시간만 재도록)"""
+    bb = cfg.get("bollinger", {})
+    prep = []
+    for df in frames.values():
+        mid, upper, lower = bollinger_bands(df["Close"], int(bb.get("length", 60)), float(bb.get("stdev", 2.0)))
+        sig = calculate_signals_tail(df, cfg)
+        prep.append((df, bandwidth(mid, upper, lower), sig))
+    return prep
+
+
+def benchmark_functions(frames, cfg):
+    """{함수: 인자 목록을 받아 전 종목에 한 번씩 실행하는 함수}"""
+    lookback = int(cfg.get("bollinger", {}).get("bandwidth_lookback", 120))
+    rows = _ticker_rows(list(frames))
+    start, end = pd.Timestamp("1990-01-01"), pd.Timestamp.now()
+
+    state_dir = tempfile.mkdtemp(prefix="bench_stream_")
+
+    def step1(prep):
+        # 네트워크 없이 STEP1 한 종목 처리 전체 (가격 조회 → 시그널 → 점수 → 전략)
+        with mock.patch.object(update_daily, "get_prices", lambda code, s, e: frames.get(code)):
+            for row in rows[:len(prep)]:
+                update_daily._scan_ticker(row, cfg, start, end)
+
+    def step1_stream(prep):
+        # 상태 읽기/확인 → 새 봉 반영 → 저장 → 점수/전략 (상태를 못 쓰면 step1과 같은 전체 계산)
+        for code in list(frames)[:len(prep)]:
+            df = frames[code]
+            state = scanner_stream.scan_state(code, df, cfg, state_dir=state_dir)
+            if state is not None:
+                scanner_stream.score_state(state, cfg, mktcap=1e12)
+            else:
+                sig = calculate_signals_tail(df, cfg)
+                score_stock(df, sig, cfg, mktcap=1e12)
+                calculate_strategies(df, sig, cfg)
+
+    def warm_states(prep):
+        # 전날까지의 상태 → 측정 때는 마지막 봉 하나만 반영 (첫 반복 이후에는 반영할 봉 없이 확인/점수만)
+        for code in list(frames)[:len(prep)]:
+            df = frames[code].iloc[-STREAM_WARMUP_BARS - 1:-1]
+            scanner_stream.save_state(code, scanner_stream.init_state(df, cfg), state_dir)
+
+    step1_stream.warmup = warm_states
+    return {
+        "percentile_rank": lambda prep: [percentile_rank(bbw, lookback) for _, bbw, _ in prep],
+        "adx": lambda prep: [adx(df["High"], df["Low"], df["Close"], 14) for df, _, _ in prep],
+        "calculate_signals": lambda prep: [calculate_signals(df, cfg) for df, _, _ in prep],
+        "calculate_signals_tail": lambda prep: [calculate_signals_tail(df, cfg) for df, _, _ in prep],
+        "score_stock": lambda prep: [score_stock(df, sig, cfg, mktcap=1e12) for df, _, sig in prep],
+        "calculate_strategies": lambda prep: [calculate_strategies(df, sig, cfg) for df, _, sig in prep],
+        "step1": step1,
+        "step1_stream": step1_stream,
+    }
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def _peak_kb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(frames, cfg, only=None):
+    """케이스 하나 (같은 종목들에 함수별로) → {함수: {seconds, per_ticker_ms, peak_kb}}"""
+    prep = _prepare(frames, cfg)
+    n = len(prep)
+    repeat = max(1, min(5, 100 // max(n, 1)))  # 작은 케이스는 여러 번 재서 최솟값
+    out = {}
+    for name, fn in benchmark_functions(frames, cfg).items():
+        if only and name not in only:
+            continue
+        if hasattr(fn, "warmup"):
+            fn.warmup(prep)  # 측정 전 준비 (시간에 넣지 않음)
+        seconds = _best_of(lambda: fn(prep), repeat)
+        out[name] = {
+            "seconds": round(seconds, 5),
+            "per_ticker_ms": round(seconds / n * 1e3, 4),
+            "peak_kb": round(_peak_kb(lambda: fn(prep[:MEMORY_SAMPLE])), 1),
+        }
+    return out
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment():
+    return {
+        "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+        "platform": platform.platform(), "cpu_count": os.cpu_count(), "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def baseline_problem(baseline, path):
+    """기준과 비교할 수 없는 이유 (비교 가능하면 None)"""
+    if baseline is None:
+        return f"기준 파일 없음 ({path}) - 먼저 --save-baseline으로 저장"
+    version = baseline.get("generator_version", 1)  # 버전 기록 전 기준은 1
+    if version != GENERATOR_VERSION:
+        return f"기준의 합성 데이터 버전 {version} ≠ 현재 {GENERATOR_VERSION} - 입력이 달라 비교하지 않음, 기준을 다시 저장"
+    return None
+
+
+def compare(results, baseline, threshold):
+    """기준 대비 느려진 항목 목록 [(케이스, 함수, 기준 초, 현재 초, 비율)]"""
+    regressions = []
+    for case, funcs in results["results"].items():
+        for name, cur in funcs.items():
+            base = baseline.get("results", {}).get(case, {}).get(name)
+            if not base or not base.get("seconds"):
+                continue
+            ratio = cur["seconds"] / base["seconds"]
+            if ratio > 1 + threshold and cur["seconds"] - base["seconds"] > MIN_DELTA_SEC:
+                regressions.append((case, name, base["seconds"], cur["seconds"], ratio))
+    return regressions
+
+
+def print_case(case, funcs, baseline=None):
+    base = (baseline or {}).get("results", {}).get(case, {})
+    print(f"\n[{case}]")
+    print(f"{'function':<24}{'total(s)':>10}{'per ticker(ms)':>16}{'peak(KB)':>11}{'vs base':>9}")
+    for name, r in funcs.items():
+        b = base.get(name, {}).get("seconds")
+        vs = f"{r['seconds'] / b:>8.2f}x" if b else f"{'-':>9}"
+        print(f"{name:<24}{r['seconds']:>10.3f}{r['per_ticker_ms']:>16.3f}{r['peak_kb']:>11.0f}{vs}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="scanner_core benchmark")
+    parser.add_argument("--quick", action="store_true", help="1000종목 케이스 제외")
+    parser.add_argument("--tickers", type=int, nargs="+", default=None)
+    parser.add_argument("--bars", type=int, nargs="+", default=None)
+    parser.add_argument("--only", nargs="+", default=None, help="측정할 함수 이름")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본: benchmarks/results/scanner_<시각>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="허용 느려짐 비율 (기본 0.2 = 20%%). 지정하면 기준과 비교할 수 없을 때 종료 코드 2")
+    args = parser.parse_args(argv)
+    threshold = DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+
+    with open("config.yaml", "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    tickers = args.tickers or [n for n in TICKERS if not (args.quick and n >= 1000)]
+    bars = args.bars or list(BARS)
+    baseline = problem = None
+    if not args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        problem = baseline_problem(baseline, args.baseline)
+        if problem:
+            print(f"[WARN] 기준 비교 안 함: {problem}")
+            baseline = None
+
+    results = {"environment": environment(), "generator_version": GENERATOR_VERSION, "seed": args.seed, "results": {}}
+    cases = [(f"synthetic_{n}x{b}", lambda n=n, b=b: synthetic_universe(n, b, args.seed)) for n in tickers for b in bars]
+    cases.append((f"recorded_{max(tickers)}", lambda: recorded_universe(max(tickers))))
+    for case, load in cases:
+        frames = load()
+        if not frames:
+            print(f"\n[{case}] 저장된 일봉 없음 ({PRICE_DIR}) - 건너뜀")
+            continue
+        started = time.perf_counter()
+        results["results"][case] = run_case(frames, cfg, args.only)
+        print_case(case, results["results"][case], baseline)
+        print(f"  ({len(frames)}종목, {time.perf_counter() - started:.1f}초)")
+
+    out = args.out or os.path.join(RESULT_DIR, f"scanner_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    paths = [out] + ([args.baseline] if args.save_baseline else [])
+    for path in paths:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n[BENCH] 저장: {', '.join(paths)}")
+
+    if problem:
+        print(f"[WARN] 기준 비교 안 함: {problem}")
+        return 2 if args.threshold is not None else 0
+    if baseline:
+        regressions = compare(results, baseline, threshold)
+        for case, name, b, c, ratio in regressions:
+            print(f"[REGRESSION] {case} {name}: {b:.3f}s → {c:.3f}s ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"[BENCH] 기준 대비 {threshold:.0%} 넘게 느려진 항목 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+chart_utils.py - 종목 차트용 계산 (streamlit/plotly 없이 pandas/numpy만 사용)
+- chart_markers: 불기둥/클라이맥스/오닐 패턴 위치를 봉 전체에 대해 한 번에 계산 (불리언 마스크)
+- downsample_ohlcv: 봉이 많을 때 k개 봉씩 묶어서 그릴 점 수를 줄임 (LOD)
+"""
+import numpy as np
+import pandas as pd
+
+FIRE_VOL_MULT = 2.0     # 불기둥: 거래량 20일 평균 대비 배수
+FIRE_JUMP = 1.05        # 불기둥: 전일 종가 대비 상승
+CLIMAX_VOL_MULT = 3.0   # 클라이맥스: 거래량 20일 평균 대비 배수 (눌림목 손절 기준 봉과 같은 정의)
+POCKET_VOL_MULT = 2.0   # 오닐 Pocket Pivot 거래량 배수
+MAX_CHART_POINTS = 400  # 이보다 봉이 많으면 묶어서 그림
+
+
+def chart_markers(df):
+    """
+    OHLCV → {"fire": 마스크, "climax": 마스크, "oneil": 패턴명 Series("" = 없음)}
+    오닐 패턴 우선순위는 전략 계산과 같음 (Inside Day > Oops Reversal > Pocket Pivot)
+    """
+    o, h, l, c, v = (df[k].to_numpy(dtype=float) for k in ("Open", "High", "Low", "Close", "Volume"))
+    vol_ma = df["Volume"].rolling(20).mean().to_numpy()
+    prev = lambda a: np.concatenate([[np.nan], a[:-1]])
+    pc, ph, pl = prev(c), prev(h), prev(l)
+    with np.errstate(invalid="ignore"):
+        up = c > o
+        fire = (v > vol_ma * FIRE_VOL_MULT) & up & (c > pc * FIRE_JUMP)
+        climax = v >= vol_ma * CLIMAX_VOL_MULT
+        inside = (h < ph) & (l > pl)
+        oops = (o < pl) & (c > pl)
+        pocket = (v > vol_ma * POCKET_VOL_MULT) & up
+    oneil = np.select([inside, oops, pocket], ["Inside Day", "Oops Reversal", "Pocket Pivot"], default="")
+    return {
+        "fire": pd.Series(fire, index=df.index),
+        "climax": pd.Series(climax, index=df.index),
+        "oneil": pd.Series(oneil, index=df.index),
+    }
+
+
+def downsample_ohlcv(df, max_points=MAX_CHART_POINTS):
+    """
+    봉 수가 max_points보다 많으면 k개씩 묶음 (시가=첫 봉, 고가=최고, 저가=최저, 종가/보조선=마지막 봉, 거래량=합)
+    마지막 묶음이 항상 최신 봉으로 끝나도록 뒤에서부터 묶음. 반환: (DataFrame, k)
+    """
+    n = len(df)
+    if not max_points or n <= max_points:
+        return df, 1
+    k = int(np.ceil(n / max_points))
+    group = (np.arange(n) - n % k) // k  # 앞쪽 자투리 봉은 -1 그룹으로 따로 묶임
+    agg = {col: "last" for col in df.columns}
+    agg.update({"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"})
+    out = df.groupby(group, sort=True).agg({col: agg[col] for col in df.columns})
+    last = np.flatnonzero(np.diff(group, append=group[-1] + 1))  # 묶음마다 마지막 봉 위치
+    out.index = df.index[last]
+    return out, k
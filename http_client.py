@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+http_client.py - 외부 사이트 호출용 공용 HTTP 클라이언트
+- 프로세스 전체가 하나의 requests.Session을 공유 (연결 재사용 + 쿠키 유지)
+- 호스트별 동시 요청 수 제한과 토큰 버킷 속도 제한
+- 실패/429/5xx 응답은 지수 백오프 + 지터로 재시도
+- 요청 수, 재시도 수, 지연 시간 카운터 (stats)
+프로세스 풀: fork된 자식은 부모의 세션(연결)과 limiter를 버리고 새로 만듦 (소켓 공유 방지)
+호스트 한도는 작업 전체 기준 - 풀 initializer로 init_worker(워커 수)를 주면 각 워커가 한도를 워커 수로 나눠 씀
+(initializer 없이 만든 풀의 워커는 프로세스마다 전체 한도를 씀)
+"""
+import os
+import time
+import random
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 기본 호스트 한도 (config.yaml의 http.hosts로 덮어씀)
+DEFAULT_HOST_LIMITS = {
+    "finance.naver.com": {"concurrency": 4, "rate": 5.0},
+    "finance.daum.net": {"concurrency": 2, "rate": 2.0},
+    "openapi.naver.com": {"concurrency": 4, "rate": 8.0},
+    "fchart.stock.naver.com": {"concurrency": 4, "rate": 10.0},
+}
+FALLBACK_LIMIT = {"concurrency": 4, "rate": 5.0}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+
+
+class HostLimiter:
+    """호스트 하나의 동시 요청 수(세마포어) + 초당 요청 수(토큰 버킷) 제한"""
+
+    def __init__(self, concurrency=4, rate=5.0, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, concurrency))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max(1, int(concurrency)))
+
+    def _take_token(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate if self.rate > 0 else 0.1
+            time.sleep(wait)
+
+    def __enter__(self):
+        self.slots.acquire()
+        try:
+            self._take_token()
+        except BaseException:
+            self.slots.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.slots.release()
+        return False
+
+
+_limiters = {}
+_limits = dict(DEFAULT_HOST_LIMITS)
+_registry_lock = threading.Lock()
+_session = None
+_stats = {}
+_stats_lock = threading.Lock()
+_process_share = 1  # 호스트 한도를 나눠 쓰는 프로세스 수 (init_worker에서 설정)
+
+
+def _reset_after_fork():
+    """fork된 자식: 부모의 세션(keep-alive 소켓), limiter, 카운터, 잠금을 물려받지 않음"""
+    global _session, _registry_lock, _stats_lock
+    _registry_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _session = None
+    _limiters.clear()
+    _stats.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def init_worker(share=1, host_limits=None):
+    """
+    프로세스 풀 initializer: 호스트 한도(동시 요청 수/초당 요청 수)를 share개 워커로 나눔
+    예: ProcessPoolExecutor(workers, initializer=http_client.init_worker, initargs=(workers,))
+    """
+    global _process_share
+    _reset_after_fork()  # spawn 방식이면 이미 새 프로세스지만 같은 상태로 맞춤
+    _process_share = max(1, int(share))
+    configure_hosts(host_limits)
+
+
+def configure_hosts(host_limits):
+    """{host: {"concurrency": n, "rate": r}} 로 호스트 한도 설정 (이미 만든 limiter는 새로 만듦)"""
+    with _registry_lock:
+        for host, lim in (host_limits or {}).items():
+            _limits[host] = {**FALLBACK_LIMIT, **_limits.get(host, {}), **lim}
+            _limiters.pop(host, None)
+
+
+def host_limit(url):
+    """URL의 호스트에 해당하는 limiter (with 문으로 사용)"""
+    host = urlparse(url).hostname or ""
+    with _registry_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            lim = _limits.get(host, FALLBACK_LIMIT)
+            share = _process_share
+            burst = lim.get("burst")
+            limiter = _limiters[host] = HostLimiter(max(1, int(lim["concurrency"]) // share), float(lim["rate"]) / share,
+                                                    None if burst is None else max(1.0, float(burst) / share))
+    return limiter
+
+
+def get_session():
+    """공유 세션 (처음 호출 시 생성). 호스트별 연결 풀을 스레드 수만큼 유지"""
+    global _session
+    with _registry_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _session = session
+        return _session
+
+
+def _record(host, latency=None, retry=False, error=False):
+    with _stats_lock:
+        s = _stats.setdefault(host, {"requests": 0, "retries": 0, "errors": 0, "latency_sum": 0.0, "latency_max": 0.0})
+        if retry:
+            s["retries"] += 1
+        elif error:
+            s["errors"] += 1
+        if latency is not None:
+            s["requests"] += 1
+            s["latency_sum"] += latency
+            s["latency_max"] = max(s["latency_max"], latency)
+
+
+def get(url, params=None, headers=None, timeout=10, retries=2, backoff=0.5, max_backoff=8.0):
+    """
+    GET 요청 (호스트 한도 적용 + 재시도)
+    - 연결 오류/타임아웃, 429/5xx 응답은 backoff * 2^n (+ 지터) 만큼 쉬고 재시도
+    - 재시도 후에도 실패하면 마지막 예외를 올리고, 상태 코드 오류는 마지막 응답을 그대로 반환
+    """
+    host = urlparse(url).hostname or ""
+    session = get_session()
+    for attempt in range(retries + 1):
+        started = time.perf_counter()
+        try:
+            with host_limit(url):
+                r = session.get(url, params=params, headers=headers, timeout=timeout)
+            _record(host, latency=time.perf_counter() - started)
+            if r.status_code not in RETRY_STATUSES or attempt == retries:
+                return r
+        except requests.exceptions.RequestException:
+            _record(host, latency=time.perf_counter() - started, error=True)
+            if attempt == retries:
+                raise
+        _record(host, retry=True)
+        delay = min(max_backoff, backoff * (2 ** attempt))
+        time.sleep(delay * random.uniform(0.5, 1.0) + random.uniform(0, 0.1))
+
+
+def ensure_cookies(url, headers=None, timeout=5):
+    """세션에 해당 도메인 쿠키가 없을 때만 url을 한 번 방문 (Daum API 호출 전 쿠키 준비)"""
+    host = urlparse(url).hostname or ""
+    session = get_session()
+    if any(host.endswith(c.domain.lstrip(".")) for c in session.cookies):
+        return
+    try:
+        get(url, headers=headers, timeout=timeout, retries=0)
+    except requests.exceptions.RequestException:
+        pass
+
+
+def stats():
+    """호스트별 요청/재시도/오류 수와 평균·최대 지연(초)"""
+    with _stats_lock:
+        out = {}
+        for host, s in _stats.items():
+            out[host] = {**s, "latency_avg": s["latency_sum"] / s["requests"] if s["requests"] else 0.0}
+        return out
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def print_stats(prefix="[HTTP]"):
+    for host, s in sorted(stats().items()):
+        print(f"{prefix} {host}: 요청 {s['requests']} / 재시도 {s['retries']} / 오류 {s['errors']} / "
+              f"평균 {s['latency_avg'] * 1000:.0f}ms / 최대 {s['latency_max'] * 1000:.0f}ms")
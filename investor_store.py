@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+investor_store.py - 종목별 외국인/기관 일별 순매매 로컬 저장소
+data/investor/{code}.parquet 에 (거래일별) 종가·외국인·기관 순매매량을 보관합니다.
+수급 데이터는 하루에 한 번만 바뀌므로, 마지막 확정 거래일까지 저장돼 있으면 다시 조회하지 않고
+모자라면 빠진 날짜만큼만 받아서 붙입니다. (update_daily와 app이 같이 사용)
+"""
+import os
+import re
+from io import StringIO
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import http_client
+
+INVESTOR_DIR = os.path.join("data", "investor")
+FLOW_COLS = ["Close", "Foreign", "Institution"]
+NAVER_FINANCE_URL = "https://finance.naver.com"
+DAUM_FINANCE_URL = "https://finance.daum.net"
+NAVER_PAGE_ROWS = 20      # frgn.naver 한 페이지의 거래일 수
+FLOW_FINAL_HOUR = 18      # KST 이 시각 이후에야 당일 외국인/기관 수급이 확정됨
+
+NAVER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Referer': 'https://finance.naver.com/',
+}
+
+
+def get_kst_now():
+    return datetime.utcnow() + timedelta(hours=9)
+
+
+def expected_last_date(now=None):
+    """now(KST) 시점에 수급이 확정된 마지막 거래일 (공휴일은 모르므로 평일 기준)"""
+    now = now or get_kst_now()
+    d = now.date() if now.hour >= FLOW_FINAL_HOUR else now.date() - timedelta(days=1)
+    return pd.Timestamp(np.busday_offset(d, 0, roll="backward"))
+
+
+def _empty():
+    return pd.DataFrame(columns=FLOW_COLS, index=pd.DatetimeIndex([], name="Date"), dtype=float)
+
+
+def _to_number(s):
+    return pd.to_numeric(s.astype(str).str.replace(',', '').str.replace('+', ''), errors='coerce')
+
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_DATE_RE = re.compile(r"(\d{4})\.(\d{2})\.(\d{2})")
+# 수급 표 열 순서: 날짜, 종가, 전일비, 등락률, 거래량, 기관 순매매량, 외국인 순매매량, 보유주수, 보유율
+FRGN_NCOLS = 9
+FRGN_COLS = {"Close": 1, "Foreign": 6, "Institution": 5}
+
+
+def _frgn_table(html):
+    """'순매매량' 헤더가 있는 표 하나만 잘라냄 (없으면 None)"""
+    pos = html.find("순매매량")
+    if pos < 0:
+        return None
+    start, end = html.rfind("<table", 0, pos), html.find("</table>", pos)
+    if start < 0 or end < 0:
+        return None
+    table = html[start:end]
+    # 헤더 순서가 예상과 다르면 고정 열 위치를 쓸 수 없음
+    head = table[table.find("<th"):table.find("<tbody")] if "<tbody" in table else table
+    if not (0 <= head.find("종가") < head.find("기관") < head.find("외국인")):
+        return None
+    return table
+
+
+def parse_naver_frgn(html):
+    """
+    frgn.naver HTML → 날짜별 종가/외국인/기관 순매매량 (최신일이 위)
+    수급 표만 잘라 행/칸을 문자열 split으로 나누고 필요한 3개 열만 숫자로 변환
+    표를 못 찾으면 read_html 방식으로 대체
+    """
+    table = _frgn_table(html)
+    if table is None:
+        return parse_naver_frgn_read_html(html)
+    dates, values = [], []
+    for tr in table.split("<tr")[1:]:
+        cells = tr.split("</td>")
+        if len(cells) < FRGN_NCOLS:
+            continue  # 구분선 행
+        date = _DATE_RE.search(cells[0])
+        if date is None:
+            continue
+        dates.append("-".join(date.groups()))
+        values.append([_TAG_RE.sub("", cells[FRGN_COLS[key]]).strip().replace(",", "") or "nan"
+                       for key in FLOW_COLS])
+    if not dates:
+        return _empty()
+    try:
+        values = np.array(values).astype(float)
+    except ValueError:
+        return parse_naver_frgn_read_html(html)  # 숫자가 아닌 칸이 있으면 느린 방식으로
+    values[:, 0] = np.abs(values[:, 0])
+    return pd.DataFrame(values, columns=FLOW_COLS,
+                        index=pd.DatetimeIndex(np.array(dates, dtype="datetime64[ns]"), name="Date"))
+
+
+def parse_naver_frgn_read_html(html):
+    """read_html로 페이지의 모든 표를 읽어 수급 표를 고르는 방식 (구조가 바뀌었을 때의 대비용)"""
+    dfs = pd.read_html(StringIO(html))
+    target_df = None
+    for df in dfs:
+        cols_str = ' '.join(str(c) for c in df.columns)
+        if '기관' in cols_str or '외국인' in cols_str:
+            target_df = df
+            break
+    if target_df is None and len(dfs) >= 2:
+        target_df = dfs[1]
+    if target_df is None:
+        return _empty()
+    date_col, frgn_col, inst_col, price_col = None, None, None, None
+    for col in target_df.columns:
+        col_str = str(col).lower()
+        if '날짜' in col_str and date_col is None: date_col = col
+        if '외국인' in col_str and frgn_col is None: frgn_col = col
+        if '기관' in col_str and inst_col is None: inst_col = col
+        if '종가' in col_str and price_col is None: price_col = col
+    if date_col is None:
+        return _empty()
+    out = pd.DataFrame({
+        "Date": pd.to_datetime(target_df[date_col].astype(str), format="%Y.%m.%d", errors="coerce"),
+        "Close": _to_number(target_df[price_col]).abs() if price_col is not None else np.nan,
+        "Foreign": _to_number(target_df[frgn_col]) if frgn_col is not None else np.nan,
+        "Institution": _to_number(target_df[inst_col]) if inst_col is not None else np.nan,
+    })
+    out = out.dropna(subset=["Date"]).set_index("Date")
+    return out[FLOW_COLS].astype(float)
+
+
+def fetch_naver_flows(code, days=NAVER_PAGE_ROWS, retries=2):
+    """네이버 금융 frgn.naver 첫 페이지 (days와 무관하게 한 페이지 20거래일을 모두 반환)"""
+    url = f"{NAVER_FINANCE_URL}/item/frgn.naver?code={code}"
+    r = http_client.get(url, headers=NAVER_HEADERS, timeout=15, retries=retries)
+    r.raise_for_status()
+    r.encoding = 'cp949'
+    return parse_naver_frgn(r.text)
+
+
+def fetch_daum_flows(code, days=10, retries=2):
+    """Daum 투자자별 매매 API (백업)"""
+    url = f'{DAUM_FINANCE_URL}/api/investor/days?symbolCode=A{code}&page=1&perPage={days}'
+    headers = {
+        'User-Agent': NAVER_HEADERS['User-Agent'],
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'ko-KR,ko;q=0.9',
+        'Referer': f'{DAUM_FINANCE_URL}/quotes/A{code}',
+        'Origin': DAUM_FINANCE_URL,
+    }
+    # 공유 세션에 Daum 쿠키가 없을 때만 종목 페이지를 먼저 방문
+    http_client.ensure_cookies(f'{DAUM_FINANCE_URL}/quotes/A{code}', headers=headers)
+    r = http_client.get(url, headers=headers, timeout=10, retries=retries)
+    if r.status_code != 200:
+        return _empty()
+    data_list = r.json().get('data', [])
+    if not data_list:
+        return _empty()
+    out = pd.DataFrame({
+        "Date": pd.to_datetime([str(d.get('date', ''))[:10] for d in data_list], errors="coerce"),
+        "Close": [float(d.get('tradePrice', 0) or 0) for d in data_list],
+        "Foreign": [float(d.get('foreignStraightPurchaseVolume', 0) or 0) for d in data_list],
+        "Institution": [float(d.get('institutionStraightPurchaseVolume', 0) or 0) for d in data_list],
+    })
+    return out.dropna(subset=["Date"]).set_index("Date")[FLOW_COLS]
+
+
+def fetch_flows(code, days=NAVER_PAGE_ROWS, retries=2):
+    """네이버 우선, 실패하거나 비어 있으면 Daum"""
+    try:
+        df = fetch_naver_flows(code, days, retries)
+        if not df.empty:
+            return df
+    except Exception as e:
+        print(f"[WARN] {code} Naver 수급 조회 실패: {e}")
+    try:
+        return fetch_daum_flows(code, days, retries)
+    except Exception as e:
+        print(f"[WARN] {code} Daum 수급 조회 실패: {e}")
+    return _empty()
+
+
+def _flow_path(code, investor_dir=INVESTOR_DIR):
+    return os.path.join(investor_dir, f"{code}.parquet")
+
+
+def load_flows(code, investor_dir=INVESTOR_DIR):
+    """저장된 일별 수급 (없으면 None). attrs['fetched_at']에 마지막 조회 시각(KST)"""
+    path = _flow_path(code, investor_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"[WARN] {code} 수급 저장소 읽기 실패: {e}")
+        return None
+
+
+def save_flows(code, df, fetched_at, investor_dir=INVESTOR_DIR):
+    os.makedirs(investor_dir, exist_ok=True)
+    out = df[FLOW_COLS].astype(float).sort_index(ascending=False)
+    out.attrs["fetched_at"] = pd.Timestamp(fetched_at).strftime("%Y-%m-%d %H:%M:%S")
+    tmp = _flow_path(code, investor_dir) + ".tmp"
+    out.to_parquet(tmp)
+    os.replace(tmp, _flow_path(code, investor_dir))
+
+
+def provisional_from(stored):
+    """조회 시각 기준으로 아직 확정 전이던 행의 시작일 (이 날짜 초과 행은 잠정치). 조회 시각이 없으면 None"""
+    fetched_at = stored.attrs.get("fetched_at") if stored is not None else None
+    return expected_last_date(pd.Timestamp(fetched_at)) if fetched_at else None
+
+
+def is_fresh(stored, days, now=None):
+    """
+    마지막 확정 거래일까지 days일 이상 저장돼 있거나, 그 이후에 이미 조회한 적 있으면 True
+    확정 전(FLOW_FINAL_HOUR 이전)에 받은 당일 잠정치 행이 남아 있으면 항상 False → 다시 받아 확정치로 교체
+    """
+    if stored is None or len(stored) < days:
+        return False
+    final = provisional_from(stored)
+    if final is not None and stored.index.max() > final:
+        return False
+    expected = expected_last_date(now)
+    if stored.index.max() >= expected:
+        return True
+    # 공휴일처럼 새 행이 안 생기는 날은 같은 확정 시점 안에서 다시 조회하지 않음
+    return final is not None and final >= expected
+
+
+def get_flows(code, days=10, fetch=fetch_flows, investor_dir=INVESTOR_DIR, now=None):
+    """
+    최근 days 거래일 수급 (최신일이 위)
+    - 저장본이 최신이면 네트워크 조회 없음
+    - 아니면 마지막 저장일 이후 빠진 거래일 수(+마지막 저장일 재확인)만큼만 조회해서 병합
+    - 잠정치 행이 있으면 그 날짜부터 다시 받음 (장 마감 직후 실행이 받은 당일 행을 다음 실행이 확정치로 교체)
+    """
+    code = str(code).zfill(6)
+    now = now or get_kst_now()
+    stored = load_flows(code, investor_dir)
+    if is_fresh(stored, days, now):
+        return stored.head(days)
+    need = days
+    if stored is not None and not stored.empty:
+        last = stored.index.max()
+        final = provisional_from(stored)
+        if final is not None and last > final:
+            last = stored.index[stored.index <= final].max() if (stored.index <= final).any() else stored.index.min()
+        missing = int(np.busday_count(last.date(), expected_last_date(now).date()))
+        if len(stored) >= days:
+            need = max(missing + 1, 1)
+    fetched = fetch(code, need)
+    if fetched is None or fetched.empty:
+        return stored.head(days) if stored is not None else _empty()
+    merged = fetched if stored is None else pd.concat([fetched, stored])
+    merged = merged[~merged.index.duplicated(keep="first")].sort_index(ascending=False)
+    save_flows(code, merged, now, investor_dir)
+    return merged.head(days)
+
+
+def summarize_flows(flows, n=5):
+    """
+    최근 n거래일 요약
+    - foreign_consecutive_buy: 최신일부터 외국인 순매수가 이어진 일수
+    - foreign/inst_net_buy_5d: 순매매량 × 종가 합계 (원)
+    """
+    if flows is None or flows.empty:
+        return {"foreign_consecutive_buy": 0, "foreign_net_buy_5d": 0.0, "inst_net_buy_5d": 0.0}
+    values = flows[FLOW_COLS].to_numpy(dtype=float)
+    values = values[~np.isnan(values[:, 1])][:n]
+    if len(values) == 0:
+        return {"foreign_consecutive_buy": 0, "foreign_net_buy_5d": 0.0, "inst_net_buy_5d": 0.0}
+    price = np.nan_to_num(values[:, 0], nan=1.0)
+    frgn = values[:, 1]
+    inst = np.nan_to_num(values[:, 2])
+    buying = frgn > 0
+    consecutive = int(buying.argmin()) if not buying.all() else len(buying)
+    return {
+        "foreign_consecutive_buy": consecutive,
+        "foreign_net_buy_5d": float((frgn * price).sum()),
+        "inst_net_buy_5d": float((inst * price).sum()),
+    }
@@ -1,16 +1,97 @@
 import os
 import glob
+import json
+import hashlib
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+from sharding import load_manifest, check_coverage, update_costs
+from scan_history import append_history, backfill_history
+from scan_telemetry import REPORT_DIR, load_reports, merge_reports, print_report
+
+def report_coverage(scan_day):
+    """샤드 매니페스트 대비 빠진/중복 종목 보고 + 종목별 소요 시간 기록 갱신"""
+    manifest = load_manifest(scan_day)
+    if manifest is None:
+        print(f"[WARN] 샤드 매니페스트 없음 (data/shards/manifest_{scan_day}.json) - 검사 생략")
+        return None
+    cov = check_coverage(manifest)
+    total = sum(len(c) for c in manifest["shards"].values())
+    print(f"[MERGE] 매니페스트 {manifest['n_shards']}개 샤드 / {total}개 종목, 스캔 기록 {len(cov['measured'])}개")
+    if cov["missing_shards"]:
+        print(f"[WARN] 결과가 없는 샤드: {', '.join(cov['missing_shards'])}")
+    if cov["missing"]:
+        print(f"[WARN] 스캔되지 않은 종목 {len(cov['missing'])}개: {', '.join(cov['missing'][:20])}{' ...' if len(cov['missing']) > 20 else ''}")
+    if cov["duplicates"]:
+        print(f"[WARN] 여러 샤드에서 스캔된 종목 {len(cov['duplicates'])}개: {', '.join(cov['duplicates'][:20])}")
+    if cov["unexpected"]:
+        print(f"[WARN] 매니페스트에 없는 종목/샤드 {len(cov['unexpected'])}개: {', '.join(cov['unexpected'][:20])}")
+    if cov["measured"]:
+        update_costs(cov["measured"])
+    report = {k: v for k, v in cov.items() if k != "measured"}
+    report.update({"scan_day": scan_day, "n_shards": manifest["n_shards"], "expected": total, "scanned": len(cov["measured"])})
+    os.makedirs("data", exist_ok=True)
+    with open("data/merge_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    return report
+
+def report_runs(scan_day):
+    """청크별 실행 리포트(단계별 소요 시간/탈락 사유)를 합쳐 data/run_reports/run_report_{날짜}.json 저장"""
+    reports = load_reports(scan_day)
+    if not reports:
+        print("[WARN] 청크 실행 리포트 없음 - 생략")
+        return None
+    merged = merge_reports(reports)
+    c = merged["counts"]
+    print(f"[MERGE] 실행 리포트 {len(reports)}개 청크: 스캔 {c['scanned']} / 통과 {c['passed']} / 오류 {c['errors']}, "
+          f"가장 긴 청크 {merged['wall_seconds_max']:.0f}초")
+    print_report(merged, prefix="[MERGE]")
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    with open(os.path.join(REPORT_DIR, f"run_report_{scan_day}.json"), "w", encoding="utf-8") as f:
+        json.dump(merged, f, ensure_ascii=False, indent=1)
+    return merged
+
+SNAPSHOT_PATH = "data/scanner_output_latest.parquet"
+MANIFEST_PATH = "data/manifest.json"
+
+def write_snapshot(out, scan_day, sources):
+    """
+    앱이 읽을 병합 결과 스냅샷(Parquet) + 매니페스트(최신 날짜, 원본 파일, 내용 해시)
+    앱은 매니페스트의 해시가 바뀔 때만 다시 읽음
+    """
+    out.to_parquet(SNAPSHOT_PATH, index=False)
+    h = hashlib.sha256()
+    for path in (SNAPSHOT_PATH, "data/sector_rankings.csv"):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                h.update(f.read())
+    manifest = {
+        "latest_date": scan_day,
+        "snapshot": SNAPSHOT_PATH,
+        "sector_rankings": "data/sector_rankings.csv" if os.path.exists("data/sector_rankings.csv") else None,
+        "files": [os.path.basename(p) for p in sources],
+        "rows": len(out),
+        "hash": h.hexdigest(),
+        "updated_at": (datetime.utcnow() + timedelta(hours=9)).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(MANIFEST_PATH + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(MANIFEST_PATH + ".tmp", MANIFEST_PATH)
+    return manifest
 
 def main():
-    scan_day = datetime.now().strftime("%Y-%m-%d")
+    # 청크들은 KST 날짜로 파일을 만듦
+    scan_day = (datetime.utcnow() + timedelta(hours=9)).strftime("%Y-%m-%d")
+    report_coverage(scan_day)
+    try:
+        report_runs(scan_day)
+    except Exception as e:
+        print(f"[WARN] 실행 리포트 병합 실패: {e}")
     paths = sorted(glob.glob(f"data/partial/scanner_output_{scan_day}_chunk*.csv"))
 
     dfs = []
     for p in paths:
         try:
-            df = pd.read_csv(p)
+            df = pd.read_csv(p, dtype={"code": str})
             if df is not None and not df.empty:
                 dfs.append(df)
         except Exception:
@@ -22,13 +103,30 @@ def main():
     out = pd.concat(dfs, ignore_index=True)
 
     if "code" in out.columns:
-        out = out.drop_duplicates(subset=["code"], keep="first")
+        out["code"] = out["code"].str.zfill(6)
+        dup = out["code"].duplicated(keep="first")
+        if dup.any():
+            print(f"[WARN] 여러 청크 결과에 있는 종목 {int(dup.sum())}개 - 첫 번째 것만 사용")
+        out = out[~dup]
 
     out = out.sort_values("total_score", ascending=False)
 
     os.makedirs("data", exist_ok=True)
     out.to_csv(f"data/scanner_output_{scan_day}.csv", index=False, encoding="utf-8-sig")
     out.to_csv("data/scanner_output_latest.csv", index=False, encoding="utf-8-sig")
+    try:
+        manifest = write_snapshot(out, scan_day, paths)
+        print(f"[MERGE] 스냅샷 저장: {manifest['rows']}개 (hash {manifest['hash'][:12]})")
+    except Exception as e:
+        print(f"[WARN] 스냅샷 저장 실패: {e}")
+
+    # 날짜별 Parquet 이력에도 추가 (이력에 아직 없는 예전 CSV도 같이 옮김)
+    try:
+        n = append_history(out, scan_day)
+        print(f"[HISTORY] {scan_day}: {n}개 저장")
+        backfill_history()
+    except Exception as e:
+        print(f"[WARN] 이력 데이터셋 저장 실패: {e}")
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,26 @@
 import os
-import requests
+import json
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
+import http_client
+
+NAVER_NEWS_URL = "https://openapi.naver.com/v1/search/news.json"
+NEWS_CACHE_DIR = os.path.join("data", "news")
+BATCH_MAX_FEATURES = 50000  # extract_keywords_batch 어휘 상한 (종목당 1000개, 전체 말뭉치 빈도 순)
+
+# 날짜별 뉴스 캐시 {day: {query: {"fetched_at": ..., "items": [...]}}} (프로세스 내 사본 + 파일)
+_cache = {}
+_cache_lock = threading.Lock()
 
 def search_naver_news(query, client_id, client_secret, display=10):
     if not client_id or not client_secret:
         return []
 
-    url = "https://openapi.naver.com/v1/search/news.json"
+    url = NAVER_NEWS_URL
     headers = {
         "X-Naver-Client-Id": client_id,
         "X-Naver-Client-Secret": client_secret,
@@ -14,7 +28,7 @@ def search_naver_news(query, client_id, client_secret, display=10):
     params = {"query": query, "display": display, "sort": "date"}
 
     try:
-        r = requests.get(url, headers=headers, params=params, timeout=5)
+        r = http_client.get(url, headers=headers, params=params, timeout=5)
         if r.status_code != 200:
             return []
         items = r.json().get("items", [])
@@ -30,6 +44,78 @@ def search_naver_news(query, client_id, client_secret, display=10):
     except Exception:
         return []
 
+def get_kst_now():
+    return datetime.utcnow() + timedelta(hours=9)
+
+def _cache_path(day, cache_dir=NEWS_CACHE_DIR):
+    return os.path.join(cache_dir, f"{day}.json")
+
+def _day_cache(day, cache_dir=NEWS_CACHE_DIR):
+    """해당 날짜 캐시 (처음 접근할 때 파일에서 읽음). _cache_lock 안에서 호출"""
+    key = (cache_dir, day)
+    if key not in _cache:
+        data = {}
+        path = _cache_path(day, cache_dir)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"[WARN] 뉴스 캐시 읽기 실패: {e}")
+        _cache[key] = data
+    return _cache[key]
+
+def _save_day_cache(day, data, cache_dir=NEWS_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(day, cache_dir)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+def dedup_news(items):
+    """링크 기준 중복 제거 (링크가 없으면 제목 기준), 앞쪽 항목 우선"""
+    seen, out = set(), []
+    for it in items:
+        key = it.get("link") or it.get("title", "")
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(it)
+    return out
+
+def get_news(query, client_id, client_secret, display=10, ttl_minutes=180, now=None, cache_dir=NEWS_CACHE_DIR):
+    """
+    search_naver_news + (종목명, 날짜) 캐시
+    - TTL 안이면 API 호출 없이 캐시 반환 (청크/재실행/앱에서 재사용)
+    - TTL이 지나면 다시 조회해서 기존 항목과 링크 기준으로 합침
+    - 조회 실패 시 캐시가 있으면 그대로 사용
+    """
+    now = now or get_kst_now()
+    day = now.strftime("%Y-%m-%d")
+    with _cache_lock:
+        entry = _day_cache(day, cache_dir).get(query)
+    if entry:
+        age = now - datetime.strptime(entry["fetched_at"], "%Y-%m-%d %H:%M:%S")
+        if age < timedelta(minutes=ttl_minutes):
+            return entry["items"][:display]
+
+    items = search_naver_news(query, client_id, client_secret, display=display)
+    if not items:
+        return entry["items"][:display] if entry else []
+    merged = dedup_news(items + (entry["items"] if entry else []))
+    with _cache_lock:
+        data = _day_cache(day, cache_dir)
+        data[query] = {"fetched_at": now.strftime("%Y-%m-%d %H:%M:%S"), "items": merged}
+        _save_day_cache(day, data, cache_dir)
+    return merged[:display]
+
+def fetch_stock_news(stock_name, cfg, display=10):
+    """설정/환경변수의 API 키로 종목 뉴스 조회 (캐시 사용)"""
+    client_id = os.environ.get("NAVER_CLIENT_ID") or cfg["news"].get("naver_client_id","")
+    client_secret = os.environ.get("NAVER_CLIENT_SECRET") or cfg["news"].get("naver_client_secret","")
+    ttl = cfg["news"].get("cache_ttl_minutes", 180)
+    return get_news(stock_name, client_id, client_secret, display=display, ttl_minutes=ttl)
+
 def extract_keywords(texts, topk=8):
     if not texts:
         return []
@@ -45,14 +131,46 @@ def extract_keywords(texts, topk=8):
     except Exception:
         return []
 
-def analyze_stock_news(stock_name, cfg):
-    client_id = os.environ.get("NAVER_CLIENT_ID") or cfg["news"].get("naver_client_id","")
-    client_secret = os.environ.get("NAVER_CLIENT_SECRET") or cfg["news"].get("naver_client_secret","")
+def extract_keywords_batch(text_groups, topk=8):
+    """
+    여러 종목의 기사 묶음을 한 번에 처리
+    - 전체 기사로 TfidfVectorizer 하나를 학습 (IDF가 종목 간 비교로 의미를 가짐)
+    - 종목 × 기사 지시 행렬과 곱해서 종목별 점수를 구하고 상위 topk 단어 반환
+    - 어휘는 extract_keywords처럼 종목당 1000개, 최대 BATCH_MAX_FEATURES (bigram 어휘가 기사 수에 비례해 커지지 않게)
+    """
+    texts = [str(t) for group in text_groups for t in group]
+    if not any(t.strip() for t in texts):
+        return [[] for _ in text_groups]
+    try:
+        vec = TfidfVectorizer(max_features=min(1000 * len(text_groups), BATCH_MAX_FEATURES), ngram_range=(1,2))
+        X = vec.fit_transform(texts)
+    except ValueError:
+        return [[] for _ in text_groups]  # 단어가 하나도 없음
+    sizes = np.array([len(g) for g in text_groups])
+    owner = np.repeat(np.arange(len(text_groups)), sizes)
+    G = sparse.csr_matrix((np.ones(len(texts)), (owner, np.arange(len(texts)))), shape=(len(text_groups), len(texts)))
+    scores = (G @ X).tocsr()
+    terms = vec.get_feature_names_out()
+    out = []
+    for i in range(len(text_groups)):
+        row = scores.getrow(i)
+        order = row.data.argsort()[::-1][:topk]
+        out.append([terms[j] for j in row.indices[order]])
+    return out
+
+def _news_texts(news):
+    return [n["title"] + " " + n["description"] for n in news]
 
-    news = search_naver_news(stock_name, client_id, client_secret, display=10)
+def analyze_stock_news(stock_name, cfg):
+    news = fetch_stock_news(stock_name, cfg, display=10)
     if not news:
         return {"keywords": "", "news_count": 0}
 
-    texts = [n["title"] + " " + n["description"] for n in news]
+    texts = _news_texts(news)
     keywords = extract_keywords(texts, topk=cfg["news"]["max_keywords"])
     return {"keywords": ", ".join(keywords[:6]), "news_count": len(news)}
+
+def analyze_news_batch(news_lists, cfg):
+    """종목별 뉴스 목록들 → analyze_stock_news와 같은 형식의 결과 목록 (키워드는 전체 말뭉치 기준)"""
+    keywords = extract_keywords_batch([_news_texts(news) for news in news_lists], topk=cfg["news"]["max_keywords"])
+    return [{"keywords": ", ".join(kw[:6]), "news_count": len(news)} for news, kw in zip(news_lists, keywords)]
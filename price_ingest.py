@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+price_ingest.py - 날짜별 전종목 일봉 수집 (가격 저장소 일괄 갱신)
+거래일 하루치 전종목 OHLCV를 한 번에 받아(pykrx, KRX 요청 1회) 종목별 저장소(data/prices)에 나눠 붙입니다.
+종목 수(~1,000)만큼 하던 일일 갱신 요청이 빠진 거래일당 1회로 줄어듭니다.
+- 저장소의 확정 봉(final_through, 없으면 마지막 봉) 이후 빠진 거래일을 모두 채움 (최대 max_days 영업일)
+- 장 마감이 지난 날짜까지 채운 종목은 final_through로 기록 → price_store.get_prices가 종목별로 다시 조회하지 않음
+- 저장소가 없는 종목(신규)이나 너무 오래 비어 있는 종목은 건너뜀 → 종목별 전체 조회에 맡김
+- 빠진 기간에 수정주가 변경(액면분할 등)이 있으면 KRX 등락률과 종가 변화가 달라지므로 붙이지 않음 (종목별 전체 재조회)
+- 빈 응답은 거래일 달력(KOSPI 지수 봉)으로 휴장일이 확인될 때만 건너뜀
+  확인되지 않으면(KRX 일시 오류 등) 그 전날까지만 확정으로 기록 → 나머지는 종목별 조회가 채움
+source(day) → DataFrame(index=6자리 코드, Open/High/Low/Close/Volume/Change(등락률 %)), 휴장일이면 빈 DataFrame
+calendar(start, end) → 구간의 거래일 DatetimeIndex (구간 끝 이후 거래일이 있어야 그 사이 빈 날을 휴장으로 봄)
+테스트나 오프라인 실행은 frame_source로 로컬 데이터를 소스로 쓸 수 있음
+"""
+import os
+import glob
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from price_store import PRICE_DIR, OHLCV_COLS, KRX_CODE_RE, _kst_now, last_closed_session, load_prices, save_prices, fetch_daily
+
+MAX_BACKFILL_DAYS = 30   # 이보다 오래 비어 있는 종목은 날짜별로 채우지 않음 (영업일)
+CHANGE_TOLERANCE = 0.5   # 등락률(%)과 종가 변화율(%)의 허용 차이 - 넘으면 수정주가 변경으로 봄
+KRX_COLS = {"시가": "Open", "고가": "High", "저가": "Low", "종가": "Close", "거래량": "Volume", "등락률": "Change"}
+CALENDAR_SYMBOL = "KS11"  # 거래일 확인용 지수 (fdr)
+CALENDAR_LOOKAHEAD = 10  # 휴장 확인용으로 구간 끝 뒤까지 받는 달력일
+
+
+def fetch_market_ohlcv_krx(day):
+    """KRX 전종목(코스피+코스닥) 하루 일봉 (pykrx 요청 1회). 휴장일이면 빈 DataFrame"""
+    from pykrx import stock
+
+    df = stock.get_market_ohlcv(pd.Timestamp(day).strftime("%Y%m%d"), market="ALL")
+    if df is None or df.empty or (df[["시가", "고가", "저가", "종가"]] == 0).all(axis=None):
+        return pd.DataFrame(columns=OHLCV_COLS + ["Change"])
+    df = df.rename(columns=KRX_COLS)[OHLCV_COLS + ["Change"]].astype(float)
+    df.index = df.index.astype(str).str.zfill(6)
+    # 거래정지 종목은 종가만 있고 시가/고가/저가가 0 → 종가로 채움
+    for col in ("Open", "High", "Low"):
+        df[col] = df[col].where(df[col] > 0, df["Close"])
+    return df
+
+
+def krx_trading_days(start, end):
+    """[start, end] 구간의 거래일 (KOSPI 지수에 봉이 있는 날, fdr 요청 1회)"""
+    end = pd.Timestamp(end) + timedelta(days=CALENDAR_LOOKAHEAD)
+    return fetch_daily(CALENDAR_SYMBOL, start, end).index
+
+
+def frame_source(frames):
+    """
+    종목별 일봉 {code: DataFrame} → 날짜별 소스 (테스트/오프라인용 가짜 KRX)
+    요청한 날짜는 source.requests에 기록됨
+    """
+    closes = pd.DataFrame({code: df["Close"] for code, df in frames.items()})
+    prev = closes.shift(1)
+
+    def source(day):
+        day = pd.Timestamp(day)
+        source.requests.append(day)
+        rows = {code: df.loc[day, OHLCV_COLS] for code, df in frames.items() if day in df.index}
+        if not rows:
+            return pd.DataFrame(columns=OHLCV_COLS + ["Change"])
+        out = pd.DataFrame(rows).T.astype(float)
+        out["Change"] = (closes.loc[day, out.index] / prev.loc[day, out.index] * 100 - 100).fillna(0).to_numpy()
+        return out
+
+    source.requests = []
+    return source
+
+
+def stored_codes(price_dir=PRICE_DIR):
+    """저장소에 있는 KRX 종목코드 (지수 등 다른 심볼 제외)"""
+    codes = (os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(price_dir, "*.parquet")))
+    return sorted(c for c in codes if KRX_CODE_RE.match(c))
+
+
+def missing_days(after, through):
+    """(after, through] 구간의 평일 목록"""
+    after, through = pd.Timestamp(after).normalize(), pd.Timestamp(through).normalize()
+    if through <= after:
+        return []
+    return list(pd.bdate_range(after + timedelta(days=1), through))
+
+
+def _adjusted(prev_close, bars):
+    """새 봉들의 종가 변화가 등락률과 다르면 True (빠진 기간에 수정주가 변경)"""
+    closes = np.concatenate([[prev_close], bars["Close"].to_numpy(dtype=float)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = closes[1:] / closes[:-1] * 100 - 100
+    change = bars["Change"].to_numpy(dtype=float)
+    return bool(np.any(np.abs(pct - change) > CHANGE_TOLERANCE))
+
+
+def _holiday_check(calendar, start, end):
+    """day → 휴장일 확인 여부 (달력은 처음 필요할 때 한 번만 조회, 조회 실패면 모든 빈 날을 미확인으로 봄)"""
+    trading = []
+
+    def is_holiday(day):
+        if not trading:
+            try:
+                trading.append(pd.DatetimeIndex(calendar(start, end)).normalize())
+            except Exception as e:
+                print(f"[WARN] 거래일 달력 조회 실패: {e}")
+                trading.append(pd.DatetimeIndex([]))
+        days = trading[0]
+        # 그 날 이후 거래일이 달력에 있어야 빠진 날을 휴장으로 확정 (달력이 아직 안 나온 날은 모름)
+        return len(days) > 0 and days.max() > day and day not in days
+
+    return is_holiday
+
+
+def ingest_days(codes, source=fetch_market_ohlcv_krx, now=None, max_days=MAX_BACKFILL_DAYS, price_dir=PRICE_DIR,
+                calendar=krx_trading_days):
+    """
+    codes의 저장소를 가장 최근 마감 거래일까지 날짜별 전종목 일봉으로 채움
+    휴장일로 확인되지 않은 빈 응답(또는 조회 오류)이 나오면 거기서 멈추고 그 전날까지만 확정으로 기록
+    반환: {"through", "target", "failed", "requests", "days", "holidays", "updated", "no_store", "stale", "adjusted"}
+    """
+    target = last_closed_session(now or _kst_now())
+    floor = target - pd.tseries.offsets.BDay(max_days)
+    stats = {"through": target.strftime("%Y-%m-%d"), "target": target.strftime("%Y-%m-%d"), "failed": None,
+             "requests": 0, "days": 0, "holidays": [], "updated": 0, "no_store": [], "stale": [], "adjusted": []}
+
+    stored = {}
+    for code in codes:
+        df = load_prices(code, price_dir=price_dir)
+        if df is None or df.empty or not df.attrs.get("covered_from"):
+            stats["no_store"].append(code)
+            continue
+        if df.attrs.get("final_through"):
+            base = pd.Timestamp(df.attrs["final_through"])
+        else:
+            # 확정 기록이 없으면 마지막 봉은 장중 스냅샷일 수 있으므로 그 날짜부터 다시 채움
+            base = df.index[-2] if len(df) > 1 else df.index[-1] - timedelta(days=1)
+        if base >= target:
+            continue  # 이미 확정
+        if base < floor:
+            stats["stale"].append(code)
+            continue
+        stored[code] = (df, base)
+    if not stored:
+        return stats
+
+    sections = {}
+    days = missing_days(min(base for _, base in stored.values()), target)
+    is_holiday = _holiday_check(calendar, days[0], target) if days else None
+    through = target
+    for day in days:
+        stats["requests"] += 1
+        try:
+            sec = source(day)
+        except Exception as e:
+            print(f"[WARN] {day:%Y-%m-%d} 전종목 일봉 조회 실패: {e}")
+            sec = None
+        if sec is None or sec.empty:
+            if sec is not None and is_holiday(day):
+                stats["holidays"].append(day.strftime("%Y-%m-%d"))
+                continue
+            # 휴장 확인이 안 된 빈 날 → 그 전날까지만 확정 (이후 날짜를 붙이면 이 날이 영영 빠짐)
+            stats["failed"] = day.strftime("%Y-%m-%d")
+            through = day - pd.tseries.offsets.BDay(1)
+            break
+        sections[day] = sec
+    stats["days"] = len(sections)
+    stats["through"] = through.strftime("%Y-%m-%d")
+
+    for code, (df, base) in stored.items():
+        if base >= through:
+            continue  # 더 확정할 날이 없음
+        merged = df[OHLCV_COLS]
+        days = [day for day, sec in sections.items() if day > base and code in sec.index]
+        if days:
+            bars = pd.DataFrame([sections[day].loc[code] for day in days], index=pd.DatetimeIndex(days, name="Date"))
+            before = df.loc[df.index < days[0], "Close"]
+            if not before.empty and _adjusted(float(before.iloc[-1]), bars):
+                stats["adjusted"].append(code)
+                continue
+            # 이미 저장된 같은 날짜 봉(장중 스냅샷 등)은 새 봉으로 교체
+            merged = pd.concat([merged, bars[OHLCV_COLS]])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        save_prices(code, merged, df.attrs["covered_from"], price_dir, final_through=through)
+        stats["updated"] += 1
+    return stats
+
+
+def print_stats(stats, prefix="[INGEST]"):
+    print(f"{prefix} {stats['through']}까지: 요청 {stats['requests']}회 (거래일 {stats['days']}, 휴장 {len(stats['holidays'])}), "
+          f"갱신 {stats['updated']}개 종목")
+    if stats.get("failed"):
+        print(f"{prefix} {stats['failed']} 응답 없음 (휴장 미확인) → {stats['target']}까지 남은 날은 종목별 조회")
+    for key, label in (("no_store", "저장소 없음"), ("stale", f"{MAX_BACKFILL_DAYS}영업일 넘게 비어 있음"),
+                       ("adjusted", "수정주가 변경 감지")):
+        if stats[key]:
+            print(f"{prefix} {label} → 종목별 조회: {len(stats[key])}개 ({', '.join(stats[key][:10])}{' ...' if len(stats[key]) > 10 else ''})")
+
+
+if __name__ == "__main__":
+    import yaml
+
+    with open("config.yaml", "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    print_stats(ingest_days(stored_codes(), max_days=int(cfg.get("prices", {}).get("max_backfill_days", MAX_BACKFILL_DAYS))))
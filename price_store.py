@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+price_store.py - 종목별 일봉(OHLCV) 로컬 저장소
+data/prices/{code}.parquet 에 전체 이력을 보관하고, 실행할 때마다 빠진 꼬리 봉만 받아서 붙입니다.
+(매일 400일치를 다시 받던 것을 종목당 몇 개 봉 수준으로 줄임)
+price_ingest가 날짜별 전종목 일봉으로 저장소를 채워 두면(final_through) 종목별 조회도 생략합니다.
+"""
+import os
+import re
+from io import StringIO
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import FinanceDataReader as fdr
+
+import http_client
+
+PRICE_DIR = os.path.join("data", "prices")
+OHLCV_COLS = ["Open", "High", "Low", "Close", "Volume"]
+NAVER_CHART_URL = "https://fchart.stock.naver.com/sise.nhn"
+KRX_CODE_RE = re.compile(r"^\d{4}[0-9A-HJ-NP-TV-Z][0-9KLMN]$")
+MARKET_CLOSE = (15, 30)  # KST 장 마감 (시, 분)
+
+
+def _to_timestamp(d):
+    return pd.Timestamp(d).normalize().tz_localize(None)
+
+
+def _price_path(code, price_dir=PRICE_DIR):
+    return os.path.join(price_dir, f"{code}.parquet")
+
+
+def next_market_close(now):
+    """now(KST) 이후 첫 장 마감 시각 (공휴일은 모르므로 평일 기준). 이 시각까지는 일봉이 바뀌지 않는다고 보고 캐시"""
+    now = pd.Timestamp(now)
+    close = now.normalize() + pd.Timedelta(hours=MARKET_CLOSE[0], minutes=MARKET_CLOSE[1])
+    day = close.date() if now < close else close.date() + timedelta(days=1)
+    day = np.busday_offset(day, 0, roll="forward")
+    return pd.Timestamp(day) + pd.Timedelta(hours=MARKET_CLOSE[0], minutes=MARKET_CLOSE[1])
+
+
+def last_closed_session(now):
+    """now(KST) 기준 장 마감이 지난 가장 최근 평일 (공휴일은 모르므로 평일 기준)"""
+    now = pd.Timestamp(now)
+    day = now.normalize()
+    if now < day + pd.Timedelta(hours=MARKET_CLOSE[0], minutes=MARKET_CLOSE[1]):
+        day -= pd.Timedelta(days=1)
+    return pd.Timestamp(np.busday_offset(day.date(), 0, roll="backward"))
+
+
+def _kst_now():
+    return datetime.utcnow() + timedelta(hours=9)
+
+
+def fetch_naver_daily(code, count):
+    """네이버 차트 API에서 최근 count개 일봉 조회 (fdr NaverDailyReader와 같은 형식)"""
+    params = {"timeframe": "day", "count": int(count), "requestType": 0, "symbol": code}
+    r = http_client.get(NAVER_CHART_URL, params=params, timeout=10)
+    r.raise_for_status()
+    data_list = re.findall(r'<item data=\"(.*?)\" />', r.text, re.DOTALL)
+    if not data_list:
+        return pd.DataFrame(columns=OHLCV_COLS)
+    df = pd.read_csv(StringIO("\n".join(data_list)), delimiter="|", header=None, dtype={0: str})
+    df.columns = ["Date"] + OHLCV_COLS
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y%m%d")
+    return df.set_index("Date").sort_index()
+
+
+def fetch_daily(code, start, end):
+    """
+    [start, end] 구간 일봉 조회
+    - KRX 종목코드: 필요한 봉 수만 네이버에서 받음 (fdr은 항상 6000봉을 받음)
+    - 지수 등 그 외 심볼: fdr.DataReader 사용
+    """
+    start, end = _to_timestamp(start), _to_timestamp(end)
+    if KRX_CODE_RE.match(str(code)):
+        # 영업일 수 + 여유분 (공휴일은 영업일로 세므로 항상 넉넉함)
+        count = int(np.busday_count(start.date(), end.date() + timedelta(days=1))) + 5
+        df = fetch_naver_daily(code, count)
+    else:
+        df = fdr.DataReader(code, start, end)
+    if df is None or df.empty:
+        return pd.DataFrame(columns=OHLCV_COLS)
+    df = df[[c for c in OHLCV_COLS if c in df.columns]]
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None)
+    df.index.name = "Date"
+    return df.loc[start:end]
+
+
+def load_prices(code, start=None, end=None, price_dir=PRICE_DIR):
+    """저장된 일봉 읽기 (없으면 None). fdr과 같이 Change 컬럼을 붙여서 반환"""
+    path = _price_path(code, price_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception as e:
+        print(f"[WARN] {code} 가격 저장소 읽기 실패: {e}")
+        return None
+    attrs = {k: df.attrs.get(k) for k in ("covered_from", "final_through")}
+    if start is not None or end is not None:
+        df = df.loc[pd.Timestamp(start) if start is not None else None:
+                    pd.Timestamp(end) if end is not None else None].copy()
+    df["Change"] = df["Close"].pct_change()
+    df.attrs.update(attrs)
+    return df
+
+
+def save_prices(code, df, covered_from, price_dir=PRICE_DIR, final_through=None):
+    """final_through: 이 날짜까지의 봉은 장 마감 후 확정값 (이후 조회에서 다시 받지 않음)"""
+    os.makedirs(price_dir, exist_ok=True)
+    out = df[OHLCV_COLS].copy()
+    out.attrs["covered_from"] = _to_timestamp(covered_from).strftime("%Y-%m-%d")
+    if final_through is not None:
+        out.attrs["final_through"] = _to_timestamp(final_through).strftime("%Y-%m-%d")
+    tmp = _price_path(code, price_dir) + ".tmp"
+    out.to_parquet(tmp)
+    os.replace(tmp, _price_path(code, price_dir))
+
+
+def update_prices(code, start, end, fetch=fetch_daily, price_dir=PRICE_DIR, now=None):
+    """
+    저장소를 [start, end] 까지 채운 뒤 해당 구간을 반환
+    - 저장된 이력이 start를 덮고 있으면 마지막 저장 봉부터 end까지만 받아 덮어씀
+      (마지막 봉은 장중 스냅샷일 수 있으므로 항상 다시 받음)
+    - 단, 확정 봉(final_through)이 오늘(주말이면 직전 평일) 또는 end까지 있으면 조회하지 않음
+      (평일 장중/장 시작 전에는 오늘 봉이 확정 전이므로 기존처럼 조회)
+    - 겹치는 봉의 종가가 다르면(액면분할 등 수정주가 변경) 전체 구간을 다시 받음
+    전체 구간을 새로 받았으면 반환값의 attrs["refetched"]가 True (과거 봉이 바뀌었을 수 있음 → 증분 상태 재생성용)
+    """
+    req_start, req_end = start, end
+    start, end = _to_timestamp(start), _to_timestamp(end)
+    stored = load_prices(code, price_dir=price_dir)
+    covered_from = final_through = None
+    if stored is not None and stored.attrs.get("covered_from"):
+        covered_from = _to_timestamp(stored.attrs["covered_from"])
+    if stored is not None and stored.attrs.get("final_through"):
+        final_through = _to_timestamp(stored.attrs["final_through"])
+
+    today = pd.Timestamp(np.busday_offset(pd.Timestamp(now or _kst_now()).date(), 0, roll="backward"))
+    if covered_from is not None and covered_from <= start and final_through is not None and final_through >= min(end, today):
+        return load_prices(code, req_start, req_end, price_dir)
+    refetched = False
+    if stored is None or stored.empty or covered_from is None or covered_from > start:
+        merged = fetch(code, start, end)
+        covered_from = start
+        final_through = None
+        refetched = True
+    else:
+        last = stored.index[-1]
+        tail = fetch(code, last, end) if last <= end else stored.iloc[0:0]
+        if not tail.empty and last in tail.index and float(tail.loc[last, "Close"]) != float(stored.loc[last, "Close"]):
+            print(f"[INFO] {code} 수정주가 변경 감지 → 전체 재조회")
+            merged = fetch(code, min(covered_from, start), end)
+            covered_from = min(covered_from, start)
+            final_through = None
+            refetched = True
+        else:
+            merged = pd.concat([stored.loc[stored.index < tail.index.min()] if not tail.empty else stored, tail])
+
+    if merged is None or merged.empty:
+        return merged
+    merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    save_prices(code, merged, covered_from, price_dir, final_through=final_through)
+    out = load_prices(code, req_start, req_end, price_dir)
+    if out is not None:
+        out.attrs["refetched"] = refetched
+    return out
+
+
+def get_prices(code, start, end, fetch=fetch_daily, price_dir=PRICE_DIR, now=None):
+    """update_prices 실패 시(네트워크 오류 등) 저장된 구간이라도 반환"""
+    try:
+        return update_prices(code, start, end, fetch=fetch, price_dir=price_dir, now=now)
+    except Exception as e:
+        print(f"[WARN] {code} 가격 갱신 실패, 저장본 사용: {e}")
+        return load_prices(code, start, end, price_dir)
+
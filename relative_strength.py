@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+relative_strength.py - 유니버스 전체 상대강도(RS) 순위
+전 종목 종가를 날짜 × 종목 행렬로 만들어 기간 수익률을 한 번에 계산하고 0~99 백분위 순위로 바꿉니다.
+청크가 여러 작업으로 나뉘어 실행돼도 같은 순위를 쓰도록, 유니버스 전체 수익률 표를
+data/returns/returns_{날짜}.csv 로 저장해 두고 각 청크는 이 표를 읽어서 사용합니다.
+"""
+import os
+import glob
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import http_client
+from price_store import get_prices
+from scanner_panel import build_panel
+
+RETURNS_DIR = os.path.join("data", "returns")
+RETURN_WINDOWS = {"1m": 21, "3m": 63, "6m": 126}  # 거래일 기준 1/3/6개월
+RS_WINDOWS = ("3m", "6m")  # score_stock에 넘기는 RS 순위 기간
+BREADTH_MA = 50  # 섹터 breadth: 50일선 위 종목 비율
+
+
+def return_table(frames, windows=RETURN_WINDOWS):
+    """
+    {code: OHLCV DataFrame} → 종목별 기간 수익률 표
+    (index=code, 컬럼 ret_1m/ret_3m/ret_6m, above_ma50)
+    거래정지 등으로 마지막 날 값이 없는 종목은 직전 종가로 채워서 계산, 이력이 짧으면 NaN
+    """
+    close = build_panel(frames, fields=["Close"])["Close"]
+    if close.empty:
+        return pd.DataFrame(columns=[f"ret_{k}" for k in windows] + [f"above_ma{BREADTH_MA}"], dtype=float)
+    a = close.ffill().to_numpy()
+    listed = (~np.isnan(close.to_numpy())).sum(axis=0)
+    out = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for key, w in windows.items():
+            base = a[-1 - w] if len(a) > w else np.full(a.shape[1], np.nan)
+            ret = a[-1] / base - 1
+            ret[(listed <= w) | ~np.isfinite(ret)] = np.nan
+            out[f"ret_{key}"] = ret
+        ma = a[-BREADTH_MA:].mean(axis=0)
+        out[f"above_ma{BREADTH_MA}"] = np.where((listed >= BREADTH_MA) & np.isfinite(ma), a[-1] > ma, np.nan)
+    return pd.DataFrame(out, index=close.columns.rename("code"))
+
+
+def rs_ranks(table, windows=RS_WINDOWS):
+    """수익률 → 0~99 백분위 순위 (rs_3m, rs_6m). 수익률이 없는 종목은 0"""
+    table = table.copy()
+    for key in windows:
+        ret = table[f"ret_{key}"]
+        n = int(ret.notna().sum())
+        if n > 1:
+            rank = np.floor((ret.rank(method="average") - 1) / (n - 1) * 99)
+        else:
+            rank = pd.Series(np.where(ret.notna(), 99.0, np.nan), index=ret.index)
+        table[f"rs_{key}"] = rank.fillna(0).astype(int)
+    return table
+
+
+def _load_history(code, start, end):
+    try:
+        return code, get_prices(code, start, end)
+    except Exception:
+        return code, None
+
+
+def build_return_table(codes, start, end, workers=1, windows=RETURN_WINDOWS):
+    """유니버스 전 종목 가격(가격 저장소) → 수익률 + RS 순위 표"""
+    task = partial(_load_history, start=start, end=end)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=http_client.init_worker, initargs=(workers,)) as pool:
+            frames = dict(pool.map(task, codes, chunksize=8))
+    else:
+        frames = dict(map(task, codes))
+    # 가격이 없는 종목도 표에 남겨서(순위 0) 청크 쪽에서 누락으로 보지 않게 함
+    table = return_table(frames, windows).reindex(pd.Index(list(codes), name="code"))
+    return rs_ranks(table)
+
+
+def sector_rankings(table, stocks, min_members=3, rank_by="AvgReturn_3M", windows=RETURN_WINDOWS):
+    """
+    유니버스 수익률 표 + 종목 목록(Code, Sector, Marcap) → 섹터 순위 (네트워크 조회 없음)
+    - AvgReturn_*: 동일가중 평균 수익률(%), McapReturn_*: 시가총액가중 수익률(%)
+    - Breadth: 50일선 위 종목 비율(%), StockCount: 수익률이 있는 구성 종목 수
+    """
+    info = pd.DataFrame({
+        "Sector": stocks["Sector"].fillna("기타").to_numpy(),
+        "Marcap": pd.to_numeric(stocks["Marcap"], errors="coerce").to_numpy() if "Marcap" in stocks.columns else np.nan,
+    }, index=pd.Index(stocks["Code"].astype(str).str.zfill(6), name="code"))
+    df = info.join(table, how="inner")
+    rets = [f"ret_{k}" for k in windows]
+    df[rets] = df[rets] * 100
+    weights = df[rets].notna().mul(df["Marcap"].fillna(0), axis=0)
+    weighted = df[rets].fillna(0).mul(df["Marcap"].fillna(0), axis=0)
+    grouped = pd.concat([df[rets + [f"above_ma{BREADTH_MA}"]], weighted.add_prefix("w_"), weights.add_prefix("m_")], axis=1).groupby(df["Sector"])
+    mean, total = grouped.mean(), grouped.sum()
+    out = pd.DataFrame(index=mean.index)
+    for key in windows:
+        out[f"AvgReturn_{key.upper()}"] = mean[f"ret_{key}"]
+    for key in windows:
+        m = total[f"m_ret_{key}"]
+        out[f"McapReturn_{key.upper()}"] = (total[f"w_ret_{key}"] / m).where(m > 0)
+    out["Breadth"] = mean[f"above_ma{BREADTH_MA}"] * 100
+    out["StockCount"] = df.groupby("Sector")["ret_3m"].count()
+    out = out[out["StockCount"] >= min_members].dropna(subset=[rank_by])
+    out = out.sort_values(rank_by, ascending=False).reset_index()
+    out.insert(0, "Rank", range(1, len(out) + 1))
+    return out
+
+
+def _table_path(day, returns_dir=RETURNS_DIR):
+    return os.path.join(returns_dir, f"returns_{day}.csv")
+
+
+def save_return_table(table, day, returns_dir=RETURNS_DIR):
+    os.makedirs(returns_dir, exist_ok=True)
+    table.to_csv(_table_path(day, returns_dir), encoding="utf-8-sig")
+
+
+def load_return_table(day=None, returns_dir=RETURNS_DIR):
+    """해당 날짜 표 (day=None이면 가장 최근 표). 없으면 None"""
+    if day is not None:
+        path = _table_path(day, returns_dir)
+        paths = [path] if os.path.exists(path) else []
+    else:
+        paths = sorted(glob.glob(os.path.join(returns_dir, "returns_*.csv")))[-1:]
+    if not paths:
+        return None
+    try:
+        return pd.read_csv(paths[0], dtype={"code": str}).set_index("code")
+    except Exception as e:
+        print(f"[WARN] 수익률 표 읽기 실패: {e}")
+        return None
+
+
+def get_return_table(codes, day, start, end, workers=1):
+    """공유 표가 있으면 읽고, 없으면 직접 만들어 저장 (단일 작업 실행 시)"""
+    table = load_return_table(day)
+    if table is not None:
+        missing = set(codes) - set(table.index)
+        if missing:
+            print(f"[WARN] 공유 수익률 표에 없는 종목 {len(missing)}개 (RS 0으로 처리)")
+        return table
+    table = build_return_table(codes, start, end, workers=workers)
+    save_return_table(table, day)
+    return table
+
+
+def rs_lookup(table):
+    """{code: (rs_3m, rs_6m)} (_scan_ticker에 넘기기 쉬운 형태)"""
+    if table is None or table.empty:
+        return {}
+    return {code: (int(r3), int(r6)) for code, r3, r6 in zip(table.index, table["rs_3m"], table["rs_6m"])}
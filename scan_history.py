@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+scan_history.py - 일일 스캔 결과 이력 (날짜별로 나눈 Parquet 데이터셋)
+data/history/date=YYYY-MM-DD/part-0.parquet 에 하루치 결과를 정해진 스키마로 저장합니다.
+- code는 6자리 문자열, 시장/섹터/셋업/전략은 카테고리(dictionary), 점수는 float32
+- score_details(JSON 문자열)는 sd_<항목> 정수 컬럼으로 펼쳐서 저장
+- load_history로 필요한 날짜/컬럼만 읽음 (CSV를 전부 읽어 다시 파싱하지 않음)
+merge_chunks가 매일 결과를 추가하고, 기존 scanner_output_*.csv는 `python scan_history.py`로 한 번에 옮길 수 있습니다.
+"""
+import os
+import re
+import glob
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+HISTORY_DIR = os.path.join("data", "history")
+SCORE_DETAIL_KEYS = [
+    "trend_ma20", "trend_ma50", "trend_ma200", "trend_align_20_50", "trend_align_50_200", "trend_adx",
+    "pat_door_knock", "pat_squeeze", "pat_setup_a", "pat_setup_b", "pat_setup_c", "pat_rs_3m", "pat_rs_6m",
+    "vol_explosion", "vol_dryup", "vol_today",
+    "sup_foreign_consec", "sup_foreign_net", "sup_inst_net",
+    "risk_safe", "risk_deduction",
+]
+
+_cat = pa.dictionary(pa.int16(), pa.string())
+_strat = [f for i in (1, 2, 3) for f in (
+    (f"strat{i}_type", _cat), (f"strat{i}_name", _cat),
+    (f"strat{i}_entry", pa.float64()), (f"strat{i}_stop", pa.float64()), (f"strat{i}_risk", pa.float32()),
+)]
+# 날짜(date)는 파티션 경로에 들어가므로 파일 스키마에는 없음
+HISTORY_SCHEMA = pa.schema([
+    ("rank", pa.int16()), ("code", pa.string()), ("name", pa.string()),
+    ("market", _cat), ("mktcap", pa.int64()), ("sector", _cat),
+    ("rs_3m", pa.int8()), ("rs_6m", pa.int8()),
+    ("close", pa.float64()), ("stop", pa.float64()),
+    ("trend_score", pa.float32()), ("pattern_score", pa.float32()), ("volume_score", pa.float32()),
+    ("supply_score", pa.float32()), ("risk_score", pa.float32()), ("total_score", pa.float32()),
+    ("risk_pct", pa.float32()), ("bbw_pct", pa.float32()), ("adx", pa.float32()),
+    ("setup", _cat), ("ma20", pa.float64()), ("ma60", pa.float64()), ("bb_upper", pa.float64()),
+    ("door_knock", pa.bool_()), ("squeeze", pa.bool_()),
+    *[(f"sd_{k}", pa.int8()) for k in SCORE_DETAIL_KEYS],
+    *_strat,
+    ("foreign_consec_buy", pa.int16()), ("foreign_net_5d", pa.float64()), ("inst_net_5d", pa.float64()),
+    ("scan_date", pa.timestamp("s")), ("chunk", pa.int16()),
+    ("keywords", pa.string()), ("news_count", pa.int16()),
+])
+# 결측이 있는 정수/불리언 컬럼도 float로 바뀌지 않도록 pandas nullable 타입으로 읽음
+_PANDAS_TYPES = {
+    pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(), pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype(),
+}
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive")
+_DAY_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+
+def _expand_score_details(values):
+    """JSON 문자열 목록 → {sd_<항목>: 배열} (항목이 없으면 0, score_details 자체가 없으면 결측)"""
+    out = {f"sd_{k}": np.zeros(len(values), dtype=np.float64) for k in SCORE_DETAIL_KEYS}
+    unknown = set()
+    for i, s in enumerate(values):
+        if isinstance(s, str):
+            try:
+                d = json.loads(s)
+            except ValueError:
+                d = None
+        else:
+            d = s if isinstance(s, dict) else None
+        if d is None:
+            for col in out.values():
+                col[i] = np.nan
+            continue
+        for k, v in d.items():
+            if k in SCORE_DETAIL_KEYS:
+                out[f"sd_{k}"][i] = v
+            else:
+                unknown.add(k)
+    if unknown:
+        print(f"[WARN] 이력 스키마에 없는 score_details 항목 무시: {', '.join(sorted(unknown))}")
+    return out
+
+
+def to_history_table(df):
+    """스캔 결과 DataFrame(CSV와 같은 컬럼) → HISTORY_SCHEMA Arrow 테이블"""
+    df = df.copy()
+    if "code" in df.columns:
+        df["code"] = df["code"].astype(str).str.replace(r"\.0$", "", regex=True).str.zfill(6)
+    if "score_details" in df.columns:
+        for col, arr in _expand_score_details(df.pop("score_details").tolist()).items():
+            df[col] = arr
+    if "scan_date" in df.columns:
+        df["scan_date"] = pd.to_datetime(df["scan_date"], errors="coerce")
+    dropped = [c for c in df.columns if c not in HISTORY_SCHEMA.names]
+    if dropped:
+        print(f"[WARN] 이력 스키마에 없는 컬럼 무시: {', '.join(dropped)}")
+    arrays = []
+    for field in HISTORY_SCHEMA:
+        if field.name not in df.columns:
+            arrays.append(pa.nulls(len(df), field.type))
+            continue
+        s = df[field.name]
+        if pa.types.is_integer(field.type):
+            s = pd.to_numeric(s, errors="coerce").round()
+        elif pa.types.is_floating(field.type):
+            s = pd.to_numeric(s, errors="coerce")
+        elif pa.types.is_string(field.type) or pa.types.is_dictionary(field.type):
+            s = s.where(s.notna(), None).map(lambda v: v if v is None else str(v))
+        elif pa.types.is_boolean(field.type):
+            s = s.map(lambda v: None if pd.isna(v) else str(v).lower() in ("true", "1"))
+        arrays.append(pa.array(s, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=HISTORY_SCHEMA)
+
+
+def _partition_dir(day, history_dir=HISTORY_DIR):
+    return os.path.join(history_dir, f"date={day}")
+
+
+def append_history(df, day, history_dir=HISTORY_DIR):
+    """하루치 결과 저장 (같은 날짜가 이미 있으면 교체 - 재실행해도 중복되지 않음)"""
+    table = to_history_table(df)
+    part = _partition_dir(day, history_dir)
+    tmp = part + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    pq.write_table(table, os.path.join(tmp, "part-0.parquet"), compression="zstd")
+    shutil.rmtree(part, ignore_errors=True)
+    os.replace(tmp, part)
+    return table.num_rows
+
+
+def history_dates(history_dir=HISTORY_DIR):
+    """저장된 날짜 목록 (오름차순 문자열)"""
+    return sorted(os.path.basename(p)[5:] for p in glob.glob(os.path.join(history_dir, "date=*"))
+                  if not p.endswith(".tmp"))
+
+
+def load_history(dates=None, start=None, end=None, columns=None, codes=None, history_dir=HISTORY_DIR):
+    """
+    이력 읽기 → DataFrame (date 컬럼 포함, 카테고리 컬럼은 pandas category)
+    - dates: 날짜 목록, start/end: 날짜 구간 (둘 다 주면 모두 만족하는 날짜만)
+    - columns: 읽을 컬럼 (None이면 전체), codes: 종목코드 목록
+    해당 파티션/컬럼만 읽음
+    """
+    if not history_dates(history_dir):
+        return pd.DataFrame(columns=["date"] + (list(columns) if columns else HISTORY_SCHEMA.names))
+    dataset = ds.dataset(history_dir, format="parquet", partitioning=PARTITIONING,
+                         schema=HISTORY_SCHEMA.append(pa.field("date", pa.date32())),
+                         exclude_invalid_files=True, ignore_prefixes=[".", "_"])
+    expr = None
+    def _and(e):
+        return e if expr is None else expr & e
+    if dates is not None:
+        expr = _and(ds.field("date").isin(pa.array(pd.to_datetime(list(dates)).date, type=pa.date32())))
+    if start is not None:
+        expr = _and(ds.field("date") >= pa.scalar(pd.Timestamp(start).date(), type=pa.date32()))
+    if end is not None:
+        expr = _and(ds.field("date") <= pa.scalar(pd.Timestamp(end).date(), type=pa.date32()))
+    if codes is not None:
+        expr = _and(ds.field("code").isin([str(c).zfill(6) for c in codes]))
+    cols = None if columns is None else ["date"] + [c for c in columns if c != "date"]
+    table = dataset.to_table(columns=cols, filter=expr)
+    df = table.to_pandas(types_mapper=_PANDAS_TYPES.get)
+    df["date"] = pd.to_datetime(df["date"])
+    # 날짜 안에서는 저장할 때의 행 순서(총점 순) 유지
+    return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+def backfill_history(data_dir="data", history_dir=HISTORY_DIR, overwrite=False):
+    """기존 data/scanner_output_YYYY-MM-DD.csv 들을 이력 데이터셋으로 옮김"""
+    done = set(history_dates(history_dir))
+    added = 0
+    for path in sorted(glob.glob(os.path.join(data_dir, "scanner_output_*.csv"))):
+        m = _DAY_RE.search(os.path.basename(path))
+        if not m or (m.group(1) in done and not overwrite):
+            continue
+        try:
+            df = pd.read_csv(path, dtype={"code": str})
+        except Exception as e:
+            print(f"[WARN] {path} 읽기 실패: {e}")
+            continue
+        if df.empty:
+            continue
+        n = append_history(df, m.group(1), history_dir)
+        print(f"[HISTORY] {m.group(1)}: {n}개")
+        added += 1
+    return added
+
+
+if __name__ == "__main__":
+    print(f"[HISTORY] {backfill_history()}일치 추가, 전체 {len(history_dates())}일")
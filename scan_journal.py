@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+scan_journal.py - 청크 실행 중간 결과 저널 (체크포인트/재개)
+data/partial/journal_{날짜}_chunk{n}.jsonl 에 종목 하나가 끝날 때마다 한 줄씩 추가합니다.
+- tech: STEP1 결과 (통과 결과 또는 탈락, 소요 시간, 오류 메시지)
+- enrich: STEP2 수급/뉴스 조회 결과
+같은 날짜로 다시 실행하면 저널에 있는 종목은 건너뛰고(오류로 끝난 종목은 다시 시도),
+마지막에 partial CSV를 쓰고 나면 저널을 지웁니다.
+"""
+import os
+import json
+
+import numpy as np
+
+PARTIAL_DIR = os.path.join("data", "partial")
+
+
+def journal_path(scan_day, chunk, partial_dir=PARTIAL_DIR):
+    return os.path.join(partial_dir, f"journal_{scan_day}_chunk{chunk}.jsonl")
+
+
+def _json_default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+def load_journal(scan_day, chunk, partial_dir=PARTIAL_DIR):
+    """{"tech": {code: 기록}, "enrich": {code: 기록}} (같은 종목은 마지막 기록 사용, 깨진 줄은 무시)"""
+    done = {"tech": {}, "enrich": {}}
+    path = journal_path(scan_day, chunk, partial_dir)
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+                done[rec["stage"]][rec["code"]] = rec
+            except Exception:
+                continue  # 중간에 죽으면서 잘린 마지막 줄
+    # 오류로 끝난 종목은 완료로 보지 않음 (재실행 시 다시 시도)
+    done["tech"] = {c: r for c, r in done["tech"].items() if not r.get("error")}
+    return done
+
+
+def append_journal(scan_day, chunk, record, partial_dir=PARTIAL_DIR):
+    """기록 한 줄 추가 (바로 flush 해서 프로세스가 죽어도 남도록)"""
+    os.makedirs(partial_dir, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, default=_json_default)
+    with open(journal_path(scan_day, chunk, partial_dir), "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def clear_journal(scan_day, chunk, partial_dir=PARTIAL_DIR):
+    path = journal_path(scan_day, chunk, partial_dir)
+    if os.path.exists(path):
+        os.remove(path)
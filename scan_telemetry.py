@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+scan_telemetry.py - 스캔 실행 리포트 (단계별 소요 시간 + 탈락 사유)
+청크마다 data/partial/run_report_{날짜}_chunk{n}.json 을 partial CSV 옆에 쓰고,
+merge_chunks가 모든 청크 리포트를 합쳐 data/run_reports/run_report_{날짜}.json 으로 저장합니다.
+- run_stages: 실행 단위 단계 (날짜별 일괄 수집, 종목 목록, 수익률 표, 섹터 순위, 지수 확인, STEP1/STEP2 전체)
+- ticker_stages: 종목별 단계 합계 (가격 조회, 시그널, 점수, 전략, 수급, 뉴스)
+  병렬 실행이면 프로세스/스레드 합계라 실제 경과 시간보다 클 수 있음
+- skips: STEP1 탈락 사유별 종목 수 (짧은 이력, 거래량 0, 최소 주가, 예외 종류 등)
+- enrich_errors: STEP2 수급/뉴스 조회 실패 수 (예외 종류별, 해당 종목은 기본값으로 진행)
+- http: 호스트별 요청/재시도/오류 수 (메인 프로세스 기준 - 수급/뉴스, workers=1이면 가격 조회 포함)
+"""
+import os
+import glob
+import json
+import time
+from contextlib import contextmanager
+
+PARTIAL_DIR = os.path.join("data", "partial")
+REPORT_DIR = os.path.join("data", "run_reports")
+TICKER_STAGES = ("fetch", "signals", "score", "strategies", "investor", "news")
+TOP_SLOWEST = 20
+
+
+@contextmanager
+def stage(timings, name):
+    """with 블록 소요 시간(초)을 timings[name]에 더함 (timings가 None이면 측정 안 함)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0.0) + time.perf_counter() - started, 4)
+
+
+def skip(timings, reason):
+    """탈락 사유 기록 후 None 반환 (스캔 함수에서 return skip(timings, "...") 형태로 사용)"""
+    if timings is not None:
+        timings["skip"] = reason
+    return None
+
+
+def report_path(scan_day, chunk, partial_dir=PARTIAL_DIR):
+    return os.path.join(partial_dir, f"run_report_{scan_day}_chunk{chunk}.json")
+
+
+def new_report(scan_day, chunk, run_stages=None):
+    return {
+        "scan_day": scan_day, "chunk": chunk,
+        "started_at": time.strftime("%Y-%m-%d %H:%M:%S"), "_t0": time.perf_counter(),
+        "run_stages": dict(run_stages or {}), "tickers": {}, "resumed": 0,
+    }
+
+
+def add_ticker(report, code, seconds, timings=None, error=None):
+    """STEP1 종목 하나 기록 (저널 기록과 같은 정보). 오류는 예외 종류를 탈락 사유로 집계"""
+    rec = {"seconds": round(float(seconds), 4), **(timings or {})}
+    if error:
+        rec["skip"] = "error:" + error.split(":", 1)[0]
+    report["tickers"][code] = rec
+
+
+def add_enrich(report, enrich_timings):
+    """STEP2 종목별 수급/뉴스 소요 시간 {code: {"investor": 초, "news": 초, "investor_error": 예외 종류, ...}}"""
+    for code, t in enrich_timings.items():
+        report["tickers"].setdefault(code, {}).update(t)
+
+
+def _count(counts):
+    return dict(sorted(counts.items(), key=lambda x: -x[1]))
+
+
+def summarize(tickers):
+    """종목별 기록 → {ticker_stages: 단계 합계, skips: 탈락 사유 개수, enrich_errors: 조회 실패 개수, slowest: 느린 종목}"""
+    stages = {k: 0.0 for k in TICKER_STAGES}
+    skips, errors = {}, {}
+    for rec in tickers.values():
+        for k in TICKER_STAGES:
+            stages[k] += rec.get(k, 0.0)
+        if rec.get("skip"):
+            skips[rec["skip"]] = skips.get(rec["skip"], 0) + 1
+        for kind in ("investor", "news"):
+            if rec.get(f"{kind}_error"):
+                key = f"{kind}:{rec[f'{kind}_error']}"
+                errors[key] = errors.get(key, 0) + 1
+    slowest = sorted(((c, r["seconds"]) for c, r in tickers.items() if "seconds" in r), key=lambda x: -x[1])
+    return {
+        "ticker_stages": {k: round(v, 2) for k, v in stages.items()},
+        "skips": _count(skips), "enrich_errors": _count(errors),
+        "slowest": [{"code": c, "seconds": s} for c, s in slowest[:TOP_SLOWEST]],
+    }
+
+
+def finish_report(report, http_stats=None):
+    """집계 필드 채움 (파일에 쓰기 전 호출)"""
+    scanned = [r for r in report["tickers"].values() if "seconds" in r]
+    report.update(summarize(report["tickers"]))
+    report.update({
+        "wall_seconds": round(time.perf_counter() - report.pop("_t0", time.perf_counter()), 2),
+        "counts": {"scanned": len(scanned), "passed": sum(1 for r in scanned if not r.get("skip")),
+                   "errors": sum(1 for r in scanned if str(r.get("skip", "")).startswith("error:")),
+                   "resumed": report.get("resumed", 0)},
+        "http": http_stats or {},
+    })
+    return report
+
+
+def write_report(report, partial_dir=PARTIAL_DIR):
+    os.makedirs(partial_dir, exist_ok=True)
+    path = report_path(report["scan_day"], report["chunk"], partial_dir)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def print_report(report, prefix="[REPORT]"):
+    stages = {**report.get("run_stages", {}), **report.get("ticker_stages", {})}
+    print(f"{prefix} 단계별(초): " + ", ".join(f"{k} {v:.1f}" for k, v in stages.items() if v))
+    if report.get("skips"):
+        print(f"{prefix} 탈락 사유: " + ", ".join(f"{k} {v}" for k, v in report["skips"].items()))
+    if report.get("enrich_errors"):
+        print(f"{prefix} 수급/뉴스 조회 실패: " + ", ".join(f"{k} {v}" for k, v in report["enrich_errors"].items()))
+    if report.get("slowest"):
+        print(f"{prefix} 느린 종목: " + ", ".join(f"{s['code']} {s['seconds']:.1f}s" for s in report["slowest"][:5]))
+
+
+def load_reports(scan_day, partial_dir=PARTIAL_DIR):
+    reports = []
+    for path in sorted(glob.glob(os.path.join(partial_dir, f"run_report_{scan_day}_chunk*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        except Exception as e:
+            print(f"[WARN] 실행 리포트 읽기 실패 {path}: {e}")
+    return reports
+
+
+def merge_reports(reports):
+    """청크 리포트들 → 하루 리포트 (단계/사유/HTTP는 합계, 종목별 기록은 느린 종목만 남김)"""
+    tickers, run_stages, http, chunks = {}, {}, {}, {}
+    for r in reports:
+        tickers.update(r.get("tickers", {}))
+        for k, v in r.get("run_stages", {}).items():
+            run_stages[k] = round(run_stages.get(k, 0.0) + v, 2)
+        for host, s in r.get("http", {}).items():
+            h = http.setdefault(host, {"requests": 0, "retries": 0, "errors": 0, "latency_sum": 0.0, "latency_max": 0.0})
+            for k in ("requests", "retries", "errors", "latency_sum"):
+                h[k] += s.get(k, 0)
+            h["latency_max"] = max(h["latency_max"], s.get("latency_max", 0.0))
+        chunks[str(r.get("chunk"))] = {"wall_seconds": r.get("wall_seconds"), **r.get("counts", {})}
+    for h in http.values():
+        h["latency_avg"] = h["latency_sum"] / h["requests"] if h["requests"] else 0.0
+    return {
+        "scan_day": reports[0]["scan_day"] if reports else None,
+        "chunks": chunks, "run_stages": run_stages, **summarize(tickers),
+        "counts": {k: sum(c.get(k, 0) for c in chunks.values()) for k in ("scanned", "passed", "errors", "resumed")},
+        "wall_seconds_max": max((c["wall_seconds"] or 0 for c in chunks.values()), default=0),
+        "http": http,
+    }
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
 def bollinger_bands(close, n=20, k=2.0):
     mid = close.rolling(n).mean()
@@ -12,11 +13,29 @@ def bollinger_bands(close, n=20, k=2.0):
 def bandwidth(mid, upper, lower):
     return (upper - lower) / mid.replace(0, np.nan)
 
+def rolling_percentile_rank(a, lookback, block=256):
+    """
+    percentile_rank의 NumPy 커널 (1-D 또는 날짜 × 종목 2-D, axis=0 방향 롤링)
+    윈도우 마지막 값 이하인 값의 비율을 한 번의 벡터 비교로 계산. 윈도우 안에 NaN/inf가 있으면 NaN (pandas rolling과 동일)
+    """
+    a = np.asarray(a, dtype=float)
+    a2 = a[:, None] if a.ndim == 1 else a
+    out = np.full(a2.shape, np.nan)
+    if lookback >= 2 and a2.shape[0] >= lookback:
+        # 종목 block개씩 나눠 비교용 임시 배열 크기를 제한
+        for j in range(0, a2.shape[1], block):
+            win = sliding_window_view(a2[:, j:j + block], lookback, axis=0)
+            res = 100.0 * ((win <= win[..., -1:]).sum(axis=-1) - 1) / (lookback - 1)
+            res[~np.isfinite(win).all(axis=-1)] = np.nan
+            out[lookback - 1:, j:j + block] = res
+    return out.reshape(a.shape)
+
 def percentile_rank(s, lookback):
-    def pct(x):
-        if len(x) < 2: return np.nan
-        return 100.0 * (np.sum(x <= x[-1]) - 1) / (len(x) - 1)
-    return s.rolling(lookback).apply(pct, raw=True)
+    """롤링 백분위 순위 (Series 또는 DataFrame). 값은 rolling().apply 버전과 동일"""
+    values = rolling_percentile_rank(s.to_numpy(dtype=float), lookback)
+    if isinstance(s, pd.DataFrame):
+        return pd.DataFrame(values, index=s.index, columns=s.columns)
+    return pd.Series(values, index=s.index, name=s.name)
 
 def adx(high, low, close, n=14):
     up = high.diff()
@@ -101,6 +120,107 @@ def calculate_signals(df, cfg):
         "setup_a": setup_a, "setup_b": setup_b, "setup_c": setup_c,
     }
 
+def _rolling_mean_np(a, w):
+    """
+    rolling(w).mean()과 같은 값을 NumPy 배열로 반환
+    정수값 배열(원 단위 가격, 거래량)은 누적합 차분으로 오차 없이 계산, 그 외에는 pandas rolling 사용
+    """
+    out = np.full(len(a), np.nan)
+    if len(a) < w:
+        return out
+    if np.isfinite(a).all() and np.abs(a).sum() < 2 ** 53 and (a == np.trunc(a)).all():
+        cs = np.concatenate(([0.0], np.cumsum(a)))
+        out[w - 1:] = (cs[w:] - cs[:-w]) / w
+        return out
+    return pd.Series(a).rolling(w).mean().to_numpy()
+
+def calculate_signals_tail(df, cfg, explosion_lookback=60):
+    """
+    score_stock / calculate_strategies 전용 마지막 봉 시그널 (calculate_signals와 같은 키, 같은 값)
+    - 각 Series는 마지막 봉 하나만 가짐 (vol_explosion만 최근 explosion_lookback봉)
+    - 볼린저 표준편차와 ADX의 DX 평균은 이력에 따라 반올림이 달라지므로 전체 구간을 pandas로 계산
+    """
+    if df is None or len(df) < 60:
+        return None
+    close = df["Close"].to_numpy(dtype=float)
+    high = df["High"].to_numpy(dtype=float)
+    low = df["Low"].to_numpy(dtype=float)
+    vol = df["Volume"].to_numpy(dtype=float)
+
+    bb = cfg.get("bollinger", {})
+    n, k = bb.get("length", 60), bb.get("stdev", 2)
+    lookback = bb.get("bandwidth_lookback", 60)
+    close_s = df["Close"].astype(float)
+    mid = close_s.rolling(n).mean().to_numpy()
+    sd = close_s.rolling(n).std(ddof=0).to_numpy()
+    upper = mid + k * sd
+    lower = mid - k * sd
+
+    # 밴드폭 백분위: 마지막 lookback개 밴드폭만 사용
+    bbw_pct = np.nan
+    if 2 <= lookback <= len(df):
+        m = mid[-lookback:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            win = (upper[-lookback:] - lower[-lookback:]) / np.where(m == 0, np.nan, m)
+        if np.isfinite(win).all():
+            bbw_pct = 100.0 * (np.sum(win <= win[-1]) - 1) / (lookback - 1)
+
+    # ADX
+    adx_len = cfg.get("trend", {}).get("adx_len", 14)
+    up = np.concatenate(([np.nan], np.diff(high)))
+    down = -np.concatenate(([np.nan], np.diff(low)))
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+        minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+        atr = _rolling_mean_np(tr, adx_len)
+        plus_di = 100 * _rolling_mean_np(plus_dm, adx_len) / atr
+        minus_di = 100 * _rolling_mean_np(minus_dm, adx_len) / atr
+        denom = plus_di + minus_di
+        dx = 100 * np.abs(plus_di - minus_di) / np.where(denom == 0, np.nan, denom)
+    adx_val = pd.Series(dx).rolling(adx_len).mean().iloc[-1]
+
+    ma20 = _rolling_mean_np(close, 20)
+    ma50 = _rolling_mean_np(close, 50)[-1]
+    ma200 = _rolling_mean_np(close, 200)[-1]
+    vol_ma20 = _rolling_mean_np(vol, 20)
+
+    vol_mult = cfg.get("volume", {})
+    with np.errstate(invalid="ignore"):
+        is_climax = vol >= vol_mult.get("climax_mult", 5.0) * vol_ma20
+        climax_idx = np.flatnonzero(is_climax)
+        climax_high = high[climax_idx[-1]] if len(climax_idx) else np.nan
+        climax_low = low[climax_idx[-1]] if len(climax_idx) else np.nan
+
+        c, u, v, vm = close[-1], upper[-1], vol[-1], vol_ma20[-1]
+        door_knock = bool((c >= u * 0.95) & (c <= u * 1.02))
+        squeeze = bool(bbw_pct <= 20)
+        vol_confirm = bool(v >= vol_mult.get("vol_confirm_mult", 1.5) * vm)
+        vol_explosion = vol[-explosion_lookback:] >= vol_ma20[-explosion_lookback:] * 3
+        vol_dryup_count = float(np.sum(vol[-15:] < vol_ma20[-15:] * 0.7)) if len(df) >= 15 else np.nan
+
+        adx_ok = bool(adx_val >= cfg.get("trend", {}).get("adx_min", 20))
+        setup_a = squeeze and bool(c > u) and vol_confirm and adx_ok
+        setup_b = bool(not np.isnan(climax_high) and c > climax_high) and vol_confirm
+        ma20_crossover = bool((c > ma20[-1]) & (close[-2] <= ma20[-2]))
+        setup_c = ma20_crossover and vol_confirm and adx_ok
+
+    idx = df.index[-1:]
+    last = {
+        "upper": u, "lower": lower[-1], "mid": mid[-1],
+        "bbw_pct": bbw_pct, "adx": adx_val,
+        "ma20": ma20[-1], "ma50": ma50, "ma200": ma200,
+        "vol_ma20": vm, "vol_confirm": vol_confirm,
+        "climax_high": climax_high, "climax_low": climax_low, "is_climax": bool(is_climax[-1]),
+        "door_knock": door_knock, "squeeze": squeeze,
+        "vol_dryup_count": vol_dryup_count,
+        "setup_a": setup_a, "setup_b": setup_b, "setup_c": setup_c,
+    }
+    sig = {key: pd.Series([val], index=idx) for key, val in last.items()}
+    sig["vol_explosion"] = pd.Series(vol_explosion, index=df.index[-explosion_lookback:])
+    return sig
+
 def score_stock(df, sig, cfg, mktcap=None, investor_data=None, rs_3m=0, rs_6m=0, index_above_ma20=True):
     """
     종합 점수 계산 (100점 만점)
@@ -319,12 +439,10 @@ def calculate_strategies(df, sig, cfg):
     bb_upper = safe_get(sig["upper"], last, close * 1.05)
     climax_low = safe_get(sig["climax_low"], last, 0)
     
-    # ATR(20) 계산
-    tr = pd.concat([
-        df['High'] - df['Low'],
-        (df['High'] - df['Close'].shift(1)).abs(),
-        (df['Low'] - df['Close'].shift(1)).abs()
-    ], axis=1).max(axis=1)
+    # ATR(20) 계산 (True Range는 NumPy로 - concat().max()와 같은 값)
+    high, low = df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float)
+    prev_close = df['Close'].shift(1).to_numpy(dtype=float)
+    tr = pd.Series(np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close)), index=df.index)
     atr20 = tr.rolling(20).mean().iloc[-1] if len(df) >= 20 else close * 0.02
     
     # 최근 10일 최저가 (climax_low 없을 때 사용)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+scanner_panel.py - 전 종목 일괄(패널) 시그널 계산
+날짜 × 종목 행렬로 OHLCV를 받아 calculate_signals와 같은 시그널을 한 번에 계산합니다.
+- 이동평균/표준편차는 pandas 2-D rolling (종목별 계산과 같은 커널이라 값이 비트 단위로 일치)
+- 나머지 비교/조합은 2-D NumPy 연산
+- 상장 전 구간(앞쪽 NaN)은 괜찮지만, 중간에 빠진 날짜가 있는 종목은 종목별 계산과 달라질 수 있음
+- 값이 모두 NaN인 종목은 시그널 없음/점수 NaN (vol_dryup_count만 종목별 계산의 0 대신 NaN)
+"""
+import numpy as np
+import pandas as pd
+from scanner_core import rolling_percentile_rank
+
+PANEL_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def build_panel(frames, fields=PANEL_FIELDS):
+    """{code: OHLCV DataFrame} → {field: 날짜 × 종목 DataFrame} (날짜는 전체 합집합)"""
+    frames = {code: df for code, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return {f: pd.DataFrame() for f in fields}
+    wide = pd.concat({code: df[fields] for code, df in frames.items()}, axis=1).sort_index()
+    return {f: wide.xs(f, axis=1, level=1).astype(float) for f in fields}
+
+
+def _shift(a, k=1):
+    out = np.full_like(a, np.nan)
+    out[k:] = a[:-k]
+    return out
+
+
+def _ffill(a):
+    """열(종목)별 forward fill"""
+    mask = ~np.isnan(a)
+    idx = np.where(mask, np.arange(a.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    out = a[idx, np.arange(a.shape[1])]
+    out[~np.maximum.accumulate(mask, axis=0)] = np.nan
+    return out
+
+
+def calculate_signals_panel(panel, cfg, cache=None):
+    """
+    calculate_signals의 패널 버전
+    반환: calculate_signals와 같은 키의 dict, 값은 날짜 × 종목 DataFrame
+    cache: 같은 패널로 설정만 바꿔 여러 번 계산할 때 쓰는 dict (파라미터 스윕용)
+           이동평균/ADX/밴드폭 백분위 등 중간 결과를 (이름, 파라미터) 키로 보관해 다시 계산하지 않음
+    """
+    def cached(key, fn):
+        if cache is None:
+            return fn()
+        if key not in cache:
+            cache[key] = fn()
+        return cache[key]
+
+    close_df = panel["Close"]
+    if close_df is None or close_df.empty:
+        return None
+    dates, codes = close_df.index, close_df.columns
+    close = close_df.to_numpy(dtype=float)
+    high = panel["High"].to_numpy(dtype=float)
+    low = panel["Low"].to_numpy(dtype=float)
+    vol = panel["Volume"].to_numpy(dtype=float)
+
+    def frame(a):
+        return pd.DataFrame(a, index=dates, columns=codes)
+
+    def rolling_mean(a, n):
+        return frame(a).rolling(n).mean().to_numpy()
+
+    n = cfg.get("bollinger", {}).get("length", 60)
+    k = cfg.get("bollinger", {}).get("stdev", 2)
+    mid = cached(("ma", n), lambda: rolling_mean(close, n))
+    sd = cached(("std", n), lambda: frame(close).rolling(n).std(ddof=0).to_numpy())
+    upper = mid + k * sd
+    lower = mid - k * sd
+    lookback = cfg.get("bollinger", {}).get("bandwidth_lookback", 60)
+
+    def bbw_pct_():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bbw = (upper - lower) / np.where(mid == 0, np.nan, mid)
+        return rolling_percentile_rank(bbw, lookback)
+    bbw_pct = cached(("bbw_pct", n, k, lookback), bbw_pct_)
+
+    # ADX
+    adx_len = cfg.get("trend", {}).get("adx_len", 14)
+
+    def adx_():
+        up = high - _shift(high)
+        down = -(low - _shift(low))
+        with np.errstate(invalid="ignore"):
+            plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+            minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+        prev_close = _shift(close)
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+        atr = rolling_mean(tr, adx_len)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            plus_di = 100 * rolling_mean(plus_dm, adx_len) / atr
+            minus_di = 100 * rolling_mean(minus_dm, adx_len) / atr
+            denom = plus_di + minus_di
+            denom = np.where(denom == 0, np.nan, denom)
+            dx = 100 * np.abs(plus_di - minus_di) / denom
+        return rolling_mean(dx, adx_len)
+    adx_val = cached(("adx", adx_len), adx_)
+
+    ma20 = cached(("ma", 20), lambda: rolling_mean(close, 20))
+    ma50 = cached(("ma", 50), lambda: rolling_mean(close, 50))
+    ma200 = cached(("ma", 200), lambda: rolling_mean(close, 200))
+    vol_ma20 = cached(("vol_ma", 20), lambda: rolling_mean(vol, 20))
+
+    with np.errstate(invalid="ignore"):
+        climax_mult = cfg.get("volume", {}).get("climax_mult", 5.0)
+        is_climax = vol >= (climax_mult * vol_ma20)
+        climax_high, climax_low = cached(("climax", climax_mult), lambda: (
+            _ffill(np.where(is_climax, high, np.nan)), _ffill(np.where(is_climax, low, np.nan))))
+
+        # Door Knock: BB상단의 95%~102%
+        door_knock = (close >= upper * 0.95) & (close <= upper * 1.02)
+        # Squeeze: 밴드폭 하위 20%
+        squeeze = bbw_pct <= 20
+
+        vol_confirm_mult = cfg.get("volume", {}).get("vol_confirm_mult", 1.5)
+        vol_confirm = vol >= vol_confirm_mult * vol_ma20
+        vol_explosion = vol >= vol_ma20 * 3
+        vol_dryup = vol < vol_ma20 * 0.7
+        # 상장 전(NaN) 구간은 종목별 계산처럼 윈도우에서 빠지도록 NaN 유지
+        vol_dryup_count = cached(("dryup_count",), lambda: frame(np.where(np.isnan(vol), np.nan, vol_dryup)).rolling(15).sum().to_numpy())
+
+        adx_min = cfg.get("trend", {}).get("adx_min", 20)
+        adx_ok = adx_val >= adx_min
+        breakout_60 = close > upper
+        setup_a = squeeze & breakout_60 & vol_confirm & adx_ok
+        setup_b = ~np.isnan(climax_high) & (close > climax_high) & vol_confirm
+        ma20_crossover = (close > ma20) & (_shift(close) <= _shift(ma20))
+        setup_c = ma20_crossover & vol_confirm & adx_ok
+
+    out = {
+        "upper": upper, "lower": lower, "mid": mid,
+        "bbw_pct": bbw_pct, "adx": adx_val,
+        "ma20": ma20, "ma50": ma50, "ma200": ma200,
+        "vol_ma20": vol_ma20, "vol_confirm": vol_confirm,
+        "climax_high": climax_high, "climax_low": climax_low, "is_climax": is_climax,
+        "door_knock": door_knock, "squeeze": squeeze,
+        "vol_explosion": vol_explosion, "vol_dryup_count": vol_dryup_count,
+        "setup_a": setup_a, "setup_b": setup_b, "setup_c": setup_c,
+    }
+    return {key: frame(val) for key, val in out.items()}
+
+
+def signals_for(panel_sig, code, index=None):
+    """패널 결과에서 한 종목의 시그널 dict 추출 (score_stock/calculate_strategies에 그대로 사용)"""
+    sig = {key: val[code] for key, val in panel_sig.items()}
+    if index is not None:
+        sig = {key: s.reindex(index) for key, s in sig.items()}
+    return sig
+
+
+def _tiers(x, bounds, points):
+    """x >= bounds[i] 인 첫 구간의 점수 (bounds 내림차순), 해당 없으면 0"""
+    with np.errstate(invalid="ignore"):
+        return np.select([x >= b for b in bounds], points, default=0)
+
+
+def score_panel(panel, sig, cfg, rs_3m=0, rs_6m=0, index_above_ma20=True):
+    """
+    score_stock의 패널 버전 (수급 점수 제외) → 날짜 × 종목 총점 DataFrame
+    모든 날짜에 대해 그날을 마지막 봉으로 보고 score_stock을 계산한 것과 같은 값
+    """
+    close = panel["Close"].to_numpy(dtype=float)
+    low = panel["Low"].to_numpy(dtype=float)
+    vol = panel["Volume"].to_numpy(dtype=float)
+    get = lambda k: sig[k].to_numpy(dtype=float)
+    fill = lambda a, d: np.where(np.isnan(a), d, a)
+    ma20, ma50, ma200 = fill(get("ma20"), close), fill(get("ma50"), close), fill(get("ma200"), close)
+    adx_val, vol_ma20 = fill(get("adx"), 0), fill(get("vol_ma20"), 1)
+    flag = lambda k: sig[k].fillna(False).to_numpy(dtype=bool)
+    door_knock, squeeze, vol_confirm = flag("door_knock"), flag("squeeze"), flag("vol_confirm")
+    setup_a, setup_b, setup_c = flag("setup_a"), flag("setup_b"), flag("setup_c")
+
+    trend = 5 * (close > ma20) + 5 * (close > ma50) + 5 * (close > ma200) + 3 * (ma20 > ma50) + 2 * (ma50 > ma200)
+    trend = np.minimum(trend + _tiers(adx_val, [40, 30, 25, 20], [5, 4, 3, 2]), 25)
+
+    setup_pts = np.select([setup_b, setup_a, setup_c], [5, 4, 3], default=0)
+    rs_pts = 5 * (np.asarray(rs_3m) >= 80) + 5 * (np.asarray(rs_6m) >= 80)
+    pattern = np.minimum(10 * door_knock + 10 * squeeze + setup_pts + rs_pts, 30)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_ratio = np.where(vol_ma20 > 0, vol / vol_ma20, 0)
+    explosion = pd.DataFrame(sig["vol_explosion"].fillna(False).to_numpy(dtype=float)).rolling(60, min_periods=1).max().to_numpy() > 0
+    dryup = _tiers(fill(get("vol_dryup_count"), 0), [5, 3, 1], [7, 5, 3])
+    with np.errstate(invalid="ignore"):
+        today = np.select([vol_confirm, (vol_ratio >= 1.2) & (vol_ratio < 2.0), vol_ratio >= 1.0], [8, 5, 3], default=0)
+    volume = np.minimum(5 * explosion + dryup + today, 20)
+
+    climax_low = get("climax_low")
+    swing_low = pd.DataFrame(low).rolling(10, min_periods=1).min().to_numpy()
+    stop = np.where(setup_b & ~np.isnan(climax_low), climax_low, swing_low)
+    stop = np.where(stop <= 0, close * 0.92, stop)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risk_pct = (close - stop) / close
+    risk_pct = np.where((risk_pct <= 0) | (risk_pct > 0.15), 0.08, risk_pct) * 100
+    if index_above_ma20:
+        deduction = np.select([risk_pct <= b for b in (5, 6, 7, 8, 9, 10, 11)], [0, 1, 2, 3, 5, 7, 9], default=10)
+    else:
+        deduction = np.select([risk_pct <= b for b in (5, 6, 7, 8)], [0, 2, 4, 6], default=10)
+    risk = np.maximum(10 - deduction, 0)
+
+    total = (trend + pattern + volume + risk).astype(float)
+    total[np.isnan(close)] = np.nan
+    return pd.DataFrame(total, index=panel["Close"].index, columns=panel["Close"].columns)
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+scanner_stream.py - 종목별 증분(스트리밍) 지표 상태
+새 일봉 하나를 push 하면 calculate_signals의 마지막 봉 시그널을 전체 이력 재계산 없이 갱신합니다.
+- 상태는 JSON으로 저장 가능한 dict (윈도우 값 + 롤링 합계)
+- 봉당 비용은 이력 길이와 무관 (이동평균/거래량/ATR은 O(1), 볼린저 표준편차/밴드폭 백분위만 O(기간))
+- 표준편차는 볼린저 기간 종가로 매번 다시 계산 (제곱합 누적은 큰 가격에서 오차가 쌓여 경계값 판정이 뒤집힘)
+scan_state(code, 스캔 구간 가격 이력) → score_state → data/stream_state/{code}.json
+- 상태가 없거나 설정이 바뀌었거나 가격 이력과 어긋나면(전체 재조회, 수정주가 변경, 장중 스냅샷이 확정값으로 바뀜)
+  이력 전체로 상태를 다시 만들고 None 반환 (호출 측은 calculate_signals_tail로 계산)
+- 스캔 구간 앞쪽으로 밀려난 클라이맥스 봉은 버림 (구간만 보는 calculate_signals_tail과 같은 결과)
+update_daily STEP1은 아직 이 경로를 쓰지 않음: 벤치마크(step1_stream)에서 step1보다 빠르지 않음
+"""
+import os
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from scanner_core import score_stock, calculate_strategies
+
+STATE_DIR = os.path.join("data", "stream_state")
+OHLCV_COLS = ["Open", "High", "Low", "Close", "Volume"]
+TAIL_BARS = 21  # calculate_strategies의 ATR(20) 계산에 필요한 봉 수
+MA_PERIODS = (20, 50, 200)
+EXPLOSION_LOOKBACK = 60  # score_stock의 vol_explosion.tail(60)
+STATE_VERSION = 2  # 상태 필드가 바뀌면 올림 (버전이 다른 저장 상태는 다시 만듦). 2: climax_date, 제곱합 제거
+
+
+def _nan(x):
+    return float("nan") if x is None else float(x)
+
+
+def _finite(x):
+    return x is not None and math.isfinite(x)
+
+
+def new_state(cfg):
+    """빈 상태 생성 (설정값도 함께 보관하여 설정이 바뀌면 다시 초기화할 수 있게 함)"""
+    bb = cfg.get("bollinger", {})
+    return {
+        "params": {
+            "version": STATE_VERSION,
+            "bb_len": int(bb.get("length", 60)),
+            "bb_k": float(bb.get("stdev", 2)),
+            "bb_lookback": int(bb.get("bandwidth_lookback", 60)),
+            "adx_len": int(cfg.get("trend", {}).get("adx_len", 14)),
+            "adx_min": float(cfg.get("trend", {}).get("adx_min", 20)),
+            "climax_mult": float(cfg.get("volume", {}).get("climax_mult", 5.0)),
+            "vol_confirm_mult": float(cfg.get("volume", {}).get("vol_confirm_mult", 1.5)),
+        },
+        "n_bars": 0,
+        "last_date": None,
+        "tail": [],            # 최근 TAIL_BARS개 [date, O, H, L, C, V]
+        "closes": [],          # 최근 max(200, bb_len)개 종가
+        "close_sums": {},      # 기간별 종가 합계
+        "vols": [],            # 최근 20개 거래량
+        "vol_sum": 0.0,
+        "bbw": [],             # 최근 bb_lookback개 밴드폭
+        "tr": [], "plus_dm": [], "minus_dm": [], "dx": [],
+        "tr_sum": 0.0, "plus_dm_sum": 0.0, "minus_dm_sum": 0.0,
+        "climax_high": None, "climax_low": None, "climax_date": None,
+        "dryup": [],           # 최근 15개 거래량 건조 여부
+        "bars_since_explosion": None,
+        "prev_ma20": None,
+        "last": {},            # 마지막 봉 시그널
+    }
+
+
+def _push_window(state, key, value, size, sum_key=None):
+    """윈도우에 값을 넣고, 밀려난 값을 합계에서 뺌"""
+    win = state[key]
+    win.append(value)
+    if sum_key is not None:
+        state[sum_key] += value
+    if len(win) > size:
+        old = win.pop(0)
+        if sum_key is not None:
+            state[sum_key] -= old
+
+
+def push_bar(state, date, open_, high, low, close, volume):
+    """일봉 하나 반영 후 마지막 봉 시그널(state['last']) 갱신"""
+    p = state["params"]
+    n, k, lookback, adx_len = p["bb_len"], p["bb_k"], p["bb_lookback"], p["adx_len"]
+    open_, high, low, close, volume = float(open_), float(high), float(low), float(close), float(volume)
+    prev = state["tail"][-1] if state["tail"] else None
+    prev_close = prev[4] if prev else None
+
+    # 원시 봉 꼬리
+    state["tail"].append([pd.Timestamp(date).strftime("%Y-%m-%d"), open_, high, low, close, volume])
+    if len(state["tail"]) > TAIL_BARS:
+        state["tail"].pop(0)
+
+    # 종가 롤링 합계 (MA20/50/200, 볼린저)
+    closes = state["closes"]
+    closes.append(close)
+    sums = state["close_sums"]
+    for w in set(MA_PERIODS) | {n}:
+        key = str(w)
+        sums[key] = sums.get(key, 0.0) + close
+        if len(closes) > w:
+            sums[key] -= closes[-w - 1]
+    if len(closes) > max(max(MA_PERIODS), n):
+        closes.pop(0)
+    cnt = len(closes)
+
+    def ma(w):
+        return sums[str(w)] / w if cnt >= w else None
+
+    ma20, ma50, ma200 = ma(20), ma(50), ma(200)
+    mid = ma(n)
+    upper = lower = None
+    if mid is not None:
+        sd = float(np.std(closes[-n:]))  # ddof=0, bollinger_bands와 같음
+        upper, lower = mid + k * sd, mid - k * sd
+
+    # 밴드폭 백분위
+    bbw = (upper - lower) / mid if mid else None
+    _push_window(state, "bbw", bbw, lookback)
+    bbw_pct = None
+    win = state["bbw"]
+    if lookback >= 2 and len(win) == lookback and all(_finite(x) for x in win):
+        bbw_pct = 100.0 * (sum(1 for x in win if x <= win[-1]) - 1) / (lookback - 1)
+
+    # ADX (Wilder 아님, calculate_signals와 같은 단순 이동평균)
+    up = high - prev[2] if prev else None
+    down = prev[3] - low if prev else None
+    plus_dm = up if (up is not None and up > down and up > 0) else 0.0
+    minus_dm = down if (down is not None and down > up and down > 0) else 0.0
+    tr = high - low
+    if prev_close is not None:
+        tr = max(tr, abs(high - prev_close), abs(low - prev_close))
+    _push_window(state, "tr", tr, adx_len, "tr_sum")
+    _push_window(state, "plus_dm", plus_dm, adx_len, "plus_dm_sum")
+    _push_window(state, "minus_dm", minus_dm, adx_len, "minus_dm_sum")
+    dx = None
+    if len(state["tr"]) == adx_len:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            atr = np.float64(state["tr_sum"]) / adx_len
+            plus_di = 100 * (np.float64(state["plus_dm_sum"]) / adx_len) / atr
+            minus_di = 100 * (np.float64(state["minus_dm_sum"]) / adx_len) / atr
+            denom = plus_di + minus_di
+            if denom != 0:
+                dx = float(100 * abs(plus_di - minus_di) / denom)
+    if dx is not None and not math.isfinite(dx):
+        dx = None
+    _push_window(state, "dx", dx, adx_len)
+    dxs = state["dx"]
+    adx_val = sum(dxs) / adx_len if len(dxs) == adx_len and all(_finite(x) for x in dxs) else None
+
+    # 거래량
+    _push_window(state, "vols", volume, 20, "vol_sum")
+    vol_ma20 = state["vol_sum"] / 20 if len(state["vols"]) == 20 else None
+    is_climax = vol_ma20 is not None and volume >= p["climax_mult"] * vol_ma20
+    if is_climax:
+        state["climax_high"], state["climax_low"] = high, low
+        state["climax_date"] = state["tail"][-1][0]
+    vol_confirm = vol_ma20 is not None and volume >= p["vol_confirm_mult"] * vol_ma20
+    vol_explosion = vol_ma20 is not None and volume >= vol_ma20 * 3
+    if vol_explosion:
+        state["bars_since_explosion"] = 0
+    elif state["bars_since_explosion"] is not None:
+        state["bars_since_explosion"] += 1
+    _push_window(state, "dryup", bool(vol_ma20 is not None and volume < vol_ma20 * 0.7), 15)
+    vol_dryup_count = float(sum(state["dryup"])) if len(state["dryup"]) == 15 else None
+
+    # 패턴/셋업
+    door_knock = upper is not None and upper * 0.95 <= close <= upper * 1.02
+    squeeze = bbw_pct is not None and bbw_pct <= 20
+    adx_ok = adx_val is not None and adx_val >= p["adx_min"]
+    breakout = upper is not None and close > upper
+    climax_high = state["climax_high"]
+    setup_a = squeeze and breakout and vol_confirm and adx_ok
+    setup_b = climax_high is not None and close > climax_high and vol_confirm
+    prev_ma20 = state["prev_ma20"]
+    crossover = (ma20 is not None and close > ma20 and prev_close is not None
+                 and prev_ma20 is not None and prev_close <= prev_ma20)
+    setup_c = crossover and vol_confirm and adx_ok
+    state["prev_ma20"] = ma20
+
+    state["n_bars"] += 1
+    state["last_date"] = state["tail"][-1][0]
+    state["last"] = {
+        "upper": upper, "lower": lower, "mid": mid,
+        "bbw_pct": bbw_pct, "adx": adx_val,
+        "ma20": ma20, "ma50": ma50, "ma200": ma200,
+        "vol_ma20": vol_ma20, "vol_confirm": vol_confirm,
+        "climax_high": climax_high, "climax_low": state["climax_low"], "is_climax": is_climax,
+        "door_knock": door_knock, "squeeze": squeeze,
+        "vol_explosion": vol_explosion, "vol_dryup_count": vol_dryup_count,
+        "setup_a": setup_a, "setup_b": setup_b, "setup_c": setup_c,
+    }
+    return state
+
+
+def push_frame(state, df):
+    """df에서 상태의 마지막 날짜 이후 봉만 push (가격 저장소 결과를 그대로 넘기면 됨)"""
+    if df is None or df.empty:
+        return state
+    if state["last_date"] is not None:
+        df = df.loc[df.index > pd.Timestamp(state["last_date"])]
+    for date, o, h, l, c, v in zip(df.index, df["Open"], df["High"], df["Low"], df["Close"], df["Volume"]):
+        push_bar(state, date, o, h, l, c, v)
+    return state
+
+
+def init_state(df, cfg):
+    """전체 이력으로 상태 초기화 (최초 1회)"""
+    return push_frame(new_state(cfg), df)
+
+
+def drop_stale_climax(state, df):
+    """
+    df(스캔 구간) 첫 19봉 안이나 그 이전의 클라이맥스를 버림
+    calculate_signals_tail은 구간 안에서 거래량 20일 평균이 있는 봉(20번째부터)에서만 클라이맥스를 찾음
+    """
+    date = state.get("climax_date")
+    if date is None:
+        return state
+    if len(df) >= 20 and pd.Timestamp(date) >= df.index[19]:
+        return state
+    state["climax_high"] = state["climax_low"] = state["climax_date"] = None
+    last = state["last"]
+    if last:
+        last["climax_high"] = last["climax_low"] = None
+        last["setup_b"] = False
+    return state
+
+
+def stream_signals(state):
+    """
+    score_stock / calculate_strategies에 넘길 (df 꼬리, sig) 생성
+    sig의 각 Series는 마지막 봉 하나만 가짐 (vol_explosion은 최근 60봉 내 발생 여부)
+    """
+    if state["n_bars"] < 60:
+        return None, None
+    bars = state["tail"]
+    index = pd.DatetimeIndex([bar[0] for bar in bars], name="Date")
+    tail = pd.DataFrame(np.array([bar[1:] for bar in bars], dtype=float), index=index, columns=OHLCV_COLS)
+    last = dict(state["last"])
+    since = state["bars_since_explosion"]
+    last["vol_explosion"] = since is not None and since < EXPLOSION_LOOKBACK
+    idx = index[-1:]
+    sig = {}
+    for key, val in last.items():
+        # numpy 배열을 복사 없이 감싸야 Series 생성이 가벼움 (종목마다 20여 개)
+        arr = np.array([val], dtype=bool) if isinstance(val, bool) else np.array([_nan(val)])
+        sig[key] = pd.Series(arr, index=idx, copy=False)
+    return tail, sig
+
+
+def score_state(state, cfg, **score_kwargs):
+    """상태에서 바로 점수/전략 계산 (update_daily STEP1과 같은 결과 dict)"""
+    df, sig = stream_signals(state)
+    if sig is None:
+        return None
+    scored = score_stock(df, sig, cfg, **score_kwargs)
+    if scored is None:
+        return None
+    strat_result = calculate_strategies(df, sig, cfg)
+    if strat_result:
+        for k, v in strat_result.items():
+            if k != "strategies":
+                scored[k] = v
+    return scored
+
+
+def state_matches_cfg(state, cfg):
+    return state is not None and state.get("params") == new_state(cfg)["params"]
+
+
+def state_matches_prices(state, df):
+    """
+    상태에 들어간 최근 봉(tail)이 가격 이력의 같은 날짜 봉과 모두 같으면 True
+    push_frame은 마지막 날짜 이후 봉만 붙이므로, 이미 반영한 봉이 바뀌었으면(수정주가/장중 스냅샷) 다시 만들어야 함
+    """
+    if df is None or df.empty or not state.get("tail") or df.attrs.get("refetched"):
+        return False
+    pos = df.index.get_indexer(pd.DatetimeIndex([bar[0] for bar in state["tail"]]))
+    if (pos < 0).any():
+        return False
+    pushed = np.array([bar[1:] for bar in state["tail"]], dtype=float)
+    current = np.column_stack([df[col].to_numpy(dtype=float)[pos] for col in OHLCV_COLS])
+    return bool(np.array_equal(pushed, current, equal_nan=True))
+
+
+def scan_state(code, df, cfg, state_dir=STATE_DIR):
+    """
+    저장된 상태에 df의 새 봉만 반영해서 저장 후 반환
+    상태를 쓸 수 없으면(없음/설정 변경/가격 이력과 불일치) df 전체로 다시 만들어 저장하고 None 반환
+    """
+    state = load_state(code, state_dir)
+    usable = state_matches_cfg(state, cfg) and state_matches_prices(state, df)
+    state = drop_stale_climax(push_frame(state, df), df) if usable else init_state(df, cfg)
+    try:
+        save_state(code, state, state_dir)
+    except Exception as e:
+        print(f"[WARN] {code} 지표 상태 저장 실패: {e}")
+    return state if usable else None
+
+
+def load_state(code, state_dir=STATE_DIR):
+    path = os.path.join(state_dir, f"{code}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN] {code} 지표 상태 읽기 실패: {e}")
+        return None
+
+
+def save_state(code, state, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    path = os.path.join(state_dir, f"{code}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(json.dumps(state))  # json.dump(파일)은 C 인코더를 쓰지 않아 몇 배 느림
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+sharding.py - 청크(샤드) 분배 계획
+이전 실행에서 잰 종목별 스캔 시간(data/scan_costs.csv)으로 종목을 N개 샤드에 고르게 나눈
+매니페스트(data/shards/manifest_{날짜}.json)를 만듭니다.
+- 비용이 큰 종목부터 현재 합계가 가장 작은 샤드에 배정 (LPT 그리디)
+- 비용 기록이 없는 종목은 기록된 종목들의 중앙값으로 가정
+- merge_chunks는 매니페스트와 각 샤드의 스캔 기록을 비교해 빠진/중복 종목을 보고
+"""
+import os
+import json
+import glob
+import heapq
+
+import pandas as pd
+
+SHARD_DIR = os.path.join("data", "shards")
+COST_FILE = os.path.join("data", "scan_costs.csv")
+DEFAULT_COST = 1.0   # 비용 기록이 전혀 없을 때 종목당 가정 시간(초)
+COST_ALPHA = 0.5     # 비용 갱신 시 새 측정값 가중치 (지수이동평균)
+
+
+def load_costs(path=COST_FILE):
+    """{code: 초}. 파일이 없으면 빈 dict"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        df = pd.read_csv(path, dtype={"code": str})
+        return dict(zip(df["code"].str.zfill(6), df["seconds"].astype(float)))
+    except Exception as e:
+        print(f"[WARN] 스캔 비용 기록 읽기 실패: {e}")
+        return {}
+
+
+def update_costs(measured, path=COST_FILE, alpha=COST_ALPHA):
+    """이번 실행 측정값 {code: 초}를 기존 기록과 지수이동평균으로 합쳐 저장"""
+    costs = load_costs(path)
+    for code, sec in measured.items():
+        old = costs.get(code)
+        costs[code] = float(sec) if old is None else alpha * float(sec) + (1 - alpha) * old
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    pd.DataFrame({"code": list(costs), "seconds": [round(v, 4) for v in costs.values()]}) \
+        .sort_values("code").to_csv(path, index=False)
+    return costs
+
+
+def plan_shards(codes, n_shards, costs=None):
+    """
+    codes를 n_shards개로 나눔 → [[code, ...], ...] (각 샤드 안은 원래 순서 유지)
+    같은 입력이면 항상 같은 결과 (청크 작업마다 따로 계산해도 일치)
+    """
+    n_shards = max(1, int(n_shards))
+    costs = costs or {}
+    known = sorted(v for c, v in costs.items() if v > 0)
+    default = known[len(known) // 2] if known else DEFAULT_COST
+    order = {code: i for i, code in enumerate(codes)}
+    weighted = sorted(codes, key=lambda c: (-costs.get(c, default), order[c]))
+    heap = [(0.0, k) for k in range(n_shards)]
+    shards = [[] for _ in range(n_shards)]
+    for code in weighted:
+        load, k = heapq.heappop(heap)
+        shards[k].append(code)
+        heapq.heappush(heap, (load + costs.get(code, default), k))
+    return [sorted(s, key=order.get) for s in shards], default
+
+
+def build_manifest(codes, n_shards, scan_day, costs=None):
+    codes = [str(c).zfill(6) for c in codes]
+    costs = load_costs() if costs is None else costs
+    shards, default = plan_shards(codes, n_shards, costs)
+    return {
+        "scan_day": scan_day,
+        "n_shards": len(shards),
+        "shards": {str(k + 1): s for k, s in enumerate(shards)},
+        "expected_seconds": {str(k + 1): round(sum(costs.get(c, default) for c in s), 1) for k, s in enumerate(shards)},
+    }
+
+
+def _manifest_path(scan_day, shard_dir=SHARD_DIR):
+    return os.path.join(shard_dir, f"manifest_{scan_day}.json")
+
+
+def save_manifest(manifest, shard_dir=SHARD_DIR):
+    os.makedirs(shard_dir, exist_ok=True)
+    with open(_manifest_path(manifest["scan_day"], shard_dir), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+
+def load_manifest(scan_day, shard_dir=SHARD_DIR):
+    path = _manifest_path(scan_day, shard_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN] 샤드 매니페스트 읽기 실패: {e}")
+        return None
+
+
+def get_manifest(codes, n_shards, scan_day):
+    """공유 매니페스트가 있으면 사용, 없으면 만들어 저장 (단일 작업 실행 시)"""
+    manifest = load_manifest(scan_day)
+    if manifest is not None:
+        return manifest
+    manifest = build_manifest(codes, n_shards, scan_day)
+    save_manifest(manifest)
+    return manifest
+
+
+def scanned_path(scan_day, shard, partial_dir=os.path.join("data", "partial")):
+    """샤드별 스캔 기록 (종목, 소요 시간, STEP1 통과 여부)"""
+    return os.path.join(partial_dir, f"scanned_{scan_day}_chunk{shard}.csv")
+
+
+def save_scanned(records, scan_day, shard, partial_dir=os.path.join("data", "partial")):
+    os.makedirs(partial_dir, exist_ok=True)
+    pd.DataFrame(records, columns=["code", "seconds", "passed"]).to_csv(
+        scanned_path(scan_day, shard, partial_dir), index=False)
+
+
+def check_coverage(manifest, partial_dir=os.path.join("data", "partial")):
+    """
+    매니페스트 대비 샤드별 스캔 기록 검사
+    반환: {"missing_shards", "missing", "duplicates", "unexpected", "measured"}
+    """
+    scan_day = manifest["scan_day"]
+    expected = {code: shard for shard, codes in manifest["shards"].items() for code in codes}
+    seen, dup, measured, missing_shards = {}, set(), {}, []
+    for shard in manifest["shards"]:
+        path = scanned_path(scan_day, shard, partial_dir)
+        if not os.path.exists(path):
+            missing_shards.append(shard)
+            continue
+        df = pd.read_csv(path, dtype={"code": str})
+        for code, sec in zip(df["code"].str.zfill(6), df["seconds"]):
+            if code in seen:
+                dup.add(code)
+            seen[code] = shard
+            measured[code] = float(sec)
+    # 매니페스트에 없는 샤드 번호로 만들어진 기록
+    extra = [p for p in glob.glob(scanned_path(scan_day, "*", partial_dir))
+             if os.path.basename(p).rsplit("chunk", 1)[-1][:-4] not in manifest["shards"]]
+    return {
+        "missing_shards": missing_shards,
+        "missing": sorted(set(expected) - set(seen)),
+        "duplicates": sorted(dup),
+        "unexpected": sorted(set(seen) - set(expected)) + sorted(extra),
+        "measured": measured,
+    }
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+sweep.py - config.yaml 임계값 파라미터 스윕
+볼린저 길이/표준편차/밴드폭 기간, ADX 기준, 클라이맥스/거래량 배수, 매수 점수 기준 조합마다
+유니버스 전 구간의 시그널(셋업 + 총점 기준)을 만들고 이후 N일 수익률로 평가합니다.
+- 가격 패널은 한 번만 읽고, 프로세스마다 calculate_signals_panel의 cache로 중간 결과 공유
+  (예: 볼린저 길이만 바뀌면 이동평균/ADX/거래량 평균은 다시 계산하지 않음)
+- 조합은 공유 가능한 것끼리 붙도록 정렬해서 프로세스 풀에 나눠 줌
+- 결과: 조합별 시그널 수, 기간별 평균 수익률/승률/시장 대비 초과수익 → 초과수익 순으로 정렬한 표
+실행: python sweep.py  (설정은 config.yaml의 sweep)
+"""
+import os
+import copy
+import time
+import itertools
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from backtest import setup_labels
+import http_client
+from price_store import get_prices
+from scanner_panel import build_panel, calculate_signals_panel, score_panel
+
+SWEEP_DIR = os.path.join("data", "sweep")
+WARMUP_DAYS = 400
+MIN_TOTAL = 65   # 앱의 매수대상 기준 (조합에 min_total이 없을 때)
+CACHE_MAX = 32  # 프로세스별 중간 결과 보관 개수 (날짜 × 종목 배열 하나가 한 항목)
+DEFAULT_GRID = {
+    "bollinger.length": [40, 60, 80],
+    "bollinger.stdev": [1.5, 2.0, 2.5],
+    "bollinger.bandwidth_lookback": [60, 120],
+    "trend.adx_min": [15, 20, 25],
+    "volume.climax_mult": [3.0, 5.0],
+    "volume.vol_confirm_mult": [1.2, 1.5, 2.0],
+    "min_total": [50, 60, 65, 70],
+}
+DEFAULT_PARAMS = {
+    "mode": "grid",        # grid | random
+    "n_random": 500,
+    "seed": 0,
+    "years": 5,
+    "horizons": [5, 10, 20],
+    "rank_horizon": 10,
+    "min_signals": 200,
+    "workers": 4,
+}
+
+# 프로세스별 상태 (_init_worker에서 설정)
+_PANEL = None
+_FWD = None
+_CFG = None
+_EVAL_MASK = None
+_MARKET = None
+_CACHE = None
+
+
+class _LRUCache(OrderedDict):
+    """최근에 쓴 항목부터 남기는 dict (MA20/ADX처럼 매번 쓰는 중간 결과는 밀려나지 않음)"""
+
+    def __init__(self, maxsize=CACHE_MAX):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+def grid_combos(grid):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_combos(grid, n, seed=0):
+    """격자에서 중복 없이 n개 무작위 추출 (격자가 n보다 작으면 전체)"""
+    combos = grid_combos(grid)
+    if n >= len(combos):
+        return combos
+    rng = np.random.default_rng(seed)
+    return [combos[i] for i in sorted(rng.choice(len(combos), size=n, replace=False))]
+
+
+def apply_params(cfg, combo):
+    """"섹션.키" 형식의 파라미터를 cfg 사본에 반영 (min_total처럼 점이 없는 키는 스윕 전용)"""
+    cfg = copy.deepcopy(cfg)
+    for key, value in combo.items():
+        if "." in key:
+            section, name = key.split(".", 1)
+            cfg.setdefault(section, {})[name] = value
+    return cfg
+
+
+def forward_returns(close, horizons):
+    """{h: h봉 뒤 종가 / 오늘 종가 - 1 (%)} 날짜 × 종목 배열"""
+    out = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for h in horizons:
+            fwd = np.full_like(close, np.nan)
+            fwd[:-h] = close[h:] / close[:-h] * 100 - 100
+            out[h] = fwd
+    return out
+
+
+def _init_worker(panel, cfg, horizons, eval_start):
+    global _PANEL, _FWD, _CFG, _EVAL_MASK, _MARKET, _CACHE
+    _PANEL, _CFG, _CACHE = panel, cfg, _LRUCache()
+    _FWD = forward_returns(panel["Close"].to_numpy(dtype=float), horizons)
+    _EVAL_MASK = (panel["Close"].index >= pd.Timestamp(eval_start))[:, None]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # 종목이 모두 결측인 날
+        _MARKET = {h: np.nanmean(fwd, axis=1, keepdims=True) for h, fwd in _FWD.items()}  # 같은 날 유니버스 평균
+
+
+def evaluate(combo):
+    """조합 하나 평가 → 결과 dict (파라미터 + 지표)"""
+    started = time.perf_counter()
+    cfg = apply_params(_CFG, combo)
+    sig = calculate_signals_panel(_PANEL, cfg, cache=_CACHE)
+    setup = setup_labels(sig) != "-"
+    score = score_panel(_PANEL, sig, cfg).to_numpy()
+    with np.errstate(invalid="ignore"):
+        mask = setup & (score >= combo.get("min_total", MIN_TOTAL)) & _EVAL_MASK
+    row = dict(combo)
+    row["signals"] = int(mask.sum())
+    row["signal_days"] = int(mask.any(axis=1).sum())
+    for h, fwd in _FWD.items():
+        m = mask & ~np.isnan(fwd)
+        ret = fwd[m]
+        excess = fwd[m] - np.broadcast_to(_MARKET[h], fwd.shape)[m]
+        row[f"ret_{h}d"] = round(float(ret.mean()), 3) if len(ret) else np.nan
+        row[f"hit_{h}d"] = round(float((ret > 0).mean() * 100), 1) if len(ret) else np.nan
+        row[f"excess_{h}d"] = round(float(excess.mean()), 3) if len(excess) else np.nan
+    row["seconds"] = round(time.perf_counter() - started, 2)
+    return row
+
+
+def _share_key(combo):
+    """캐시를 공유하는 조합끼리 이웃하도록 정렬하는 키 (볼린저 → ADX → 클라이맥스 순으로 비싼 중간 결과)"""
+    return tuple(str(combo.get(k, "")) for k in (
+        "bollinger.length", "bollinger.stdev", "bollinger.bandwidth_lookback", "trend.adx_len", "volume.climax_mult"))
+
+
+def run_sweep(panel, cfg, combos, params=None, end=None):
+    """파라미터 조합들 평가 → 순위 표 DataFrame"""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    end = pd.Timestamp(end or panel["Close"].index.max())
+    eval_start = end - timedelta(days=int(365 * float(params["years"])))
+    horizons = [int(h) for h in params["horizons"]]
+    combos = sorted(combos, key=_share_key)
+    workers = int(params["workers"] or 1)
+    init_args = (panel, cfg, horizons, eval_start)
+    if workers > 1 and len(combos) > 1:
+        # 연속된 조합 묶음을 한 프로세스가 처리해야 캐시가 재사용됨
+        chunksize = max(1, len(combos) // (workers * 2))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            rows = list(pool.map(evaluate, combos, chunksize=chunksize))
+    else:
+        _init_worker(*init_args)
+        rows = [evaluate(c) for c in combos]
+    return rank_results(pd.DataFrame(rows), params)
+
+
+def rank_results(results, params):
+    """rank_horizon 초과수익 순 (시그널이 min_signals 미만인 조합은 뒤로)"""
+    key = f"excess_{int(params['rank_horizon'])}d"
+    enough = results["signals"] >= int(params["min_signals"])
+    results = results.assign(_enough=enough).sort_values(["_enough", key], ascending=[False, False])
+    results = results.drop(columns="_enough").reset_index(drop=True)
+    results.insert(0, "rank", range(1, len(results) + 1))
+    return results
+
+
+def _load(code, start, end):
+    try:
+        return code, get_prices(code, start, end)
+    except Exception:
+        return code, None
+
+
+def load_universe_panel(codes, years, end=None, workers=1):
+    end = pd.Timestamp(end or datetime.now()).normalize()
+    start = end - timedelta(days=int(365 * float(years)) + WARMUP_DAYS)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=http_client.init_worker, initargs=(workers,)) as pool:
+            frames = dict(pool.map(_load, codes, [start] * len(codes), [end] * len(codes), chunksize=16))
+    else:
+        frames = dict(_load(code, start, end) for code in codes)
+    return build_panel(frames)
+
+
+def load_config():
+    with open("config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def main():
+    from update_daily import get_stock_list
+
+    cfg = load_config()
+    sweep_cfg = cfg.get("sweep") or {}
+    params = {**DEFAULT_PARAMS, **{k: v for k, v in sweep_cfg.items() if k != "grid"}}
+    grid = sweep_cfg.get("grid") or DEFAULT_GRID
+    combos = grid_combos(grid) if params["mode"] == "grid" else random_combos(grid, int(params["n_random"]), int(params["seed"]))
+
+    stocks = get_stock_list(cfg)
+    codes = stocks["Code"].astype(str).str.zfill(6).head(int(cfg["universe"]["top_n_stocks"])).tolist()
+    print(f"[SWEEP] {len(codes)}개 종목 가격 로드 ({params['years']}년)...")
+    panel = load_universe_panel(codes, params["years"], workers=int(params["workers"] or 1))
+    print(f"[SWEEP] {len(combos)}개 조합 평가, workers={params['workers']}")
+    started = time.perf_counter()
+    results = run_sweep(panel, cfg, combos, params)
+    print(f"[SWEEP] 완료: {time.perf_counter() - started:.1f}초 (조합당 평균 {results['seconds'].mean():.2f}초)")
+    print(results.head(20).to_string(index=False))
+
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    path = os.path.join(SWEEP_DIR, f"sweep_{datetime.now().strftime('%Y-%m-%d_%H%M')}.csv")
+    results.to_csv(path, index=False, encoding="utf-8-sig")
+    print(f"[SWEEP] 저장: {path}")
+
+
+if __name__ == "__main__":
+    main()
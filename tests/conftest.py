@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""tests/ - 저장소 루트의 모듈을 바로 import 할 수 있게 경로 추가 (python -m pytest tests)"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""backtest - 행렬 전략 레벨이 calculate_strategies와 같은지, 체결/청산 규칙, 성과 집계"""
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from backtest import (DEFAULT_PARAMS, STRATEGIES, backtest_panel, max_drawdown_r, simulate_trades, strategy_levels,
+                      summarize_trades)
+from benchmarks.scanner import synthetic_ohlcv
+from conftest import ROOT
+from scanner_core import calculate_signals, calculate_strategies
+from scanner_panel import build_panel, calculate_signals_panel
+
+
+@pytest.fixture(scope="module")
+def cfg():
+    with open(f"{ROOT}/config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(scope="module")
+def frames():
+    late = synthetic_ohlcv(180, seed=23)
+    late.iloc[60, late.columns.get_loc("Volume")] *= 10  # 클라이맥스 → 눌림목 적합 판정이 나오도록
+    return {"900001": synthetic_ohlcv(300, seed=21), "900002": synthetic_ohlcv(300, seed=22), "900003": late}
+
+
+def scanner_view(df, full_sig, i, cfg):
+    """i번째 봉을 마지막 봉으로 본 calculate_strategies 결과 {전략: dict}"""
+    sig = {k: s.iloc[:i + 1] for k, s in full_sig.items()}
+    return {s["type"]: s for s in calculate_strategies(df.iloc[:i + 1], sig, cfg)["strategies"]}
+
+
+def test_strategy_levels_match_calculate_strategies(frames, cfg):
+    panel = build_panel(frames)
+    levels = strategy_levels(panel, calculate_signals_panel(panel, cfg))
+    dates = panel["Close"].index
+    checked = {s: 0 for s in STRATEGIES}
+    for col, (code, df) in enumerate(frames.items()):
+        full = calculate_signals(df, cfg)
+        for i in range(60, len(df), 3):
+            row = dates.get_loc(df.index[i])
+            for name, s in scanner_view(df, full, i, cfg).items():
+                entry, stop, risk, ok = (a[row, col] for a in levels[name])
+                assert (entry, stop) == pytest.approx((s["entry"], s["stop"]), rel=1e-12), (code, i, name)
+                assert risk == pytest.approx(s["risk"], rel=1e-9, abs=1e-9), (code, i, name)
+                assert bool(ok) == bool(s["candidate"]), (code, i, name)
+                checked[name] += bool(ok)
+    assert all(n > 0 for n in checked.values()), checked  # 전략마다 적합 판정이 실제로 나온 날이 있음
+
+
+def test_backtest_rank_matches_scanner_priority(frames, cfg):
+    trades = backtest_panel(build_panel(frames), cfg, dict(DEFAULT_PARAMS))
+    assert not trades.empty and set(trades["strategy"]) == set(STRATEGIES)
+    signals = {code: calculate_signals(df, cfg) for code, df in frames.items()}
+    for (date, code), g in list(trades.groupby(["date", "code"]))[::5]:
+        df = frames[code]
+        view = scanner_view(df, signals[code], df.index.get_loc(date), cfg)
+        assert {r.strategy: r.rank for r in g.itertuples()} == {k: s["rank"] for k, s in view.items()}, (date, code)
+
+
+# 체결/청산 규칙: 종목 하나, 봉 10개
+BARS = np.array([
+    # Open, High, Low, Close
+    [100, 101, 99, 100],
+    [99, 100, 94, 96],
+    [97, 106, 96, 104],
+    [104, 105, 92, 100],
+    [104, 105, 103, 104],
+    [104, 105, 103, 104],
+    [104, 105, 103, 104],
+    [104, 105, 103, 104],
+    [104, 105, 103, 104],
+    [104, 105, 103, 104],
+], dtype=float)
+RULES = {"entry_window": 3, "max_hold": 3, "target_r": 2.0, "cost_pct": 0}
+
+
+def test_simulate_trades_fill_and_exit_rules():
+    ohlc = tuple(BARS[:, [k]] for k in range(4))
+    cases = {
+        # 이름: (시그널 봉, 진입가, 손절가) → (사유, 진입 봉, 체결가, 청산가, R)
+        "limit_target": (0, 95.0, 90.0),     # 지정가: 1봉 저가 94 ≤ 95 → 95, 2봉 고가 106 ≥ 목표 105
+        "stop_order_stop": (0, 101.0, 98.0),  # 역지정가: 2봉 고가 ≥ 101 → 101, 3봉 저가 92 → 손절 98
+        "unfilled": (0, 80.0, 75.0),          # 3봉 안에 80까지 내려오지 않음
+        "close_time": (4, 104.0, 100.0),      # 종가 진입, 3봉 보유 후 종가 청산
+        "close_open": (8, 104.0, 100.0),      # 보유 기간이 데이터 끝을 넘음 → 미청산
+    }
+    t = np.array([c[0] for c in cases.values()])
+    entry = np.array([c[1] for c in cases.values()])
+    stop = np.array([c[2] for c in cases.values()])
+    res = simulate_trades(ohlc, t, np.zeros(len(t), dtype=int), entry, stop, RULES)
+    got = {name: (res["reason"][i], res["entry_bar"][i], res["entry_px"][i], res["exit_px"][i], res["r"][i])
+           for i, name in enumerate(cases)}
+    assert got["limit_target"] == ("target", 1, 95.0, 105.0, pytest.approx(2.0))
+    assert got["stop_order_stop"] == ("stop", 2, 101.0, 98.0, pytest.approx(-1.0))
+    assert got["unfilled"][0] == "unfilled" and np.isnan(got["unfilled"][2])
+    assert got["close_time"] == ("time", 4, 104.0, 104.0, 0.0)
+    assert res["exit_bar"][3] == 7
+    assert got["close_open"][0] == "open"
+
+
+def test_gap_below_stop_is_not_filled_and_stop_wins_same_bar():
+    bars = BARS.copy()
+    bars[1] = [89, 92, 88, 90]    # 손절가(90) 아래로 갭 → 이 봉의 지정가 체결은 무효
+    bars[2] = [96, 112, 85, 100]  # 저가/고가가 손절가와 목표가에 모두 닿음
+    ohlc = tuple(bars[:, [k]] for k in range(4))
+    t, entry, stop = np.array([0, 1]), np.array([95.0, 90.0]), np.array([90.0, 88.0])
+    res = simulate_trades(ohlc, t, np.zeros(2, dtype=int), entry, stop, RULES)
+    assert (res["entry_bar"][0], res["entry_px"][0]) == (2, 95.0)
+    # 1봉 종가 90 진입, 2봉에서 손절 88과 목표 94가 모두 닿음 → 손절 우선
+    assert (res["reason"][1], res["exit_px"][1], res["r"][1]) == ("stop", 88.0, -1.0)
+
+
+def test_summary_and_drawdown():
+    trades = pd.DataFrame({
+        "setup": ["B", "B", "B", "B", "A"], "r": [1.0, -1.0, -1.0, 2.0, 0.5], "ret_pct": [5.0, -4.0, -4.0, 9.0, 2.0],
+        "reason": ["target", "stop", "stop", "target", "open"], "hold": [3, 2, 1, 5, np.nan],
+        "exit_date": pd.to_datetime(["2026-01-05", "2026-01-06", "2026-01-07", "2026-01-08", None]),
+    })
+    assert max_drawdown_r(trades.iloc[:4]) == 2.0  # 누적 0 → 1 → 0 → -1 → 1
+    out = summarize_trades(trades, "setup")
+    assert out["setup"].tolist() == ["B"]  # 미청산 거래는 집계 제외
+    row = out.iloc[0]
+    assert (row["trades"], row["hit_rate"], row["expectancy_r"], row["profit_factor"], row["max_dd_r"]) == (4, 50.0, 0.25, 1.5, 2.0)
+    assert row["stop_pct"] == 50.0 and row["avg_hold"] == 2.8
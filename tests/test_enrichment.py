@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+update_daily.fetch_enrichment - 로컬 HTTP 서버로 수급/뉴스 동시 조회 검증
+- 결과(수급 dict, 뉴스 분석, supply_score/total_score)가 종목별 순차 조회와 같은지
+- 호스트별 동시 요청 수가 http.hosts 한도를 넘지 않는지
+네이버 금융은 127.0.0.1, 뉴스 API는 localhost로 띄워 서로 다른 호스트 한도를 받게 함
+"""
+import os
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pytest
+
+import http_client
+import investor_store
+import news_analyzer
+import update_daily
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+FIXTURE_CODES = ("005930", "000660", "035720")
+LATENCY = 0.05
+LIMITS = {"127.0.0.1": {"concurrency": 3, "rate": 200.0}, "localhost": {"concurrency": 2, "rate": 200.0}}
+N_CANDIDATES = 12
+
+
+class _Server:
+    """frgn.naver(픽스처 HTML) + 뉴스 검색 API(JSON) 흉내. Host 헤더별 동시 처리 수를 기록"""
+
+    def __init__(self):
+        self.frgn = {}
+        for code in FIXTURE_CODES:
+            with open(os.path.join(FIXTURE_DIR, f"frgn_{code}.html"), "rb") as f:
+                self.frgn[code] = f.read()
+        self.lock = threading.Lock()
+        self.inflight, self.max_inflight, self.requests = {}, {}, {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                host = self.headers.get("Host", "").rsplit(":", 1)[0]
+                with server.lock:
+                    server.inflight[host] = server.inflight.get(host, 0) + 1
+                    server.max_inflight[host] = max(server.max_inflight.get(host, 0), server.inflight[host])
+                    server.requests[host] = server.requests.get(host, 0) + 1
+                try:
+                    time.sleep(LATENCY)
+                    status, ctype, body = server.respond(self.path)
+                finally:
+                    # 응답을 보내기 전에 줄여야 클라이언트가 받은 직후 보낸 다음 요청과 겹쳐 세지지 않음
+                    with server.lock:
+                        server.inflight[host] -= 1
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def respond(self, path):
+        url = urlparse(path)
+        query = parse_qs(url.query)
+        if url.path == "/item/frgn.naver":
+            code = query["code"][0]
+            # 종목마다 다른 픽스처가 나오도록 코드 끝자리로 선택 (이웃 종목끼리 결과가 섞이면 드러남)
+            return 200, "text/html; charset=euc-kr", self.frgn[FIXTURE_CODES[int(code) % len(FIXTURE_CODES)]]
+        if url.path == "/v1/search/news.json":
+            name = query["query"][0]
+            items = [{"title": f"<b>{name}</b> 기사 {i}", "description": f"{name} 실적 전망 수주 {i % 3}",
+                      "link": f"http://news.example/{name}/{i}", "pubDate": "Mon, 02 Mar 2026 09:00:00 +0900"}
+                     for i in range(5)]
+            return 200, "application/json", json.dumps({"items": items}, ensure_ascii=False).encode("utf-8")
+        return 404, "text/plain", b"not found"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    with _Server() as srv:
+        monkeypatch.setattr(investor_store, "NAVER_FINANCE_URL", f"http://127.0.0.1:{srv.port}")
+        monkeypatch.setattr(investor_store, "DAUM_FINANCE_URL", f"http://127.0.0.1:{srv.port}")
+        monkeypatch.setattr(news_analyzer, "NAVER_NEWS_URL", f"http://localhost:{srv.port}/v1/search/news.json")
+        monkeypatch.setattr(http_client, "_limits", {**http_client.DEFAULT_HOST_LIMITS})
+        monkeypatch.setattr(http_client, "_limiters", {})
+        monkeypatch.delenv("NAVER_CLIENT_ID", raising=False)
+        monkeypatch.delenv("NAVER_CLIENT_SECRET", raising=False)
+        # 수급/뉴스 저장소(data/investor, data/news)는 상대 경로 → 임시 디렉터리에서 실행
+        monkeypatch.chdir(tmp_path)
+        yield srv
+
+
+def make_cfg():
+    return {
+        "news": {"max_keywords": 8, "cache_ttl_minutes": 180, "naver_client_id": "id", "naver_client_secret": "secret"},
+        "scoring": {"supply_weight": 15},
+        "http": {"enrich_workers": 8, "hosts": LIMITS},
+    }
+
+
+def make_candidates(n=N_CANDIDATES):
+    return pd.DataFrame({
+        "code": [f"{100000 + i:06d}" for i in range(n)],
+        "name": [f"종목{i}" for i in range(n)],
+        "trend_score": [20 + i % 5 for i in range(n)], "pattern_score": [10] * n,
+        "volume_score": [5 + i % 3 for i in range(n)], "risk_score": [8] * n,
+    })
+
+
+def fresh_stores(monkeypatch, name):
+    """두 경로가 서로의 캐시를 쓰지 않도록 저장소 위치와 뉴스 메모리 캐시를 분리"""
+    os.makedirs(name)
+    monkeypatch.chdir(name)
+    monkeypatch.setattr(news_analyzer, "_cache", {})
+
+
+def totals(candidates, inv_list, cfg):
+    supply = [update_daily.calc_supply_score(inv, cfg) for inv in inv_list]
+    base = candidates[["trend_score", "pattern_score", "volume_score", "risk_score"]].sum(axis=1).tolist()
+    return supply, [b + s for b, s in zip(base, supply)]
+
+
+def test_matches_sequential_and_respects_host_limits(server, monkeypatch):
+    cfg = make_cfg()
+    candidates = make_candidates()
+
+    fresh_stores(monkeypatch, "sequential")
+    seq_inv = [update_daily.get_investor_data(code) for code in candidates["code"]]
+    seq_news = news_analyzer.analyze_news_batch(
+        [news_analyzer.fetch_stock_news(name, cfg) for name in candidates["name"]], cfg)
+
+    monkeypatch.chdir("..")
+    fresh_stores(monkeypatch, "concurrent")
+    server.max_inflight.clear()
+    server.requests.clear()
+    timings = {}
+    inv_list, news_list = update_daily.fetch_enrichment(candidates, cfg, timings=timings)
+
+    assert inv_list == seq_inv
+    assert news_list == seq_news
+    assert totals(candidates, inv_list, cfg) == totals(candidates, seq_inv, cfg)
+    assert len({json.dumps(inv, sort_keys=True) for inv in inv_list}) == len(FIXTURE_CODES)
+    assert all(n["news_count"] == 5 for n in news_list)
+    assert not any(k.endswith("_error") for t in timings.values() for k in t)
+
+    assert server.requests == {"127.0.0.1": N_CANDIDATES, "localhost": N_CANDIDATES}
+    for host, lim in LIMITS.items():
+        assert 1 < server.max_inflight[host] <= lim["concurrency"], (host, server.max_inflight)
+
+
+def test_on_result_called_once_per_candidate(server, monkeypatch):
+    cfg = make_cfg()
+    candidates = make_candidates(6)
+    fresh_stores(monkeypatch, "run")
+    seen = []
+    update_daily.fetch_enrichment(candidates, cfg, on_result=lambda code, inv, news: seen.append(code))
+    assert sorted(seen) == sorted(candidates["code"])
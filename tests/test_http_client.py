@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""http_client - fork된 프로세스 풀 워커의 세션/호스트 한도"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import http_client
+
+URL = "https://finance.naver.com/item/frgn.naver"
+
+
+def _child_view(_=None):
+    """워커 안에서: 부모 세션(표시를 붙여 둔 것)이 남아 있는지, 새로 만든 limiter의 한도"""
+    inherited = getattr(http_client._session, "from_parent", False)
+    limiter = http_client.host_limit(URL)
+    return inherited, limiter.rate, limiter.slots._initial_value
+
+
+@pytest.fixture
+def fork_ctx():
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork 시작 방식 없음")
+    return multiprocessing.get_context("fork")
+
+
+def test_forked_worker_drops_parent_session(fork_ctx):
+    http_client.get_session().from_parent = True  # 부모에서 세션 생성 (confirm_adv20/get_prices 호출과 같은 상황)
+    http_client.host_limit(URL)
+    with ProcessPoolExecutor(max_workers=1, mp_context=fork_ctx) as pool:
+        inherited, rate, slots = pool.submit(_child_view).result()
+    assert inherited is False
+    lim = http_client._limits["finance.naver.com"]
+    assert (rate, slots) == (float(lim["rate"]), int(lim["concurrency"]))  # initializer 없으면 프로세스별 전체 한도
+
+
+def test_init_worker_splits_host_limits(fork_ctx):
+    http_client.get_session().from_parent = True
+    limits = {"finance.naver.com": {"concurrency": 4, "rate": 8.0}}
+    with ProcessPoolExecutor(max_workers=4, mp_context=fork_ctx, initializer=http_client.init_worker,
+                             initargs=(4, limits)) as pool:
+        views = list(pool.map(_child_view, range(8)))
+    assert all(not inherited for inherited, _, _ in views)
+    assert {(rate, slots) for _, rate, slots in views} == {(2.0, 1)}
+    # 부모의 한도는 그대로
+    assert http_client._process_share == 1
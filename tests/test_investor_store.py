@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""investor_store.get_flows - 장 마감 직후(수급 확정 전) 실행이 받은 잠정치 행 처리"""
+import pandas as pd
+
+from investor_store import FLOW_COLS, get_flows, load_flows
+
+DAY1 = pd.Timestamp("2026-03-04 16:30")  # 수요일, FLOW_FINAL_HOUR(18시) 이전
+DAY2 = pd.Timestamp("2026-03-05 16:30")
+
+
+class FakeSite:
+    """frgn.naver 흉내: 조회 시각(now)까지의 거래일 행, 18시 이전 당일 행은 잠정치(외국인 1), 확정치는 100"""
+
+    def __init__(self):
+        self.now = None
+        self.calls = []
+
+    def __call__(self, code, days):
+        self.calls.append((self.now, days))
+        dates = pd.bdate_range(end=self.now.normalize(), periods=20)[::-1]
+        final = [self.now.hour >= 18 or d < self.now.normalize() for d in dates]
+        return pd.DataFrame({"Close": 10000.0, "Foreign": [100.0 if f else 1.0 for f in final], "Institution": 50.0},
+                            index=pd.DatetimeIndex(dates, name="Date"))[FLOW_COLS]
+
+
+def run(site, now, tmp_path):
+    site.now = now
+    return get_flows("005930", days=10, fetch=site, investor_dir=tmp_path, now=now)
+
+
+def test_back_to_back_pre_close_runs_replace_provisional_row(tmp_path):
+    site = FakeSite()
+    first = run(site, DAY1, tmp_path)
+    assert first.index[0] == DAY1.normalize() and first.iloc[0]["Foreign"] == 1.0  # 당일 잠정치
+    second = run(site, DAY2, tmp_path)
+    assert len(site.calls) == 2  # 저장된 잠정치 때문에 최신으로 보지 않고 다시 조회
+    assert second.index[0] == DAY2.normalize()
+    assert second.loc[DAY1.normalize(), "Foreign"] == 100.0  # 어제 잠정치가 확정치로 교체됨
+    stored = load_flows("005930", tmp_path)
+    assert stored.loc[DAY1.normalize(), "Foreign"] == 100.0
+
+
+def test_rerun_after_final_hour_fetches_once(tmp_path):
+    site = FakeSite()
+    run(site, DAY1, tmp_path)
+    evening = run(site, DAY1.replace(hour=19), tmp_path)
+    assert len(site.calls) == 2
+    assert evening.iloc[0]["Foreign"] == 100.0
+    run(site, DAY1.replace(hour=20), tmp_path)
+    assert len(site.calls) == 2  # 확정치가 저장된 뒤에는 조회 없음
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""price_ingest.ingest_days - 빈 응답(휴장/일시 오류) 처리"""
+import numpy as np
+import pandas as pd
+
+from price_ingest import ingest_days, frame_source
+from price_store import OHLCV_COLS, load_prices, save_prices, get_prices
+
+NOW = pd.Timestamp("2026-03-10 18:00")  # 화요일 장 마감 후 (KST)
+STORED_THROUGH = pd.Timestamp("2026-03-02")
+GAP_DAY = pd.Timestamp("2026-03-04")
+
+
+def make_frames(codes=("005930", "000660"), days=None):
+    days = days if days is not None else pd.bdate_range("2025-12-01", "2026-03-10", name="Date")
+    rng = np.random.default_rng(0)
+    frames = {}
+    for code in codes:
+        close = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days))))
+        frames[code] = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                                     "Volume": rng.integers(1e5, 1e6, len(days)).astype(float)}, index=days)
+    return frames
+
+
+def seed_store(frames, price_dir):
+    for code, df in frames.items():
+        save_prices(code, df.loc[:STORED_THROUGH], df.index[0], price_dir, final_through=STORED_THROUGH)
+
+
+def blank_on(source, day):
+    """지정한 날짜만 빈 DataFrame을 돌려주는 소스 (KRX 일시 오류 재현)"""
+    def wrapped(d):
+        out = source(d)
+        return out.iloc[0:0] if pd.Timestamp(d) == day else out
+    return wrapped
+
+
+def all_weekdays(start, end):
+    return pd.bdate_range(start, pd.Timestamp(end) + pd.Timedelta(days=10))
+
+
+def test_unconfirmed_empty_day_stops_before_gap(tmp_path):
+    frames = make_frames()
+    seed_store(frames, tmp_path)
+    stats = ingest_days(list(frames), source=blank_on(frame_source(frames), GAP_DAY), now=NOW,
+                        price_dir=tmp_path, calendar=all_weekdays)
+    assert stats["failed"] == "2026-03-04"
+    assert stats["through"] == "2026-03-03"
+    assert stats["holidays"] == []
+    for code in frames:
+        df = load_prices(code, price_dir=tmp_path)
+        assert df.attrs["final_through"] == "2026-03-03"
+        assert df.index[-1] == pd.Timestamp("2026-03-03")  # 빈 날 이후 봉은 붙이지 않음
+
+    # 종목별 조회가 빈 날부터 채움
+    def fetch(code, start, end):
+        return frames[code].loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+    for code, src in frames.items():
+        df = get_prices(code, src.index[0], "2026-03-11", fetch=fetch, price_dir=tmp_path, now=NOW)
+        assert GAP_DAY in df.index
+        pd.testing.assert_frame_equal(df[OHLCV_COLS], src[OHLCV_COLS], check_freq=False)
+
+
+def test_calendar_failure_is_not_a_holiday(tmp_path):
+    frames = make_frames()
+    seed_store(frames, tmp_path)
+
+    def broken(start, end):
+        raise ConnectionError("calendar down")
+
+    stats = ingest_days(list(frames), source=blank_on(frame_source(frames), GAP_DAY), now=NOW,
+                        price_dir=tmp_path, calendar=broken)
+    assert stats["failed"] == "2026-03-04"
+    assert load_prices("005930", price_dir=tmp_path).attrs["final_through"] == "2026-03-03"
+
+
+def test_confirmed_holiday_is_skipped(tmp_path):
+    days = pd.bdate_range("2025-12-01", "2026-03-10", name="Date").drop(GAP_DAY)
+    frames = make_frames(days=days)
+    seed_store(frames, tmp_path)
+    source = frame_source(frames)
+    stats = ingest_days(list(frames), source=source, now=NOW, price_dir=tmp_path,
+                        calendar=lambda start, end: days)
+    assert stats["failed"] is None
+    assert stats["holidays"] == ["2026-03-04"]
+    assert len(source.requests) == 6
+    for code, src in frames.items():
+        df = load_prices(code, price_dir=tmp_path)
+        assert df.attrs["final_through"] == "2026-03-10"
+        pd.testing.assert_frame_equal(df[OHLCV_COLS], src[OHLCV_COLS], check_freq=False)
+
+
+def test_latest_day_empty_without_later_calendar_bar(tmp_path):
+    """달력에 아직 없는 날(당일)의 빈 응답은 휴장으로 확정하지 않음"""
+    frames = make_frames()
+    seed_store(frames, tmp_path)
+    last = pd.Timestamp("2026-03-10")
+    stats = ingest_days(list(frames), source=blank_on(frame_source(frames), last), now=NOW, price_dir=tmp_path,
+                        calendar=lambda start, end: pd.bdate_range(start, "2026-03-09"))
+    assert stats["failed"] == "2026-03-10"
+    assert load_prices("000660", price_dir=tmp_path).attrs["final_through"] == "2026-03-09"
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""relative_strength - RS 순위(0~99) 매핑과 섹터 순위 집계"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from relative_strength import return_table, rs_lookup, rs_ranks, sector_rankings
+
+
+def table_of(ret_3m, ret_6m=None):
+    codes = pd.Index([f"{i:06d}" for i in range(len(ret_3m))], name="code")
+    ret_6m = ret_3m if ret_6m is None else ret_6m
+    return pd.DataFrame({"ret_3m": ret_3m, "ret_6m": ret_6m}, index=codes, dtype=float)
+
+
+def test_rank_maps_to_floor_of_scaled_position():
+    # 순위 r(1..n) → floor((r-1)/(n-1)*99): 꼴찌 0, 1등 99
+    out = rs_ranks(table_of([0.30, -0.10, 0.05, 0.50, 0.20]))
+    assert out["rs_3m"].tolist() == [74, 0, 24, 99, 49]
+    n = 7
+    out = rs_ranks(table_of(np.arange(n) / 10))
+    assert out["rs_3m"].tolist() == [int(np.floor(r / (n - 1) * 99)) for r in range(n)]
+    assert out["rs_3m"].dtype.kind == "i"
+
+
+def test_ties_share_average_rank():
+    out = rs_ranks(table_of([0.1, 0.1, 0.3, -0.2]))
+    # 평균 순위 2.5 → floor(1.5/3*99) = 49
+    assert out["rs_3m"].tolist() == [49, 49, 99, 0]
+
+
+def test_missing_returns_rank_zero_and_are_not_counted():
+    out = rs_ranks(table_of([0.2, np.nan, 0.1, np.nan]))
+    assert out["rs_3m"].tolist() == [99, 0, 0, 0]  # n = 2 (수익률 있는 종목만)
+
+
+def test_single_or_no_ranked_ticker():
+    assert rs_ranks(table_of([np.nan, 0.05, np.nan]))["rs_3m"].tolist() == [0, 99, 0]
+    assert rs_ranks(table_of([np.nan, np.nan]))["rs_3m"].tolist() == [0, 0]
+
+
+def test_windows_are_ranked_independently_and_looked_up_by_code():
+    out = rs_ranks(table_of([0.1, 0.2, 0.3], [0.3, 0.2, 0.1]))
+    assert rs_lookup(out) == {"000000": (0, 99), "000001": (49, 49), "000002": (99, 0)}
+    assert rs_lookup(None) == {} and rs_lookup(out.iloc[:0]) == {}
+
+
+def test_return_table_fills_halted_last_day_and_drops_short_history():
+    idx = pd.bdate_range(end="2026-01-30", periods=130, name="Date")
+    steady = pd.DataFrame({"Close": np.linspace(100, 229, 130)}, index=idx)
+    halted = steady.copy()
+    halted.iloc[-1, 0] = np.nan  # 마지막 날 거래정지 → 직전 종가로 계산
+    young = steady.iloc[-40:]    # 1개월만 있음
+    table = return_table({"000001": steady, "000002": halted, "000003": young})
+    assert table.loc["000001", "ret_3m"] == pytest.approx(229 / steady["Close"].iloc[-64] - 1)
+    assert table.loc["000002", "ret_1m"] == pytest.approx(228 / steady["Close"].iloc[-22] - 1)
+    assert table.loc["000003", "ret_1m"] == pytest.approx(229 / steady["Close"].iloc[-22] - 1)
+    assert np.isnan(table.loc["000003", "ret_3m"]) and np.isnan(table.loc["000003", "above_ma50"])
+    assert table.loc["000001", "above_ma50"] == 1.0
+
+
+def sector_fixture():
+    table = pd.DataFrame({
+        "ret_1m": [0.01, 0.02, 0.03, 0.10, 0.00, -0.10, 0.05, 0.05, 0.0],
+        "ret_3m": [0.10, 0.20, 0.30, 0.40, np.nan, -0.20, 0.50, 0.50, 0.9],
+        "ret_6m": [0.10, 0.10, 0.10, 0.20, 0.20, 0.20, 0.60, 0.60, 0.0],
+        "above_ma50": [1.0, 0.0, 1.0, 1.0, 1.0, 0.0, 1.0, 1.0, 1.0],
+    }, index=pd.Index([f"00000{i}" for i in range(9)], name="code"))
+    stocks = pd.DataFrame({
+        "Code": [0, 1, 2, 3, 4, 5, 6, 7, 9],  # 숫자로 읽힌 코드도 6자리로 맞춤, 표에 없는 종목(9)은 빠짐
+        "Sector": ["반도체", "반도체", "반도체", "자동차", "자동차", "자동차", "은행", "은행", "반도체"],
+        "Marcap": [100, 300, 600, 4000, 5000, 1000, 1, 1, 10 ** 9],
+    })
+    return table, stocks
+
+
+def test_sector_rankings_aggregates_members():
+    table, stocks = sector_fixture()
+    out = sector_rankings(table, stocks, min_members=2).set_index("Sector")
+    assert out.index.tolist() == ["은행", "반도체", "자동차"]
+    assert out["Rank"].tolist() == [1, 2, 3]
+    semi, auto = out.loc["반도체"], out.loc["자동차"]
+    assert semi["AvgReturn_3M"] == pytest.approx(20.0)
+    assert semi["McapReturn_3M"] == pytest.approx((100 * 10 + 300 * 20 + 600 * 30) / 1000)
+    assert semi["Breadth"] == pytest.approx(200 / 3)
+    assert semi["StockCount"] == 3
+    # 수익률이 없는 종목은 평균/가중치/종목 수에서 빠짐 (breadth에는 포함)
+    assert auto["AvgReturn_3M"] == pytest.approx(10.0)
+    assert auto["McapReturn_3M"] == pytest.approx((4000 * 40 - 1000 * 20) / 5000)
+    assert auto["AvgReturn_6M"] == pytest.approx(20.0)
+    assert auto["Breadth"] == pytest.approx(200 / 3)
+    assert auto["StockCount"] == 2
+
+
+def test_sector_rankings_min_members_and_rank_by():
+    table, stocks = sector_fixture()
+    assert sector_rankings(table, stocks, min_members=3)["Sector"].tolist() == ["반도체"]
+    by_mcap = sector_rankings(table, stocks, min_members=2, rank_by="McapReturn_3M")
+    assert by_mcap["Sector"].tolist() == ["은행", "자동차", "반도체"]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""scan_history - 스캔 결과 CSV → 날짜별 Parquet 이력 (스키마, 기존 CSV 옮기기, 날짜/종목/컬럼 필터)"""
+import json
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from scan_history import HISTORY_SCHEMA, append_history, backfill_history, history_dates, load_history
+
+
+def scan_output(day, codes):
+    """merge_chunks가 쓰는 scanner_output CSV와 같은 컬럼 (CSV로 저장했다 읽은 값)"""
+    rows = []
+    for rank, code in enumerate(codes, start=1):
+        rows.append({
+            "rank": rank, "code": code, "name": f"종목{code}", "market": "KOSPI" if rank % 2 else "KOSDAQ",
+            "mktcap": 1.2e12 / rank, "sector": "반도체", "rs_3m": 90 - rank, "rs_6m": None,
+            "close": 71200.0, "stop": 66000.0, "trend_score": 23.0, "pattern_score": 14.0,
+            "volume_score": 8.0, "supply_score": 5.0, "risk_score": 7.0, "total_score": 57.0 - rank,
+            "risk_pct": 7.3, "bbw_pct": 12.5, "adx": 27.1, "setup": "B" if rank == 1 else "-",
+            "ma20": 69000.0, "ma60": 65000.0, "bb_upper": 72000.0, "door_knock": "True", "squeeze": "False",
+            "score_details": json.dumps({"trend_ma20": 5, "pat_setup_b": 5, "risk_deduction": -3}),
+            "strat1_type": "pullback", "strat1_name": "눌림목", "strat1_entry": 69000.0, "strat1_stop": 66000.0,
+            "strat1_risk": 4.3, "foreign_consec_buy": 2, "foreign_net_5d": 1.5e9, "inst_net_5d": -3e8,
+            "scan_date": f"{day} 16:42", "chunk": 1, "keywords": "HBM, 실적", "news_count": 10,
+        })
+    return pd.DataFrame(rows)
+
+
+def write_csv(data_dir, day, codes):
+    path = os.path.join(data_dir, f"scanner_output_{day}.csv")
+    scan_output(day, codes).to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+
+def test_partition_file_has_fixed_schema(tmp_path):
+    n = append_history(scan_output("2026-03-04", ["005930", "000660"]), "2026-03-04", tmp_path)
+    assert n == 2
+    stored = pq.read_schema(tmp_path / "date=2026-03-04" / "part-0.parquet")
+    assert stored.names == HISTORY_SCHEMA.names
+    for field in HISTORY_SCHEMA:
+        if field.name == "scan_date":  # Parquet에는 초 단위 timestamp가 없어 ms로 저장 (load_history가 스키마로 맞춤)
+            assert str(stored.field(field.name).type) == "timestamp[ms]"
+        else:
+            assert stored.field(field.name).type == field.type, field.name
+
+
+def test_backfill_csvs_and_read_back_types(tmp_path):
+    data_dir, hist = tmp_path / "data", tmp_path / "history"
+    data_dir.mkdir()
+    write_csv(data_dir, "2026-03-04", ["005930", "000660", "035420"])
+    write_csv(data_dir, "2026-03-05", ["005930", "000660"])
+    pd.DataFrame().to_csv(data_dir / "scanner_output_2026-03-06.csv", index=False)  # 빈 결과는 건너뜀
+    (data_dir / "scanner_output_latest.csv").write_text("code\n1\n")                 # 날짜 없는 파일도 건너뜀
+    assert backfill_history(data_dir, hist) == 2
+    assert backfill_history(data_dir, hist) == 0  # 이미 옮긴 날짜는 그대로
+    assert history_dates(hist) == ["2026-03-04", "2026-03-05"]
+
+    df = load_history(history_dir=hist)
+    assert len(df) == 5
+    assert df["code"].tolist()[:3] == ["005930", "000660", "035420"]  # CSV에서도 앞자리 0 유지
+    assert df["date"].dt.strftime("%Y-%m-%d").tolist() == ["2026-03-04"] * 3 + ["2026-03-05"] * 2
+    assert df["market"].dtype == "category" and df["setup"].dtype == "category"
+    assert str(df["rs_3m"].dtype) == "Int8" and df["rs_6m"].isna().all()
+    assert df["total_score"].dtype == "float32" and df["door_knock"].tolist()[0] is True
+    first = df.iloc[0]
+    assert (first["sd_trend_ma20"], first["sd_pat_setup_b"], first["sd_risk_deduction"], first["sd_trend_adx"]) == (5, 5, -3, 0)
+    assert first["scan_date"] == pd.Timestamp("2026-03-04 16:42")
+
+
+def test_filters_by_date_code_and_column(tmp_path):
+    for day, codes in [("2026-03-03", ["005930"]), ("2026-03-04", ["005930", "000660"]), ("2026-03-05", ["000660"])]:
+        append_history(scan_output(day, codes), day, tmp_path)
+    got = load_history(start="2026-03-04", columns=["code", "total_score"], history_dir=tmp_path)
+    assert list(got.columns) == ["date", "code", "total_score"]
+    assert got["code"].tolist() == ["005930", "000660", "000660"]
+    got = load_history(dates=["2026-03-03", "2026-03-05"], codes=[5930], history_dir=tmp_path)
+    assert got["date"].dt.strftime("%Y-%m-%d").tolist() == ["2026-03-03"]
+    assert load_history(end="2026-03-03", history_dir=tmp_path)["code"].tolist() == ["005930"]
+
+
+def test_rerun_replaces_day_without_duplicates(tmp_path):
+    append_history(scan_output("2026-03-04", ["005930", "000660"]), "2026-03-04", tmp_path)
+    rerun = scan_output("2026-03-04", [660.0]).assign(extra_column=1)  # 숫자로 읽힌 코드, 스키마 밖 컬럼은 버림
+    append_history(rerun, "2026-03-04", tmp_path)
+    df = load_history(history_dir=tmp_path)
+    assert df["code"].tolist() == ["000660"] and "extra_column" not in df.columns
+    assert not any(p.endswith(".tmp") for p in os.listdir(tmp_path))
+
+
+def test_empty_history(tmp_path):
+    df = load_history(columns=["code"], history_dir=tmp_path)
+    assert df.empty and list(df.columns) == ["date", "code"]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""update_daily.main + scan_journal - 중간에 끊긴 청크를 다시 실행하면 끝난 종목은 건너뛰고 결과 행이 중복되지 않는지"""
+import os
+
+import pandas as pd
+import pytest
+import yaml
+
+import scan_journal
+import update_daily
+from conftest import ROOT
+from scan_journal import append_journal, journal_path, load_journal
+
+NOW = pd.Timestamp("2026-03-04 16:30")
+DAY = NOW.strftime("%Y-%m-%d")
+CODES = [f"{i:06d}" for i in range(1, 11)]
+
+
+class Interrupted(BaseException):
+    """러너 타임아웃/취소 흉내 (timed_scan/fetch_enrichment가 잡지 않음)"""
+
+
+class FakeRun:
+    """main()이 쓰는 네트워크/가격 단계를 가짜로 대체. interrupt_scan번째 스캔 / interrupt_enrich번째 수급 기록 후 끊김"""
+
+    def __init__(self, monkeypatch):
+        self.scanned, self.flows, self.enriched = [], [], []
+        self.interrupt_scan = self.interrupt_enrich = None
+        self.fail = set()  # 스캔 오류(예외 메시지로 기록)로 끝나는 종목
+        with open(f"{ROOT}/config.yaml", "r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f)
+        cfg["universe"].update(workers=1, top_n_stocks=len(CODES), shards=1)
+        cfg["prices"] = {**cfg.get("prices", {}), "by_date_ingest": False}
+        cfg["investor"] = {**cfg.get("investor", {}), "top_candidates": len(CODES)}
+        stocks = pd.DataFrame({"Code": CODES, "Name": [f"종목{c}" for c in CODES], "Market": "KOSPI",
+                               "Marcap": range(len(CODES), 0, -1), "Sector": "기타"})
+        rs = pd.DataFrame({"rs_3m": 50, "rs_6m": 50}, index=pd.Index(CODES, name="code"))
+        patches = {
+            "load_config": lambda: cfg, "get_stock_list": lambda cfg: stocks, "get_kst_now": lambda: NOW,
+            "get_return_table": lambda *a, **k: rs, "check_index_above_ma20": lambda: True,
+            "calculate_sector_rankings": lambda *a, **k: None, "_scan_ticker": self.scan,
+            "get_investor_data": self.investor, "fetch_stock_news": lambda name, cfg: [],
+            "append_journal": self.journal,
+        }
+        for name, fn in patches.items():
+            monkeypatch.setattr(update_daily, name, fn)
+
+    def scan(self, row, cfg, start, end, index_above_ma20=True, rs=None, timings=None):
+        code = row["Code"]
+        if len(self.scanned) + 1 == self.interrupt_scan:
+            raise Interrupted
+        self.scanned.append(code)
+        if code in self.fail:
+            raise ValueError("일시적 조회 오류")
+        return {"code": code, "name": row["Name"], "trend_score": 10.0, "pattern_score": 10.0,
+                "volume_score": 10.0, "risk_score": 10.0, "total_score": 40.0 + int(code)}
+
+    def journal(self, scan_day, chunk, record):
+        scan_journal.append_journal(scan_day, chunk, record)
+        if record["stage"] == "enrich":
+            self.enriched.append(record["code"])
+            if len(self.enriched) == self.interrupt_enrich:
+                raise Interrupted
+
+    def investor(self, code):
+        self.flows.append(code)
+        return {"foreign_consecutive_buy": 1, "foreign_net_buy_5d": 1.0, "inst_net_buy_5d": 0.0}
+
+
+@pytest.fixture
+def run(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    return FakeRun(monkeypatch)
+
+
+def output():
+    return pd.read_csv(f"data/partial/scanner_output_{DAY}_chunk1.csv", dtype={"code": str})
+
+
+def scanned_record():
+    return pd.read_csv(f"data/partial/scanned_{DAY}_chunk1.csv", dtype={"code": str})
+
+
+def test_resume_after_step1_interrupt_skips_done_tickers(run):
+    run.fail = {"000003"}
+    run.interrupt_scan = 7
+    with pytest.raises(Interrupted):
+        update_daily.main()
+    journal = load_journal(DAY, 1)
+    assert sorted(journal["tech"]) == ["000001", "000002", "000004", "000005", "000006"]  # 오류 종목은 완료 아님
+
+    run.fail, run.interrupt_scan, first = set(), None, list(run.scanned)
+    update_daily.main()
+    rescanned = run.scanned[len(first):]
+    assert sorted(rescanned) == ["000003"] + CODES[6:]  # 끝난 종목은 다시 스캔하지 않음
+    out = output()
+    assert sorted(out["code"]) == CODES and out["code"].is_unique
+    assert out["rank"].tolist() == list(range(1, len(CODES) + 1))
+    assert sorted(scanned_record()["code"]) == CODES
+    assert not os.path.exists(journal_path(DAY, 1))  # partial CSV에 반영된 뒤 삭제
+
+
+def test_resume_after_step2_interrupt_reuses_journal(run):
+    run.interrupt_enrich = 3
+    with pytest.raises(Interrupted):
+        update_daily.main()
+    done = sorted(load_journal(DAY, 1)["enrich"])
+    assert len(done) == 3
+    n_scanned, n_flows = len(run.scanned), len(run.flows)
+
+    run.interrupt_enrich = None
+    update_daily.main()
+    assert len(run.scanned) == n_scanned  # STEP1은 저널에서 모두 복원
+    assert sorted(run.flows[n_flows:]) == sorted(set(CODES) - set(done))  # 기록된 종목만 다시 조회하지 않음
+    out = output()
+    assert sorted(out["code"]) == CODES and out["code"].is_unique
+    assert (out["supply_score"] == 5).all()  # 저널에서 복원한 수급도 점수에 반영
+    assert not os.path.exists(journal_path(DAY, 1))
+
+
+def test_truncated_last_line_and_latest_record_win(tmp_path):
+    append_journal(DAY, 2, {"stage": "tech", "code": "000001", "result": None, "error": "boom"}, tmp_path)
+    append_journal(DAY, 2, {"stage": "tech", "code": "000001", "result": {"x": 1}, "error": None}, tmp_path)
+    append_journal(DAY, 2, {"stage": "tech", "code": "000002", "result": None, "error": "boom"}, tmp_path)
+    with open(journal_path(DAY, 2, tmp_path), "a", encoding="utf-8") as f:
+        f.write('{"stage": "tech", "code": "00000')  # 기록 도중 종료
+    done = load_journal(DAY, 2, tmp_path)
+    assert list(done["tech"]) == ["000001"] and done["tech"]["000001"]["result"] == {"x": 1}
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""scanner_core - 마지막 봉 전용 계산(calculate_signals_tail, rolling_percentile_rank)이 전체 계산과 같은지"""
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from benchmarks.scanner import synthetic_ohlcv
+from conftest import ROOT
+from scanner_core import (calculate_signals, calculate_signals_tail, calculate_strategies, percentile_rank,
+                          rolling_percentile_rank, score_stock)
+
+
+@pytest.fixture(scope="module")
+def cfg():
+    with open(f"{ROOT}/config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def rolling_apply_rank(s, lookback):
+    """percentile_rank의 원래 구현 (rolling().apply)"""
+    def pct(x):
+        if len(x) < 2: return np.nan
+        return 100.0 * (np.sum(x <= x[-1]) - 1) / (len(x) - 1)
+    return s.rolling(lookback).apply(pct, raw=True)
+
+
+def frames():
+    """정수 가격(누적합 경로), 소수 가격(pandas 경로), 최소 길이 경계"""
+    for seed, n_bars in [(1, 400), (2, 250), (3, 2000), (4, 60), (5, 61)]:
+        yield f"int-{seed}", synthetic_ohlcv(n_bars, seed)
+    fractional = synthetic_ohlcv(400, 6)
+    fractional[["Open", "High", "Low", "Close"]] *= 1.0007
+    yield "fractional", fractional
+
+
+@pytest.mark.parametrize("name,df", list(frames()))
+def test_tail_last_row_matches_full(cfg, name, df):
+    for end in sorted({len(df), len(df) - 1, len(df) - 37, 60}):
+        part = df.iloc[:end]
+        full, tail = calculate_signals(part, cfg), calculate_signals_tail(part, cfg)
+        if end < 60:
+            assert full is None and tail is None
+            continue
+        assert full.keys() == tail.keys()
+        for key, s in full.items():
+            if key == "vol_explosion":
+                pd.testing.assert_series_equal(tail[key], s.tail(60), check_names=False)
+                continue
+            assert len(tail[key]) == 1 and tail[key].index[0] == part.index[-1]
+            expected, got = s.iloc[-1], tail[key].iloc[-1]
+            assert (expected == got) or (pd.isna(expected) and pd.isna(got)), (name, end, key, expected, got)
+        # 점수/전략도 같은 결과
+        assert score_stock(part, tail, cfg, mktcap=1e12) == score_stock(part, full, cfg, mktcap=1e12)
+        assert calculate_strategies(part, tail, cfg) == calculate_strategies(part, full, cfg)
+
+
+def test_tail_short_history_returns_none(cfg):
+    assert calculate_signals_tail(synthetic_ohlcv(59, 1), cfg) is None
+    assert calculate_signals_tail(None, cfg) is None
+
+
+@pytest.mark.parametrize("lookback", [2, 20, 60, 120])
+def test_rolling_percentile_rank_matches_rolling_apply(lookback):
+    rng = np.random.default_rng(lookback)
+    s = pd.Series(np.round(rng.normal(0, 1, 500), 1))  # 반올림으로 동점이 많음
+    s.iloc[[30, 31, 200]] = [np.nan, np.inf, np.nan]    # 윈도우 안 NaN/inf → NaN
+    expected = rolling_apply_rank(s, lookback)
+    np.testing.assert_array_equal(percentile_rank(s, lookback).to_numpy(), expected.to_numpy())
+    # 2-D(날짜 × 종목)도 열마다 같은 값, 블록 경계를 넘는 열 수
+    wide = pd.concat({i: s.sample(frac=1, random_state=i).reset_index(drop=True) for i in range(5)}, axis=1)
+    got = rolling_percentile_rank(wide.to_numpy(), lookback, block=2)
+    for i in wide.columns:
+        np.testing.assert_array_equal(got[:, i], rolling_apply_rank(wide[i], lookback).to_numpy())
+
+
+def test_rolling_percentile_rank_short_input():
+    assert np.isnan(rolling_percentile_rank(np.arange(5.0), 10)).all()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""scanner_panel - 패널 시그널/점수가 종목별 calculate_signals/score_stock과 같은지"""
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from benchmarks.scanner import synthetic_ohlcv
+from conftest import ROOT
+from scanner_core import calculate_signals, score_stock
+from scanner_panel import build_panel, calculate_signals_panel, score_panel
+
+N_BARS = 320
+LATE = "900002"     # 구간 중간에 상장 (패널에서는 앞쪽이 NaN)
+EMPTY = "900003"    # 모든 값이 NaN (거래정지 등으로 값이 비어 내려온 종목)
+
+
+@pytest.fixture(scope="module")
+def cfg():
+    with open(f"{ROOT}/config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(scope="module")
+def frames():
+    empty = synthetic_ohlcv(N_BARS, seed=4)
+    empty[:] = np.nan
+    late = synthetic_ohlcv(150, seed=3)
+    late.iloc[40, late.columns.get_loc("Volume")] *= 10  # 상장 후 클라이맥스 (앞쪽 NaN 뒤의 forward fill)
+    return {"900000": synthetic_ohlcv(N_BARS, seed=1), "900001": synthetic_ohlcv(N_BARS, seed=2),
+            LATE: late, EMPTY: empty}
+
+
+@pytest.fixture(scope="module")
+def panel_sig(frames, cfg):
+    panel = build_panel(frames)
+    return panel, calculate_signals_panel(panel, cfg)
+
+
+def test_panel_signals_match_per_ticker(frames, cfg, panel_sig):
+    panel, sig = panel_sig
+    assert list(sig["upper"].columns) == list(frames)
+    assert panel["Close"][LATE].isna().sum() == N_BARS - 150
+    assert sig["is_climax"][LATE].sum() >= 1 and sig["climax_low"][LATE].notna().sum() > 100
+    for code, df in frames.items():
+        expected = calculate_signals(df, cfg)
+        assert expected.keys() == sig.keys()
+        for key, s in expected.items():
+            got = sig[key][code].reindex(df.index)
+            if code == EMPTY and key == "vol_dryup_count":
+                # 종목별 계산은 NaN 거래량을 '수축 아님'(0)으로 셈, 패널은 상장 전 구간과 구분할 수 없어 NaN (점수는 둘 다 0점)
+                assert got.isna().all() and (s.dropna() == 0).all()
+            elif s.dtype == bool:
+                assert (got.to_numpy(dtype=bool) == s.to_numpy()).all(), (code, key)
+            else:
+                np.testing.assert_array_equal(got.to_numpy(dtype=float), s.to_numpy(dtype=float), err_msg=f"{code} {key}")
+
+
+def test_empty_ticker_has_no_signals_or_score(cfg, panel_sig):
+    panel, sig = panel_sig
+    assert sig["upper"][EMPTY].isna().all()
+    assert not sig["setup_b"][EMPTY].any() and not sig["is_climax"][EMPTY].any()
+    assert score_panel(panel, sig, cfg)[EMPTY].isna().all()
+
+
+@pytest.mark.parametrize("index_above_ma20", [True, False])
+def test_score_panel_matches_score_stock_on_every_date(frames, cfg, panel_sig, index_above_ma20):
+    panel, sig = panel_sig
+    total = score_panel(panel, sig, cfg, rs_3m=85, rs_6m=50, index_above_ma20=index_above_ma20)
+    checked = 0
+    for code, df in frames.items():
+        if code == EMPTY:
+            continue
+        full = calculate_signals(df, cfg)
+        assert total[code].loc[:df.index[0]].iloc[:-1].isna().all()  # 상장 전은 점수 없음
+        for i in range(59, len(df), 7):
+            day = df.index[i]
+            scored = score_stock(df.iloc[:i + 1], {k: s.iloc[:i + 1] for k, s in full.items()}, cfg,
+                                 rs_3m=85, rs_6m=50, index_above_ma20=index_above_ma20)
+            assert total.loc[day, code] == scored["total_score"], (code, day)
+            checked += 1
+    assert checked > 80
+
+
+def test_build_panel_drops_missing_frames(frames):
+    panel = build_panel({**frames, "900009": None, "900010": pd.DataFrame()})
+    assert list(panel["Close"].columns) == list(frames)
+    assert len(panel["Close"]) == N_BARS
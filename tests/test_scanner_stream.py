@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""scanner_stream - 스캔 구간이 하루씩 밀려도 증분 상태 결과가 calculate_signals_tail 경로와 같은지"""
+import math
+
+import numpy as np
+import pytest
+import yaml
+
+import scanner_stream
+from benchmarks.scanner import synthetic_ohlcv
+from conftest import ROOT
+from scanner_core import calculate_signals_tail, calculate_strategies, score_stock
+
+WINDOW = 280  # 스캔 구간 봉 수 (STEP1의 400 달력일 정도)
+N_DAYS = 25   # 구간을 하루씩 밀며 스캔하는 날 수
+N_BARS = WINDOW + N_DAYS - 1
+CODE = "900001"
+
+
+@pytest.fixture
+def cfg():
+    with open(f"{ROOT}/config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def scan(tmp_path):
+    """스캔 구간 df → (결과, 증분 상태를 썼는지). 상태를 못 쓰면 STEP1과 같은 전체 계산"""
+
+    def run(df, cfg):
+        state = scanner_stream.scan_state(CODE, df, cfg, state_dir=tmp_path)
+        if state is None:
+            return reference(df, cfg), False
+        return scanner_stream.score_state(state, cfg, mktcap=1e12), True
+
+    return run
+
+
+def reference(df, cfg):
+    sig = calculate_signals_tail(df, cfg)
+    scored = score_stock(df, sig, cfg, mktcap=1e12)
+    if scored is None:
+        return None
+    for k, v in (calculate_strategies(df, sig, cfg) or {}).items():
+        if k != "strategies":
+            scored[k] = v
+    return scored
+
+
+def assert_same(a, b):
+    assert (a is None) == (b is None)
+    if a is None:
+        return
+    assert a.keys() == b.keys()
+    for k in a:
+        if isinstance(a[k], float) and isinstance(b[k], float):
+            assert math.isclose(a[k], b[k], rel_tol=1e-12, abs_tol=1e-12) or (math.isnan(a[k]) and math.isnan(b[k])), k
+        else:
+            assert a[k] == b[k], k
+
+
+def days_of(full):
+    """하루씩 밀리는 스캔 구간 (STEP1은 최근 400 달력일만 조회)"""
+    return [full.iloc[i:i + WINDOW] for i in range(N_DAYS)]
+
+
+def test_sliding_window_matches_tail_path(scan, cfg):
+    used, passed = [], 0
+    for df in days_of(synthetic_ohlcv(N_BARS, seed=7)):
+        got, streamed = scan(df, cfg)
+        assert_same(got, reference(df, cfg))
+        used.append(streamed)
+        passed += got is not None
+    assert used[0] is False and all(used[1:])  # 첫날만 상태 생성
+    assert passed > 0
+
+
+def test_bollinger_std_matches_rolling_std(cfg, tmp_path):
+    full = synthetic_ohlcv(N_BARS, seed=13)
+    full[["Open", "High", "Low", "Close"]] += 5e6  # 고가주: 제곱합 누적이면 오차가 커지는 구간
+    days = days_of(full)
+    scanner_stream.scan_state(CODE, days[0], cfg, state_dir=tmp_path)
+    for df in days[1:]:
+        state = scanner_stream.scan_state(CODE, df, cfg, state_dir=tmp_path)
+        sig = calculate_signals_tail(df, cfg)
+        for key in ("upper", "lower"):
+            assert state["last"][key] == pytest.approx(float(sig[key].iloc[-1]), rel=1e-14), key
+
+
+def test_climax_leaving_window_is_dropped(scan, cfg, tmp_path):
+    full = synthetic_ohlcv(N_BARS, seed=5)
+    full["Volume"] = np.round(1e6 * (1 + 0.2 * np.sin(np.arange(N_BARS))))  # 다른 클라이맥스 없음
+    full.iloc[25, full.columns.get_loc("Volume")] = 3e7
+    climax_date = full.index[25]
+    seen = []
+    for df in days_of(full):
+        got, _ = scan(df, cfg)
+        assert_same(got, reference(df, cfg))
+        state = scanner_stream.load_state(CODE, tmp_path)
+        seen.append(state["climax_date"])
+    # 구간 20번째 봉(거래량 20일 평균이 처음 나오는 봉)보다 앞으로 밀린 날부터 버림
+    assert seen[:7] == [climax_date.strftime("%Y-%m-%d")] * 7
+    assert seen[7:] == [None] * (N_DAYS - 7)
+
+
+def test_adjusted_history_rebuilds_state(scan, cfg):
+    days = days_of(synthetic_ohlcv(N_BARS, seed=11))
+    scan(days[0], cfg)
+    scan(days[1], cfg)
+    # 액면분할: 과거 봉이 모두 절반으로 수정된 이력이 내려옴
+    split = days[2].copy()
+    split.loc[split.index[:-1], ["Open", "High", "Low", "Close"]] /= 2
+    got, streamed = scan(split, cfg)
+    assert streamed is False
+    assert_same(got, reference(split, cfg))
+    # 다시 만든 상태로 다음 날은 증분 반영
+    nxt = days[3].copy()
+    nxt.loc[nxt.index[:-2], ["Open", "High", "Low", "Close"]] /= 2
+    got, streamed = scan(nxt, cfg)
+    assert streamed is True
+    assert_same(got, reference(nxt, cfg))
+
+
+def test_intraday_snapshot_replaced_rebuilds_state(scan, cfg):
+    days = days_of(synthetic_ohlcv(N_BARS, seed=3))
+    snapshot = days[1].copy()
+    snapshot.iloc[-1, snapshot.columns.get_loc("Close")] *= 1.01  # 장중 값
+    scan(days[0], cfg)
+    scan(snapshot, cfg)
+    got, streamed = scan(days[2], cfg)  # 어제 봉이 확정값으로 바뀜
+    assert streamed is False
+    assert_same(got, reference(days[2], cfg))
+
+
+def test_refetch_or_cfg_change_rebuilds_state(scan, cfg):
+    days = days_of(synthetic_ohlcv(N_BARS, seed=5))
+    scan(days[0], cfg)
+    refetched = days[1].copy()
+    refetched.attrs["refetched"] = True
+    assert scan(refetched, cfg)[1] is False
+    assert scan(days[2], cfg)[1] is True
+    changed = {**cfg, "bollinger": {**cfg["bollinger"], "length": 40}}
+    got, streamed = scan(days[3], changed)
+    assert streamed is False
+    assert_same(got, reference(days[3], changed))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""sharding - LPT 매니페스트가 모든 종목을 정확히 한 샤드에 배정하는지, merge 검사가 누락/중복을 찾는지"""
+import numpy as np
+import pytest
+
+from sharding import build_manifest, check_coverage, plan_shards, save_scanned, update_costs, load_costs
+
+DAY = "2026-03-04"
+
+
+def universe(n, seed=0):
+    rng = np.random.default_rng(seed)
+    codes = [f"{i:06d}" for i in rng.permutation(n) + 1]
+    costs = {c: float(v) for c, v in zip(codes, rng.lognormal(0, 1, n))}
+    for c in codes[::7]:
+        del costs[c]  # 기록 없는 종목 → 중앙값으로 가정
+    return codes, costs
+
+
+@pytest.mark.parametrize("n_codes,n_shards", [(100, 4), (37, 5), (3, 8), (1, 1), (0, 3)])
+def test_every_ticker_in_exactly_one_shard(n_codes, n_shards):
+    codes, costs = universe(n_codes)
+    manifest = build_manifest(codes, n_shards, DAY, costs=costs)
+    assert manifest["n_shards"] == n_shards
+    assigned = [c for shard in manifest["shards"].values() for c in shard]
+    assert sorted(assigned) == sorted(codes)
+    assert len(assigned) == len(set(assigned))
+    order = {c: i for i, c in enumerate(codes)}
+    for shard in manifest["shards"].values():
+        assert shard == sorted(shard, key=order.get)  # 샤드 안은 원래(시가총액) 순서
+
+
+def test_lpt_balance_and_determinism():
+    codes, costs = universe(200, seed=3)
+    shards, default = plan_shards(codes, 6, costs)
+    assert default == sorted(costs.values())[len(costs) // 2]
+    loads = [sum(costs.get(c, default) for c in s) for s in shards]
+    # LPT: 마지막으로 넣은 종목은 그때 가장 가벼운 샤드에 들어감 → 최대/최소 차이는 종목 비용 하나 이하
+    assert max(loads) - min(loads) <= max(costs.values())
+    assert plan_shards(list(codes), 6, dict(costs)) == (shards, default)
+
+
+def test_codes_are_zero_padded():
+    manifest = build_manifest([5930, "660"], 2, DAY, costs={})
+    assert sorted(c for s in manifest["shards"].values() for c in s) == ["000660", "005930"]
+
+
+def test_check_coverage_reports_missing_duplicate_and_unexpected(tmp_path):
+    codes, costs = universe(12)
+    manifest = build_manifest(codes, 3, DAY, costs=costs)
+    s1, s2, s3 = (manifest["shards"][k] for k in ("1", "2", "3"))
+    save_scanned([(c, 0.5, True) for c in s1], DAY, 1, tmp_path)
+    save_scanned([(c, 0.5, True) for c in s2[1:]] + [(s1[0], 0.5, False)], DAY, 2, tmp_path)
+    save_scanned([("999999", 0.1, False)], DAY, 9, tmp_path)
+    cov = check_coverage(manifest, tmp_path)
+    assert cov["missing_shards"] == ["3"]
+    assert cov["missing"] == sorted([s2[0]] + s3)
+    assert cov["duplicates"] == [s1[0]]
+    assert "999999" not in cov["unexpected"] and any("chunk9" in u for u in cov["unexpected"])
+
+
+def test_update_costs_is_exponential_moving_average(tmp_path):
+    path = tmp_path / "scan_costs.csv"
+    update_costs({"000001": 2.0}, path=path)
+    update_costs({"000001": 4.0, "000002": 1.0}, path=path, alpha=0.25)
+    assert load_costs(path) == {"000001": pytest.approx(2.5), "000002": 1.0}
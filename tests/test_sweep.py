@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""sweep - 캐시를 공유하는 스윕 결과가 조합마다 따로 계산한 값과 같은지, 순위 정렬"""
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+import sweep
+from backtest import setup_labels
+from benchmarks.scanner import synthetic_universe
+from conftest import ROOT
+from scanner_panel import build_panel, calculate_signals_panel, score_panel
+
+GRID = {
+    "bollinger.length": [40, 60],
+    "bollinger.stdev": [2.0, 2.5],
+    "trend.adx_min": [15, 25],
+    "volume.climax_mult": [3.0, 5.0],
+    "min_total": [30, 50],
+}
+PARAMS = {"years": 0.6, "horizons": [5, 10], "rank_horizon": 10, "min_signals": 20, "workers": 1}
+
+
+@pytest.fixture(scope="module")
+def cfg():
+    with open(f"{ROOT}/config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(scope="module")
+def panel():
+    return build_panel(synthetic_universe(8, 400, seed=4))
+
+
+def reference_row(panel, cfg, combo, eval_start):
+    """조합 하나를 캐시 없이 pandas로 계산"""
+    c = sweep.apply_params(cfg, combo)
+    sig = calculate_signals_panel(panel, c)
+    close = panel["Close"]
+    in_eval = np.asarray(close.index >= eval_start)[:, None]
+    mask = (setup_labels(sig) != "-") & (score_panel(panel, sig, c).to_numpy() >= combo["min_total"]) & in_eval
+    row = {"signals": int(mask.sum())}
+    for h in PARAMS["horizons"]:
+        fwd = close.shift(-h) / close * 100 - 100
+        excess = fwd.sub(fwd.mean(axis=1), axis=0)
+        m = mask & fwd.notna().to_numpy()
+        row[f"ret_{h}d"] = round(float(fwd.to_numpy()[m].mean()), 3) if m.any() else np.nan
+        row[f"excess_{h}d"] = round(float(excess.to_numpy()[m].mean()), 3) if m.any() else np.nan
+    return row
+
+
+def test_cached_sweep_matches_uncached_per_combo(panel, cfg):
+    combos = sweep.grid_combos(GRID)
+    out = sweep.run_sweep(panel, cfg, combos, PARAMS)
+    assert len(out) == len(combos) == 32
+    eval_start = panel["Close"].index.max() - pd.Timedelta(days=int(365 * PARAMS["years"]))
+    for row in out.to_dict("records"):
+        combo = {k: row[k] for k in GRID}
+        expected = reference_row(panel, cfg, combo, eval_start)
+        for key, value in expected.items():
+            assert row[key] == pytest.approx(value, abs=1e-3, nan_ok=True), (combo, key)
+    assert (out["signals"] > 0).sum() >= 8
+
+
+def test_parallel_sweep_matches_serial(panel, cfg):
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork 시작 방식 없음")
+    combos = sweep.random_combos(GRID, 10, seed=1)
+    serial = sweep.run_sweep(panel, cfg, combos, PARAMS)
+    parallel = sweep.run_sweep(panel, cfg, combos, {**PARAMS, "workers": 2})
+    pd.testing.assert_frame_equal(serial.drop(columns="seconds"), parallel.drop(columns="seconds"))
+
+
+def test_rank_results_puts_thin_combos_last():
+    results = pd.DataFrame({"signals": [500, 10, 300, 250], "excess_10d": [0.5, 9.0, 1.2, np.nan]})
+    out = sweep.rank_results(results, {"rank_horizon": 10, "min_signals": 200})
+    assert out["rank"].tolist() == [1, 2, 3, 4]
+    assert out["signals"].tolist() == [300, 500, 250, 10]  # 초과수익 순, 결측은 뒤, 시그널 부족은 맨 뒤
+
+
+def test_combos_and_params():
+    combos = sweep.grid_combos({"a.x": [1, 2], "min_total": [60, 70]})
+    assert combos == [{"a.x": 1, "min_total": 60}, {"a.x": 1, "min_total": 70},
+                      {"a.x": 2, "min_total": 60}, {"a.x": 2, "min_total": 70}]
+    picked = sweep.random_combos(GRID, 5, seed=3)
+    assert len(picked) == 5 and picked == sweep.random_combos(GRID, 5, seed=3)
+    assert all(p in sweep.grid_combos(GRID) for p in picked)
+    assert sweep.random_combos(GRID, 100) == sweep.grid_combos(GRID)
+    base = {"bollinger": {"length": 60, "stdev": 2}}
+    applied = sweep.apply_params(base, {"bollinger.length": 40, "trend.adx_min": 25, "min_total": 70})
+    assert applied == {"bollinger": {"length": 40, "stdev": 2}, "trend": {"adx_min": 25}}
+    assert base["bollinger"]["length"] == 60  # 원본은 그대로
+
+
+def test_forward_returns():
+    close = np.array([[100.0], [110.0], [121.0], [np.nan]])
+    fwd = sweep.forward_returns(close, [1, 2])
+    np.testing.assert_allclose(fwd[1][:, 0], [10.0, 10.0, np.nan, np.nan])
+    np.testing.assert_allclose(fwd[2][:, 0], [21.0, np.nan, np.nan, np.nan])
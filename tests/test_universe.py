@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""update_daily.confirm_adv20 - 저장소가 없는 종목의 거래대금 확인 이력을 STEP1이 다시 받지 않는지"""
+from functools import partial
+
+import pandas as pd
+import pytest
+
+import price_store
+import update_daily
+from benchmarks.scanner import synthetic_ohlcv
+
+NOW = pd.Timestamp("2026-01-30 19:00")  # synthetic_ohlcv 마지막 봉 날짜의 장 마감 후 (KST)
+
+
+@pytest.fixture
+def fetches(monkeypatch, tmp_path):
+    """가짜 일봉 조회 → 요청 구간 기록. update_daily.get_prices는 tmp_path 저장소를 씀"""
+    frames = {"900001": synthetic_ohlcv(600, seed=1), "900002": synthetic_ohlcv(600, seed=2)}
+    calls = []
+
+    def fetch(code, start, end):
+        calls.append((code, pd.Timestamp(start), pd.Timestamp(end)))
+        return frames[code].loc[pd.Timestamp(start):pd.Timestamp(end), price_store.OHLCV_COLS]
+
+    monkeypatch.setattr(update_daily, "get_prices",
+                        partial(price_store.get_prices, fetch=fetch, price_dir=tmp_path, now=NOW))
+    monkeypatch.setattr(update_daily, "get_kst_now", lambda: NOW)
+    return frames, calls
+
+
+def test_confirm_adv20_download_is_reused_by_step1(fetches):
+    frames, calls = fetches
+    codes = list(frames)
+    adv = update_daily.confirm_adv20(codes, workers=2)
+    assert adv == {code: pytest.approx(update_daily.adv20_value(df)) for code, df in frames.items()}
+    assert len(calls) == len(codes)
+
+    start, end = update_daily.scan_window(NOW)
+    assert all(s == start.normalize() for _, s, _ in calls)  # 처음부터 STEP1 구간 전체를 받음
+    for code in codes:
+        df = update_daily.get_prices(code, start, end)
+        assert len(df) >= 200
+    # STEP1은 마지막 저장 봉부터의 꼬리만 다시 확인 (전체 구간 재다운로드 없음)
+    step1 = calls[len(codes):]
+    assert len(step1) == len(codes)
+    assert all(s == frames[code].index[-1] for code, s, _ in step1)
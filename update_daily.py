@@ -4,15 +4,29 @@ update_daily.py - 매일 주식 스캐너 실행 스크립트
 GitHub Actions에서 실행되어 수급 데이터를 포함한 스캔 결과를 저장합니다.
 """
 import os
+import math
 import time
 import json
 import yaml
 import pandas as pd
-import requests
 import FinanceDataReader as fdr
 from datetime import datetime, timedelta
-from scanner_core import calculate_signals, score_stock, calculate_strategies
-from news_analyzer import analyze_stock_news
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from scanner_core import calculate_signals_tail, score_stock, calculate_strategies
+from price_store import get_prices
+from price_ingest import ingest_days, stored_codes, print_stats as print_ingest_stats
+from relative_strength import get_return_table, rs_lookup, sector_rankings
+from sharding import build_manifest, save_manifest, get_manifest, save_scanned
+from scan_journal import load_journal, append_journal, clear_journal
+from scan_telemetry import stage, skip, new_report, add_ticker, add_enrich, finish_report, write_report, print_report
+from investor_store import get_flows, fetch_flows, summarize_flows
+from news_analyzer import fetch_stock_news, analyze_news_batch
+import http_client
+
+
+ADV_DROP_RATIO = 0.2     # 당일 거래대금이 기준의 이 비율 미만이면 이력 확인 없이 제외
+SCAN_HISTORY_DAYS = 400  # STEP1 가격 이력 구간 (달력일). 거래대금 확인도 같은 구간을 받아 저장소를 재사용
 
 
 def load_config():
@@ -27,7 +41,6 @@ def get_stock_list(cfg):
         stocks = pd.concat([kospi, kosdaq], ignore_index=True)
         stocks = stocks[~stocks["Name"].str.contains("우|스팩", na=False, regex=True)]
         if "Marcap" in stocks.columns:
-            stocks = stocks[stocks["Marcap"] >= cfg["universe"]["min_mktcap_krw"]]
             stocks = stocks.sort_values("Marcap", ascending=False)
         
         # Sector 정보 확인 및 매핑 (KRX-DESC 사용)
@@ -60,13 +73,85 @@ def get_stock_list(cfg):
         stocks["Code"] = stocks["Code"].astype(str).str.zfill(6)
         os.makedirs("data", exist_ok=True)
         stocks.to_csv("data/krx_backup.csv", index=False, encoding="utf-8-sig")
-        return stocks
     except Exception as e:
         print(f"[ERR] 종목 리스트 로드 실패: {e}")
         try:
-            return pd.read_csv("data/krx_backup.csv")
+            stocks = pd.read_csv("data/krx_backup.csv", dtype={"Code": str})
         except:
             return pd.DataFrame()
+    return prefilter_universe(stocks, cfg)
+
+
+def adv20_value(df):
+    """최근 20봉 평균 거래대금 (종가 × 거래량, 원)"""
+    return float((df["Close"] * df["Volume"]).tail(20).mean())
+
+
+def prefilter_universe(stocks, cfg, fetch=None):
+    """
+    가격 이력을 받기 전에 상장 종목 스냅샷(종가/거래대금/시가총액)으로 통과할 수 없는 종목 제외
+    - 시가총액 < min_mktcap_krw, 종가 < min_close → 제외
+    - 당일 거래대금 >= min_adv20_value → 유지 (정확한 20일 평균은 STEP1에서 확인)
+    - 당일 거래대금 < min_adv20_value × ADV_DROP_RATIO → 제외
+    - 그 사이(기준 근처)만 짧은 일봉(가격 저장소)으로 20일 평균 거래대금을 확인
+    스냅샷에 거래대금이 없거나 모두 0이면(장 시작 전 등) 거래대금 조건은 STEP1에 맡김
+    """
+    if stocks is None or stocks.empty:
+        return stocks
+    uni = cfg["universe"]
+    before = len(stocks)
+    keep = pd.Series(True, index=stocks.index)
+    dropped = {}
+
+    def apply(name, mask):
+        mask = mask.fillna(False) & keep
+        dropped[name] = int(mask.sum())
+        keep[mask] = False
+
+    if "Marcap" in stocks.columns and uni.get("min_mktcap_krw"):
+        apply("mktcap", pd.to_numeric(stocks["Marcap"], errors="coerce") < uni["min_mktcap_krw"])
+    if "Close" in stocks.columns and uni.get("min_close"):
+        apply("close", pd.to_numeric(stocks["Close"], errors="coerce") < uni["min_close"])
+    min_adv = uni.get("min_adv20_value")
+    amount = pd.to_numeric(stocks["Amount"], errors="coerce") if "Amount" in stocks.columns else None
+    if min_adv and amount is not None and amount.fillna(0).sum() > 0:
+        apply("adv_snapshot", (amount > 0) & (amount < min_adv * ADV_DROP_RATIO))
+        near = keep & ~(amount >= min_adv)  # 기준 근처 (거래대금 결측/0 - 거래정지 등 - 포함)
+        codes = stocks.loc[near, "Code"].astype(str).str.zfill(6).tolist()
+        if codes:
+            adv = confirm_adv20(codes, fetch=fetch, workers=int(cfg.get("http", {}).get("enrich_workers", 8) or 1))
+            apply("adv20", near & stocks["Code"].astype(str).str.zfill(6).map(
+                lambda c: adv.get(c) is not None and adv[c] < min_adv))
+            print(f"[UNIVERSE] 거래대금 기준 근처 {len(codes)}개 최근 일봉으로 확인")
+    out = stocks[keep]
+    print(f"[UNIVERSE] 스냅샷 사전 필터: {before}개 → {len(out)}개 (" +
+          ", ".join(f"{k} {v}개 제외" for k, v in dropped.items()) + ")")
+    return out
+
+
+def scan_window(now):
+    """STEP1 가격 조회 구간 (start, end). 내일까지로 설정하여 당일 데이터 포함 보장"""
+    return now - timedelta(days=SCAN_HISTORY_DAYS), now + timedelta(days=1)
+
+
+def confirm_adv20(codes, fetch=None, workers=8):
+    """
+    {code: 20일 평균 거래대금} (실패하면 None → 제외하지 않음)
+    STEP1과 같은 구간으로 가격 저장소를 읽음 → 저장소가 없는 종목도 여기서 받은 이력을 STEP1이 그대로 사용
+    """
+    fetch = fetch or get_prices
+    start, end = scan_window(get_kst_now())
+
+    def one(code):
+        try:
+            df = fetch(code, start, end)
+            return code, adv20_value(df) if df is not None and len(df) >= 5 else None
+        except Exception as e:
+            print(f"[WARN] {code} 거래대금 확인 실패: {e}")
+            return code, None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return dict(pool.map(one, codes))
 
 
 def check_index_above_ma20():
@@ -75,7 +160,7 @@ def check_index_above_ma20():
         now = get_kst_now()
         end = now + timedelta(days=1)
         start = now - timedelta(days=60)
-        kospi = fdr.DataReader("KS11", start, end)  # 코스피 지수
+        kospi = get_prices("KS11", start, end)  # 코스피 지수
         if kospi is not None and len(kospi) >= 20:
             ma20 = kospi["Close"].rolling(20).mean().iloc[-1]
             close = kospi["Close"].iloc[-1]
@@ -88,231 +173,290 @@ def check_index_above_ma20():
 
 
 def get_investor_data(code, days=10, max_retries=3):
-    """외국인/기관 투자자 데이터 조회 (안정화 버전)"""
+    """외국인/기관 투자자 데이터 조회 (거래일별 로컬 저장소 사용, 빠진 날짜만 조회)"""
     code = str(code).zfill(6)
-    
-    # 방법 1: 네이버 금융 (우선)
-    for attempt in range(max_retries):
-        try:
-            url = f"https://finance.naver.com/item/frgn.naver?code={code}"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'Referer': 'https://finance.naver.com/',
-            }
-            session = requests.Session()
-            r = session.get(url, headers=headers, timeout=15)
-            r.raise_for_status()
-            dfs = pd.read_html(r.text, encoding='cp949')
-            target_df = None
-            for df in dfs:
-                cols_str = ' '.join(str(c) for c in df.columns)
-                if '기관' in cols_str or '외국인' in cols_str:
-                    target_df = df
-                    break
-            if target_df is None and len(dfs) >= 2:
-                target_df = dfs[1]
-            if target_df is not None:
-                df_clean = target_df.dropna(how='all').head(10)
-                foreign_sum, inst_sum, consecutive_buy = 0, 0, 0
-                frgn_col, inst_col, price_col = None, None, None
-                for col in df_clean.columns:
-                    col_str = str(col).lower()
-                    if '외국인' in col_str and frgn_col is None: frgn_col = col
-                    if '기관' in col_str and inst_col is None: inst_col = col
-                    if '종가' in col_str and price_col is None: price_col = col
-                count, consecutive_counting = 0, True
-                for _, data_row in df_clean.iterrows():
-                    if count >= 5: break
-                    try:
-                        price = 1
-                        if price_col:
-                            ps = str(data_row[price_col]).replace(',', '').replace('+', '').replace('-', '')
-                            if ps and ps != 'nan': price = float(ps)
-                        if frgn_col:
-                            fv = str(data_row[frgn_col]).replace(',', '').replace('+', '')
-                            if fv and fv != 'nan':
-                                fn = float(fv)
-                                foreign_sum += fn * price
-                                if consecutive_counting and fn > 0: consecutive_buy += 1
-                                else: consecutive_counting = False
-                        if inst_col:
-                            iv = str(data_row[inst_col]).replace(',', '').replace('+', '')
-                            if iv and iv != 'nan': inst_sum += float(iv) * price
-                        count += 1
-                    except: continue
-                if count > 0:
-                    print(f"[OK] {code} Naver: 외국인연속={consecutive_buy}, 외국인5d={foreign_sum/1e8:.1f}억")
-                    return {"foreign_consecutive_buy": consecutive_buy, "foreign_net_buy_5d": float(foreign_sum), "inst_net_buy_5d": float(inst_sum)}
-        except requests.exceptions.RequestException as e:
-            print(f"[WARN] {code} Naver 시도 {attempt+1}/{max_retries} 실패: {e}")
-            if attempt < max_retries - 1: time.sleep(1)
-            continue
-        except Exception as e:
-            print(f"[WARN] {code} Naver 파싱 오류: {e}")
-            break
-    
-    # 방법 2: Daum API (백업)
-    for attempt in range(max_retries):
-        try:
-            url = f'https://finance.daum.net/api/investor/days?symbolCode=A{code}&page=1&perPage={days}'
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'application/json, text/plain, */*',
-                'Accept-Language': 'ko-KR,ko;q=0.9',
-                'Referer': f'https://finance.daum.net/quotes/A{code}',
-                'Origin': 'https://finance.daum.net',
-            }
-            session = requests.Session()
-            session.get(f'https://finance.daum.net/quotes/A{code}', headers=headers, timeout=5)
-            time.sleep(0.3)
-            r = session.get(url, headers=headers, timeout=10)
-            if r.status_code == 200:
-                data_list = r.json().get('data', [])
-                if data_list:
-                    consecutive_buy = 0
-                    for d in data_list:
-                        vol = d.get('foreignStraightPurchaseVolume', 0) or 0
-                        if vol > 0: consecutive_buy += 1
-                        else: break
-                    recent_5 = data_list[:5]
-                    foreign_net = sum((d.get('foreignStraightPurchaseVolume', 0) or 0) * (d.get('tradePrice', 0) or 0) for d in recent_5)
-                    inst_net = sum((d.get('institutionStraightPurchaseVolume', 0) or 0) * (d.get('tradePrice', 0) or 0) for d in recent_5)
-                    print(f"[OK] {code} Daum: 외국인연속={consecutive_buy}")
-                    return {"foreign_consecutive_buy": consecutive_buy, "foreign_net_buy_5d": float(foreign_net), "inst_net_buy_5d": float(inst_net)}
-        except requests.exceptions.RequestException as e:
-            print(f"[WARN] {code} Daum 시도 {attempt+1}/{max_retries} 실패: {e}")
-            if attempt < max_retries - 1: time.sleep(1)
-            continue
-        except Exception as e:
-            print(f"[WARN] {code} Daum 파싱 오류: {e}")
-            break
-    
-    print(f"[WARN] {code} 수급 데이터 없음")
-    return {"foreign_consecutive_buy": 0, "foreign_net_buy_5d": 0.0, "inst_net_buy_5d": 0.0}
+    fetch = partial(fetch_flows, retries=max_retries - 1)
+    try:
+        flows = get_flows(code, days=days, fetch=fetch)
+    except Exception as e:
+        print(f"[WARN] {code} 수급 조회 오류: {e}")
+        flows = None
+    result = summarize_flows(flows)
+    if flows is None or flows.empty:
+        print(f"[WARN] {code} 수급 데이터 없음")
+    else:
+        print(f"[OK] {code} 수급: 외국인연속={result['foreign_consecutive_buy']}, 외국인5d={result['foreign_net_buy_5d']/1e8:.1f}억")
+    return result
 
 
 def get_kst_now():
     """한국 시간(KST) 반환"""
     return datetime.utcnow() + timedelta(hours=9)
 
-def calculate_sector_rankings(stocks, top_n=500):
+def calculate_sector_rankings(stocks, return_table, cfg=None):
+    """유니버스 수익률 표로 섹터 순위 계산 (가격은 수익률 표 만들 때 이미 읽었으므로 추가 조회 없음)"""
     print(f"\n[SECTOR] 섹터 분석 시작...")
     try:
-        universe = stocks.head(top_n).copy()
-        sector_groups = universe.groupby("Sector")
-        sector_results = []
-        # KST 기준 시간 설정
-        now = get_kst_now()
-        end_date = now + timedelta(days=1)
-        start_date = now - timedelta(days=90)
-        
-        for sector, group in sector_groups:
-            if len(group) < 3: continue
-            returns = []
-            for _, row in group.head(5).iterrows():
-                try:
-                    df = fdr.DataReader(row["Code"], start_date, end_date)
-                    if df is not None and len(df) > 20:
-                        returns.append((df["Close"].iloc[-1] / df["Close"].iloc[0] - 1) * 100)
-                except: continue
-            if returns:
-                sector_results.append({"Sector": sector, "AvgReturn_3M": sum(returns)/len(returns), "StockCount": len(group)})
-        if sector_results:
-            rank_df = pd.DataFrame(sector_results).sort_values("AvgReturn_3M", ascending=False)
-            rank_df.insert(0, "Rank", range(1, len(rank_df) + 1))
+        sector_cfg = (cfg or {}).get("sector", {})
+        rank_df = sector_rankings(return_table, stocks,
+                                  min_members=sector_cfg.get("min_members", 3),
+                                  rank_by=sector_cfg.get("rank_by", "AvgReturn_3M"))
+        if not rank_df.empty:
             os.makedirs("data", exist_ok=True)
             rank_df.to_csv("data/sector_rankings.csv", index=False, encoding="utf-8-sig")
-            print(f"[SECTOR] 완료: 1위={rank_df.iloc[0]['Sector']}")
+            print(f"[SECTOR] 완료: {len(rank_df)}개 섹터, 1위={rank_df.iloc[0]['Sector']}")
     except Exception as e:
         print(f"[ERR] 섹터 오류: {e}")
 
 
+def _scan_ticker(row, cfg, start, end, index_above_ma20=True, rs=None, timings=None):
+    """STEP1 종목 하나 스캔 (가격 조회 + 시그널 + 점수 + 전략). 탈락 시 None, 조회/계산 오류는 그대로 올림
+    rs: {code: (rs_3m, rs_6m)} 유니버스 전체 기준 RS 순위
+    timings: dict를 주면 단계별 소요 시간(fetch/signals/score/strategies)과 탈락 사유(skip)를 채움"""
+    code = str(row.get("Code", "")).zfill(6)
+    name = row.get("Name", "")
+    market = row.get("Market", "")
+    mktcap = row.get("Marcap", None)
+    sector = row.get("Sector", "기타")
+    if not code or not name: return skip(timings, "no_name")
+    with stage(timings, "fetch"):
+        df = get_prices(code, start, end)
+    if df is None or df.empty: return skip(timings, "no_data")
+    if len(df) < 200: return skip(timings, "short_history")
+    if float(df["Volume"].tail(5).sum()) == 0: return skip(timings, "zero_volume")
+    if float(df["Close"].iloc[-1]) < cfg["universe"]["min_close"]: return skip(timings, "min_close")
+    min_adv = cfg["universe"].get("min_adv20_value")
+    if min_adv and adv20_value(df) < min_adv: return skip(timings, "min_adv20")
+    rs_3m, rs_6m = (rs or {}).get(code, (0, 0))
+    score_kwargs = dict(mktcap=mktcap, rs_3m=rs_3m, rs_6m=rs_6m, index_above_ma20=index_above_ma20)
+    with stage(timings, "signals"):
+        sig = calculate_signals_tail(df, cfg)  # 점수/전략에 필요한 마지막 봉 값만 계산
+    with stage(timings, "score"):
+        scored = score_stock(df, sig, cfg, **score_kwargs)
+    if scored is None: return skip(timings, "no_score")
+
+    # 전략 계산 추가
+    with stage(timings, "strategies"):
+        strat_result = calculate_strategies(df, sig, cfg)
+    if strat_result:
+        # 전략 정보를 scored에 병합 (strategies 리스트 제외, flat 필드만)
+        for k, v in strat_result.items():
+            if k != 'strategies':
+                scored[k] = v
+    
+    # score_details를 JSON 문자열로 변환
+    if 'score_details' in scored and isinstance(scored['score_details'], dict):
+        scored['score_details'] = json.dumps(scored['score_details'], ensure_ascii=False)
+    return {"code": code, "name": name, "market": market, "mktcap": mktcap, "sector": sector,
+            "rs_3m": rs_3m, "rs_6m": rs_6m, **scored}
+
+
+def timed_scan(row, cfg, start, end, index_above_ma20=True, rs=None):
+    """_scan_ticker + 소요 시간 → (code, 초, 결과, 오류 메시지, 단계별 시간/탈락 사유). 오류가 나도 예외 대신 메시지로 반환"""
+    code = str(row.get("Code", "")).zfill(6)
+    timings = {}
+    started = time.perf_counter()
+    try:
+        result, error = _scan_ticker(row, cfg, start, end, index_above_ma20, rs, timings), None
+    except Exception as e:
+        result, error = None, f"{type(e).__name__}: {e}"
+    return code, time.perf_counter() - started, result, error, timings
+
+
+def fetch_enrichment(candidates, cfg, done=None, on_result=None, timings=None):
+    """
+    STEP2 후보들의 수급/뉴스를 스레드 풀로 동시에 조회 (뉴스 키워드는 모아서 일괄 추출)
+    사이트별 동시 요청 수/속도는 http_client의 호스트 한도로 제한. 결과는 candidates 순서대로 반환
+    - done: {code: {"inv": ..., "news": [...]}} 이미 조회한 종목 (저널에서 읽은 것, 다시 조회 안 함)
+    - on_result(code, inv, news): 종목 하나의 수급/뉴스가 모두 끝날 때마다 호출 (메인 스레드)
+    - timings: dict를 주면 {code: {"investor": 초, "news": 초, 실패 시 "<종류>_error": 예외 이름}}를 채움
+    """
+    http_cfg = cfg.get("http", {})
+    http_client.configure_hosts(http_cfg.get("hosts"))
+    workers = int(http_cfg.get("enrich_workers", 8) or 1)
+    codes = candidates["code"].tolist()
+    names = candidates["name"].tolist()
+
+    def safe(kind, t, fn, *args, default=None):
+        with stage(t, kind):
+            try:
+                return fn(*args)
+            except Exception as e:
+                print(f"[WARN] {args[0]} 조회 실패: {e}")
+                if t is not None:
+                    t[f"{kind}_error"] = type(e).__name__
+                return default
+
+    no_inv = {"foreign_consecutive_buy": 0, "foreign_net_buy_5d": 0.0, "inst_net_buy_5d": 0.0}
+    done = done or {}
+    results = {code: dict(done[code]) for code in codes if code in done}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futs = {}
+        for code, name in zip(codes, names):
+            if code in results:
+                continue
+            results[code] = {}
+            t = None if timings is None else timings.setdefault(code, {})
+            futs[pool.submit(safe, "investor", t, get_investor_data, code, default=no_inv)] = (code, "inv")
+            futs[pool.submit(safe, "news", t, fetch_stock_news, name, cfg, default=[])] = (code, "news")
+        for fut in as_completed(futs):
+            code, kind = futs[fut]
+            results[code][kind] = fut.result()
+            if on_result is not None and len(results[code]) == 2:
+                on_result(code, results[code]["inv"], results[code]["news"])
+    inv_list = [results[code]["inv"] for code in codes]
+    news_lists = [results[code]["news"] for code in codes]
+    # 키워드는 후보 전체 기사로 한 번에 추출
+    return inv_list, analyze_news_batch(news_lists, cfg)
+
+
+def calc_supply_score(inv, cfg):
+    """STEP2 수급 점수 (외국인 연속 순매수 일수 + 5일 외국인/기관 순매수, supply_weight 상한)"""
+    score = 0
+    fc = inv.get("foreign_consecutive_buy", 0)
+    if fc >= 5: score += 8
+    elif fc >= 3: score += 5
+    elif fc >= 1: score += 2
+    if inv.get("inst_net_buy_5d", 0) > 0: score += 4
+    if inv.get("foreign_net_buy_5d", 0) > 0: score += 3
+    return min(score, cfg.get("scoring", {}).get("supply_weight", 15))
+
+
 def main():
     cfg = load_config()
-    stocks = get_stock_list(cfg)
+    http_client.configure_hosts(cfg.get("http", {}).get("hosts"))
+    run_stages = {}  # 실행 리포트용 단계별 소요 시간
+    # 가격 저장소를 날짜별 전종목 일봉으로 먼저 채움 (이미 확정된 종목은 요청 없음) → 이후 종목별 조회 생략
+    # 종목 목록의 거래대금 확인(confirm_adv20)도 저장소를 읽으므로 그보다 먼저 실행
+    price_cfg = cfg.get("prices", {})
+    if price_cfg.get("by_date_ingest", True):
+        with stage(run_stages, "ingest"):
+            try:
+                print_ingest_stats(ingest_days(stored_codes(), max_days=int(price_cfg.get("max_backfill_days", 30))))
+            except Exception as e:
+                print(f"[WARN] 날짜별 일괄 수집 실패 - 종목별 조회로 진행: {e}")
+    with stage(run_stages, "listing"):
+        stocks = get_stock_list(cfg)
     if stocks.empty:
         print("[ERR] 종목 없음")
         return
     top_n = int(cfg["universe"]["top_n_stocks"])
-    chunk_size = int(cfg["universe"]["chunk_size"])
     chunk = int(os.environ.get("SCAN_CHUNK", "1"))
     all_top = stocks.head(top_n).copy()
-    start_i, end_i = (chunk - 1) * chunk_size, chunk * chunk_size
-    chunk_stocks = all_top.iloc[start_i:end_i]
-    print(f"[SCAN] Chunk {chunk}: {len(chunk_stocks)}개")
+    now = get_kst_now()
+    start, end = scan_window(now)
+    workers = int(cfg["universe"].get("workers", 1) or 1)
+    scan_day = now.strftime("%Y-%m-%d")
+    universe_codes = all_top["Code"].astype(str).str.zfill(6).tolist()
+
+    # 샤드 분배 (이전 실행의 종목별 소요 시간 기준). 예전 설정(chunk_size)이면 샤드 수로 환산
+    n_shards = cfg["universe"].get("shards") or math.ceil(top_n / int(cfg["universe"].get("chunk_size", top_n)))
+    if os.environ.get("SCAN_STAGE") == "returns":
+        # 계획 단계: 유니버스 수익률/RS 표 + 샤드 매니페스트를 만들어 모든 청크가 공유
+        manifest = build_manifest(universe_codes, n_shards, scan_day)
+        save_manifest(manifest)
+        print(f"[SHARD] {manifest['n_shards']}개 샤드, 예상 소요(초): {manifest['expected_seconds']}")
+        gh_output = os.environ.get("GITHUB_OUTPUT")
+        if gh_output:
+            with open(gh_output, "a", encoding="utf-8") as f:
+                f.write(f"shards={json.dumps([int(k) for k in manifest['shards']])}\n")
+        print(f"[RS] 유니버스 {len(universe_codes)}개 수익률 표 생성...")
+        get_return_table(universe_codes, scan_day, start, end, workers=workers)
+        return
+    manifest = get_manifest(universe_codes, n_shards, scan_day)
+    shard_codes = set(manifest["shards"].get(str(chunk), []))
+    chunk_stocks = all_top[all_top["Code"].astype(str).str.zfill(6).isin(shard_codes)]
+
+    # 유니버스 전체 수익률/RS 표 (계획 단계에서 만들어 두면 청크들이 공유)
+    with stage(run_stages, "returns"):
+        rs_table = get_return_table(universe_codes, scan_day, start, end, workers=workers)
+    print(f"[RS] 수익률 표 {len(rs_table)}개 종목")
+
+    print(f"[SCAN] Chunk {chunk}/{manifest['n_shards']}: {len(chunk_stocks)}개")
     if chunk == 1:
-        calculate_sector_rankings(all_top)
+        with stage(run_stages, "sector_ranking"):
+            calculate_sector_rankings(all_top, rs_table, cfg)
     
     # 지수 20일선 상태 확인 (리스크 점수 계산용)
-    index_above_ma20 = check_index_above_ma20()
+    with stage(run_stages, "index_check"):
+        index_above_ma20 = check_index_above_ma20()
+    report = new_report(scan_day, chunk, run_stages)
     
     print("\n[STEP1] 기술적 스캔...")
+    rows = chunk_stocks.to_dict("records")
+    rs = rs_lookup(rs_table)
+    task = partial(timed_scan, cfg=cfg, start=start, end=end, index_above_ma20=index_above_ma20, rs=rs)
+
+    # 같은 날짜로 중간에 끊긴 실행이 있으면 저널에서 이어서 진행
+    journal = load_journal(scan_day, chunk)
+    tech_done = journal["tech"]
+    failed = {}  # 이번 실행에서 오류로 끝난 종목 (저널에는 남지만 재실행 시 다시 시도)
+    pending = [r for r in rows if str(r.get("Code", "")).zfill(6) not in tech_done]
+    if tech_done:
+        print(f"  [RESUME] 저널에서 {len(tech_done)}개 복원, 남은 종목 {len(pending)}개")
+        report["resumed"] = len(tech_done)
+
+    def collect(results):
+        for idx, (code, seconds, result, error, timings) in enumerate(results, start=len(tech_done) + 1):
+            if idx % 20 == 0: print(f"  {idx}/{len(chunk_stocks)}")
+            if error: print(f"  [WARN] {code} 스캔 실패: {error}")
+            rec = {"stage": "tech", "code": code, "seconds": round(seconds, 4), "result": result, "error": error,
+                   "timings": timings}
+            append_journal(scan_day, chunk, rec)
+            (failed if error else tech_done)[code] = rec
+
+    with stage(report["run_stages"], "step1"):
+        if workers > 1 and pending:
+            # 종목별 다운로드+계산을 프로세스 풀로 분산 (끝나는 대로 저널에 기록, 결과 순서는 아래에서 원래 순서로 맞춤)
+            print(f"  병렬 실행: {workers} workers")
+            with ProcessPoolExecutor(max_workers=workers, initializer=http_client.init_worker,
+                                     initargs=(workers, cfg.get("http", {}).get("hosts"))) as pool:
+                collect(f.result() for f in as_completed([pool.submit(task, r) for r in pending]))
+        else:
+            collect(map(task, pending))
+
     tech_results = []
-    
-    # KST 기준 시간 설정
-    now = get_kst_now()
-    end = now + timedelta(days=1) # 내일까지로 설정하여 당일 데이터 포함 보장
-    start = now - timedelta(days=400)
-    
-    for idx, row in enumerate(chunk_stocks.itertuples(index=False), start=1):
-        code = str(getattr(row, "Code", "")).zfill(6)
-        name = getattr(row, "Name", "")
-        market = getattr(row, "Market", "")
-        mktcap = getattr(row, "Marcap", None)
-        sector = getattr(row, "Sector", "기타")
-        if not code or not name: continue
-        if idx % 20 == 0: print(f"  {idx}/{len(chunk_stocks)}")
-        try:
-            df = fdr.DataReader(code, start, end)
-            if df is None or len(df) < 200: continue
-            if float(df["Volume"].tail(5).sum()) == 0: continue
-            if float(df["Close"].iloc[-1]) < cfg["universe"]["min_close"]: continue
-            sig = calculate_signals(df, cfg)
-            scored = score_stock(df, sig, cfg, mktcap=mktcap, index_above_ma20=index_above_ma20)
-            if scored is None: continue
-            
-            # 전략 계산 추가
-            strat_result = calculate_strategies(df, sig, cfg)
-            if strat_result:
-                # 전략 정보를 scored에 병합 (strategies 리스트 제외, flat 필드만)
-                for k, v in strat_result.items():
-                    if k != 'strategies':
-                        scored[k] = v
-            
-            # score_details를 JSON 문자열로 변환
-            if 'score_details' in scored and isinstance(scored['score_details'], dict):
-                scored['score_details'] = json.dumps(scored['score_details'], ensure_ascii=False)
-            tech_results.append({"code": code, "name": name, "market": market, "mktcap": mktcap, "sector": sector, **scored})
-            time.sleep(0.1)
-        except: continue
+    scanned = []  # (code, 소요 초, 통과 여부) - 다음 실행의 샤드 분배와 merge 검사에 사용
+    for r in rows:
+        code = str(r.get("Code", "")).zfill(6)
+        rec = tech_done.get(code) or failed.get(code)
+        if rec is None:
+            continue
+        scanned.append((rec["code"], rec["seconds"], rec["result"] is not None))
+        add_ticker(report, rec["code"], rec["seconds"], rec.get("timings"), rec.get("error"))
+        if rec["result"] is not None:
+            tech_results.append(rec["result"])
     print(f"[STEP1] {len(tech_results)}개 통과")
+    save_scanned(scanned, scan_day, chunk)
     if not tech_results:
-        scan_day = get_kst_now().strftime("%Y-%m-%d")
         os.makedirs("data/partial", exist_ok=True)
         pd.DataFrame().to_csv(f"data/partial/scanner_output_{scan_day}_chunk{chunk}.csv", index=False)
+        save_report(report)
+        clear_journal(scan_day, chunk)
         return
     tech_df = pd.DataFrame(tech_results).sort_values("total_score", ascending=False)
     
     top_candidates = cfg.get("investor", {}).get("top_candidates", 100)
     candidates = tech_df.head(top_candidates)
     print(f"\n[STEP2] 상위 {len(candidates)}개 수급 조회...")
+    enrich_done = {code: rec for code, rec in journal["enrich"].items() if code in set(candidates["code"])}
+    if enrich_done:
+        print(f"  [RESUME] 저널에서 {len(enrich_done)}개 복원")
+    enrich_timings = {}
+    def journal_enrich(code, inv, news):
+        append_journal(scan_day, chunk, {"stage": "enrich", "code": code, "inv": inv, "news": news,
+                                         "timings": enrich_timings.get(code)})
+    for code, rec in enrich_done.items():
+        enrich_timings[code] = dict(rec.get("timings") or {})
+    with stage(report["run_stages"], "step2"):
+        investor_list, news_list = fetch_enrichment(candidates, cfg, done=enrich_done, on_result=journal_enrich,
+                                                    timings=enrich_timings)
+    add_enrich(report, enrich_timings)
     final_results = []
-    for _, row in candidates.iterrows():
-        code, name = row["code"], row["name"]
-        inv = get_investor_data(code)
-        supply_score = 0
-        supply_w = cfg.get("scoring", {}).get("supply_weight", 15)
+    for (_, row), inv, news in zip(candidates.iterrows(), investor_list, news_list):
+        name = row["name"]
         fc = inv.get("foreign_consecutive_buy", 0)
-        if fc >= 5: supply_score += 8
-        elif fc >= 3: supply_score += 5
-        elif fc >= 1: supply_score += 2
-        if inv.get("inst_net_buy_5d", 0) > 0: supply_score += 4
-        if inv.get("foreign_net_buy_5d", 0) > 0: supply_score += 3
-        supply_score = min(supply_score, supply_w)
+        supply_score = calc_supply_score(inv, cfg)
         new_total = row["trend_score"] + row["pattern_score"] + row["volume_score"] + supply_score + row["risk_score"]
         result = row.to_dict()
         result.update({
@@ -323,18 +467,29 @@ def main():
             "scan_date": get_kst_now().strftime("%Y-%m-%d %H:%M"),
             "chunk": chunk
         })
-        news = analyze_stock_news(name, cfg)
         result.update(news)
         final_results.append(result)
         print(f"  [OK] {name}: {new_total:.0f}점 (수급:{supply_score})")
-        time.sleep(0.2)
     print(f"\n[STEP2] {len(final_results)}개 완료")
-    scan_day = get_kst_now().strftime("%Y-%m-%d")
     os.makedirs("data/partial", exist_ok=True)
     out = pd.DataFrame(final_results).sort_values("total_score", ascending=False)
     out.insert(0, "rank", range(1, len(out) + 1))
     out.to_csv(f"data/partial/scanner_output_{scan_day}_chunk{chunk}.csv", index=False, encoding="utf-8-sig")
+    save_report(report)
+    clear_journal(scan_day, chunk)  # partial CSV에 모두 반영됨
     print(f"[완료] 저장됨 ({len(out)}개)")
+    http_client.print_stats()
+
+
+def save_report(report):
+    """청크 실행 리포트를 partial CSV 옆에 저장 (실패해도 스캔 결과에는 영향 없음)"""
+    try:
+        finish_report(report, http_client.stats())
+        path = write_report(report)
+        print_report(report)
+        print(f"[REPORT] 저장: {path}")
+    except Exception as e:
+        print(f"[WARN] 실행 리포트 저장 실패: {e}")
 
 
 if __name__ == "__main__":